@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Throughput and latency of the client against the local stand-in server of ``fakejira.py``.
+
+Every scenario runs a few times on a fresh client and reports the best run, along with the median and 95th percentile
+time of the HTTP requests it made:
+
+* search -- ``search_issues(maxResults=False)`` with one thread and with ``--workers`` threads fetching pages
+* fetch_pages -- ``boards(maxResults=False)``, the agile flavour of ``_fetch_pages``
+* hydrate -- turning search results with changelogs into Issue resources, eagerly and with ``lazy_hydration``
+* bulk_update -- async ``issue.update()`` of many issues, waited for with ``async_do()``
+* bulk_create -- ``create_issues()`` in batches of 50
+
+Usage::
+
+    python benchmarks/bench_client.py [--issues N] [--latency SECONDS] [--workers N] [--repeat N] [scenario ...]
+"""
+from __future__ import print_function
+import argparse
+import gc
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from fakejira import FakeJIRA
+from jira import JIRA
+from jira.resources import Issue
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))]
+
+
+def client(server, **options):
+    """A client of ``server`` recording the time of every response it gets in ``client.latencies``."""
+    options = dict({'check_update': False, 'agile_rest_path': 'agile'}, **options)
+    jira = JIRA(server.url, options=options, max_retries=0)
+    jira.latencies = []
+    jira._session.hooks['response'].append(lambda r, *args, **kwargs: jira.latencies.append(r.elapsed.total_seconds()))
+    return jira
+
+
+def search(server, args, workers):
+    jira = client(server, fetch_workers=workers)
+    started = time.time()
+    issues = jira.search_issues('project = FAKE', maxResults=False)
+    assert len(issues) == args.issues
+    return time.time() - started, len(issues), jira.latencies
+
+
+def fetch_pages(server, args):
+    jira = client(server, fetch_workers=args.workers)
+    started = time.time()
+    boards = jira.boards(maxResults=False)
+    assert len(boards) == server.boards
+    return time.time() - started, len(boards), jira.latencies
+
+
+def hydrate(server, args, lazy):
+    jira = client(server)
+    raws = []
+    for start in range(0, args.issues, server.page_size):
+        page = jira._get_json('search', params={'jql': 'project = FAKE', 'startAt': start, 'expand': 'changelog'})
+        raws.extend(page['issues'])
+    options = dict(jira._options, lazy_hydration=lazy)
+    gc.collect()
+    started = time.time()
+    issues = [Issue(options, jira._session, raw) for raw in raws]
+    for issue in issues:
+        issue.fields.summary
+    return time.time() - started, len(issues), []
+
+
+def bulk_update(server, args):
+    jira = client(server, **{'async': True, 'async_workers': args.workers})
+    issues = [Issue(jira._options, jira._session, {'id': str(10000 + n), 'key': 'FAKE-%s' % n,
+                                                   'self': '%s/rest/api/2/issue/%s' % (server.url, 10000 + n)})
+              for n in range(1, args.issues + 1)]
+    started = time.time()
+    for issue in issues:
+        issue.update(fields={'summary': 'Updated'})
+    jobs = jira.async_do()
+    assert all(job.status_code == 204 for job in jobs)
+    return time.time() - started, len(jobs), jira.latencies
+
+
+def bulk_create(server, args):
+    jira = client(server)
+    field_list = [{'project': 'FAKE', 'issuetype': 'Bug', 'summary': 'Created %s' % n} for n in range(args.issues)]
+    started = time.time()
+    results = jira.create_issues(field_list)
+    assert all(result['status'] == 'Success' for result in results)
+    return time.time() - started, len(results), jira.latencies
+
+
+def scenarios(args):
+    return [
+        ('search', 'issues', lambda server: search(server, args, 1)),
+        ('search x%s' % args.workers, 'issues', lambda server: search(server, args, args.workers)),
+        ('fetch_pages', 'boards', lambda server: fetch_pages(server, args)),
+        ('hydrate', 'issues', lambda server: hydrate(server, args, False)),
+        ('hydrate lazy', 'issues', lambda server: hydrate(server, args, True)),
+        ('bulk_update', 'issues', lambda server: bulk_update(server, args)),
+        ('bulk_create', 'issues', lambda server: bulk_create(server, args)),
+    ]
+
+
+def run(args):
+    print('%s issues, %s histories, %sms latency, best of %s' % (args.issues, args.histories, args.latency * 1000,
+                                                                args.repeat))
+    print('  %-14s %9s %12s %7s %10s %10s' % ('scenario', 'seconds', 'items/s', 'calls', 'p50 ms', 'p95 ms'))
+    results = {}
+    for name, unit, scenario in scenarios(args):
+        if args.scenarios and name.split()[0] not in args.scenarios:
+            continue
+        best = None
+        for _ in range(args.repeat):
+            with FakeJIRA(issues=args.issues, histories=args.histories, latency=args.latency,
+                          boards=args.issues // 10 or 1) as server:
+                result = scenario(server)
+            if best is None or result[0] < best[0]:
+                best = result
+        elapsed, count, latencies = best
+        results[name] = best
+        print('  %-14s %9.3f %12.0f %7s %10.1f %10.1f' % (
+            name, elapsed, count / elapsed if elapsed else 0, len(latencies) or '-',
+            percentile(latencies, 0.5) * 1000, percentile(latencies, 0.95) * 1000))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--issues', type=int, default=1000)
+    parser.add_argument('--histories', type=int, default=5)
+    parser.add_argument('--latency', type=float, default=0.01, help='seconds the fake server waits per request')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('scenarios', nargs='*', help='search, fetch_pages, hydrate, bulk_update or bulk_create')
+    return run(parser.parse_args(argv))
+
+
+if __name__ == '__main__':
+    main()
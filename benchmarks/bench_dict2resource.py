@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Micro-benchmark of the hydration of issues with changelogs by ``dict2resource``.
+
+It compares the current implementation with the previous one, which created a
+new ``PropertyHolder`` class for every nested dict without a ``self`` link.
+
+Usage::
+
+    python benchmarks/bench_dict2resource.py [issues] [histories-per-issue]
+"""
+from __future__ import print_function
+import copy
+import gc
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from six import iteritems
+
+from jira import resources
+from jira.resources import Issue, TimeTracking, cls_for_resource
+
+SERVER = 'http://localhost:2990/jira'
+OPTIONS = {'server': SERVER, 'rest_path': 'api', 'rest_api_version': '2', 'async': False}
+
+
+def legacy_dict2resource(raw, top=None, options=None, session=None):
+    """``dict2resource`` as it was before the shared ``PropertyHolder`` class."""
+    if top is None:
+        top = type(str('PropertyHolder'), (object,), raw)
+
+    seqs = tuple, list, set, frozenset
+    for i, j in iteritems(raw):
+        if isinstance(j, dict):
+            if 'self' in j:
+                resource = cls_for_resource(j['self'])(options, session, j)
+                setattr(top, i, resource)
+            elif i == 'timetracking':
+                setattr(top, 'timetracking', TimeTracking(options, session, j))
+            else:
+                setattr(
+                    top, i, legacy_dict2resource(j, options=options, session=session))
+        elif isinstance(j, seqs):
+            seq_list = []
+            for seq_elem in j:
+                if isinstance(seq_elem, dict):
+                    if 'self' in seq_elem:
+                        resource = cls_for_resource(seq_elem['self'])(
+                            options, session, seq_elem)
+                        seq_list.append(resource)
+                    else:
+                        seq_list.append(
+                            legacy_dict2resource(seq_elem, options=options, session=session))
+                else:
+                    seq_list.append(seq_elem)
+            setattr(top, i, seq_list)
+        else:
+            setattr(top, i, j)
+    return top
+
+
+def user(name):
+    return {'self': '%s/rest/api/2/user?username=%s' % (SERVER, name), 'name': name, 'displayName': name.title(),
+            'emailAddress': '%s@example.com' % name, 'active': True, 'timeZone': 'Europe/London'}
+
+
+def make_issue(number, histories):
+    """A synthetic issue shaped like the result of ``search_issues(..., expand='changelog')``."""
+    return {
+        'id': str(10000 + number),
+        'key': 'BENCH-%s' % number,
+        'self': '%s/rest/api/2/issue/%s' % (SERVER, 10000 + number),
+        'fields': {
+            'summary': 'Synthetic issue %s' % number,
+            'created': '2016-01-04T10:15:30.000+0000',
+            'updated': '2016-02-04T10:15:30.000+0000',
+            'labels': ['alpha', 'beta'],
+            'creator': user('creator'),
+            'reporter': user('reporter'),
+            'assignee': user('assignee'),
+            'status': {'self': '%s/rest/api/2/status/1' % SERVER, 'id': '1', 'name': 'Open'},
+            'priority': {'self': '%s/rest/api/2/priority/3' % SERVER, 'id': '3', 'name': 'Major'},
+            'project': {'self': '%s/rest/api/2/project/10000' % SERVER, 'id': '10000', 'key': 'BENCH'},
+            'customfield_11100': {'self': '%s/rest/api/2/customFieldOption/1' % SERVER, 'value': 'Squad A'},
+            'timetracking': {'remainingEstimate': '1d'},
+            'votes': {'votes': 0, 'hasVoted': False},
+        },
+        'changelog': {
+            'startAt': 0,
+            'maxResults': histories,
+            'total': histories,
+            'histories': [{
+                'id': str(h),
+                'author': user('author%s' % (h % 5)),
+                'created': '2016-01-%02dT10:15:30.000+0000' % (h % 28 + 1),
+                'items': [
+                    {'field': 'status', 'fieldtype': 'jira', 'from': '1', 'fromString': 'Open',
+                     'to': '3', 'toString': 'In Progress'},
+                    {'field': 'Squad', 'fieldtype': 'custom', 'from': None, 'fromString': 'Squad A',
+                     'to': None, 'toString': 'Squad B'},
+                ],
+            } for h in range(histories)],
+        },
+    }
+
+
+def hydrate(raws):
+    started = time.time()
+    issues = [Issue(OPTIONS, None, raw) for raw in raws]
+    return time.time() - started, issues
+
+
+def run(issues=2000, histories=20, repeat=3):
+    raws = [make_issue(n, histories) for n in range(issues)]
+    current = resources.dict2resource
+    results = {}
+    for name, implementation in (('legacy', legacy_dict2resource), ('current', current)):
+        resources.dict2resource = implementation
+        try:
+            timings = []
+            for _ in range(repeat):
+                gc.collect()
+                elapsed, hydrated = hydrate(copy.deepcopy(raws))
+                timings.append(elapsed)
+                assert hydrated[-1].fields.summary == 'Synthetic issue %s' % (issues - 1)
+                del hydrated
+            results[name] = min(timings)
+        finally:
+            resources.dict2resource = current
+
+    print('dict2resource: %s issues x %s histories (best of %s)' % (issues, histories, repeat))
+    for name in ('legacy', 'current'):
+        print('  %-8s %8.3fs  %8.0f issues/s' % (name, results[name], issues / results[name]))
+    print('  speedup  %8.2fx' % (results['legacy'] / results['current']))
+    return results
+
+
+if __name__ == '__main__':
+    run(*[int(arg) for arg in sys.argv[1:3]])
@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Benchmark of the cold ``import jira`` time.
+
+Every run starts a fresh interpreter, so nothing is already imported, and the
+time of a bare interpreter start is subtracted. It also lists the optional or
+rarely used modules which ``import jira`` should not load any more, and, on
+Python 3.7+, the slowest modules of one ``-X importtime`` run.
+
+Usage::
+
+    python benchmarks/bench_import.py [runs]
+"""
+from __future__ import print_function
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# loaded on first use only
+LAZY = ('pytz', 'imghdr', 'html.parser', 'HTMLParser', 'configparser', 'ConfigParser', 'multiprocessing.pool',
+        'requests_toolbelt', 'requests_jwt', 'requests_oauthlib', 'oauthlib', 'magic', 'sqlite3', 'numpy', 'aiohttp',
+        'orjson', 'ujson', 'simdjson')
+
+CHECK = """
+import sys
+import jira
+print(' '.join(m for m in %r if m in sys.modules))
+""" % (LAZY, )
+
+
+def python(*args):
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(p for p in (ROOT, env.get('PYTHONPATH')) if p)
+    return subprocess.Popen((sys.executable, ) + args, env=env, cwd=ROOT,
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+
+def timed(code):
+    started = time.time()
+    process = python('-c', code)
+    process.communicate()
+    elapsed = time.time() - started
+    if process.returncode:
+        raise RuntimeError('%r failed' % code)
+    return elapsed
+
+
+def slowest_modules(count=10):
+    out, err = python('-X', 'importtime', '-c', 'import jira').communicate()
+    rows = []
+    for line in err.decode('utf-8').splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        rows.append((int(cumulative), name.strip()))
+    return sorted(rows, reverse=True)[:count]
+
+
+def run(runs=20):
+    baseline = min(timed('pass') for _ in range(runs))
+    timings = sorted(timed('import jira') - baseline for _ in range(runs))
+
+    print('import jira: %s cold runs, interpreter start (%.1fms) excluded' % (runs, baseline * 1000))
+    print('  best    %8.1fms' % (timings[0] * 1000))
+    print('  median  %8.1fms' % (timings[len(timings) // 2] * 1000))
+
+    loaded = python('-c', CHECK).communicate()[0].decode('utf-8').split()
+    print('  lazy modules imported: %s' % (', '.join(loaded) or 'none'))
+
+    if sys.version_info >= (3, 7):
+        print('slowest modules (cumulative):')
+        for cumulative, name in slowest_modules():
+            print('  %8.1fms  %s' % (cumulative / 1000.0, name))
+    return timings
+
+
+if __name__ == '__main__':
+    run(*[int(arg) for arg in sys.argv[1:2]])
@@ -0,0 +1,460 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Local stand-in for a JIRA server, serving synthetic data over HTTP.
+
+It answers the REST calls the client makes most, so that its performance can be measured without a live JIRA:
+``serverInfo``, ``field``, ``project/{key}``, ``issuetype``, ``search``, ``issue/{key}`` (GET, PUT, DELETE), ``issue`` and ``issue/bulk`` (POST),
+``group``, ``attachment/{id}``, ``issue/{key}/attachments`` (POST), the attachment content with Range requests,
+and the agile ``board`` and ``board/{id}/sprint`` calls. Issues are generated from their number when they are
+asked for, so large volumes cost no memory; only the changes made through the API are stored.
+
+Usage::
+
+    with FakeJIRA(issues=5000, latency=0.02) as server:
+        jira = JIRA(server.url, options={'check_update': False, 'agile_rest_path': 'agile'})
+        jira.search_issues('project = FAKE', maxResults=False)
+
+or, to point other tools at it::
+
+    python benchmarks/fakejira.py [port]
+"""
+from __future__ import print_function, unicode_literals
+import json
+import re
+import sys
+import threading
+import time
+
+from six.moves.BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+from six.moves.socketserver import ThreadingMixIn
+from six.moves.urllib.parse import parse_qs, unquote, urlparse
+
+PROJECT = 'FAKE'
+FIRST_ID = 10000
+SQUADS = ('Red', 'Green', 'Blue')
+STATUSES = ('Open', 'In Progress', 'Done')
+
+FIELDS = [
+    {'id': 'summary', 'name': 'Summary', 'custom': False, 'clauseNames': ['summary']},
+    {'id': 'status', 'name': 'Status', 'custom': False, 'clauseNames': ['status']},
+    {'id': 'created', 'name': 'Created', 'custom': False, 'clauseNames': ['created', 'createdDate']},
+    {'id': 'updated', 'name': 'Updated', 'custom': False, 'clauseNames': ['updated', 'updatedDate']},
+    {'id': 'assignee', 'name': 'Assignee', 'custom': False, 'clauseNames': ['assignee']},
+    {'id': 'reporter', 'name': 'Reporter', 'custom': False, 'clauseNames': ['reporter']},
+    {'id': 'labels', 'name': 'Labels', 'custom': False, 'clauseNames': ['labels']},
+    {'id': 'project', 'name': 'Project', 'custom': False, 'clauseNames': ['project']},
+    {'id': 'issuetype', 'name': 'Issue Type', 'custom': False, 'clauseNames': ['issuetype', 'type']},
+    {'id': 'attachment', 'name': 'Attachment', 'custom': False, 'clauseNames': ['attachments']},
+    {'id': 'customfield_11100', 'name': 'Squad', 'custom': True, 'clauseNames': ['cf[11100]', 'Squad']},
+]
+NAVIGABLE = [f['id'] for f in FIELDS if f['id'] != 'attachment']
+
+_KEY_IN = re.compile(r'\bkey\s+in\s*\(([^)]*)\)', re.IGNORECASE)
+_USERS_RANGE = re.compile(r'users\[(\d+):(\d+)\]')
+_BOUNDARY = re.compile(r'boundary=([^;]+)')
+_FILENAME = re.compile(br'filename="([^"]*)"')
+
+
+class _Reply(Exception):
+
+    """Raised by a route to answer with an error status."""
+
+    def __init__(self, status, message):
+        self.status = status
+        self.message = message
+
+
+class FakeJIRA(object):
+
+    """
+    Threaded HTTP server standing in for JIRA, listening on ``127.0.0.1``.
+
+    :param issues: number of issues of the project, keyed ``FAKE-1`` to ``FAKE-<issues>``
+    :param histories: changelog entries per issue
+    :param page_size: most items returned in one page, whatever ``maxResults`` asks for, as JIRA does
+    :param latency: seconds every request waits before it is answered, standing for the network and the server
+    :param boards: number of agile boards
+    :param sprints: number of sprints per board
+    :param group_size: number of users in every group
+    :param attachments: number of attachments per issue
+    :param attachment_size: bytes of every attachment
+    :param port: port to listen on, a free one by default
+    """
+
+    def __init__(self, issues=1000, histories=5, page_size=50, latency=0.0, boards=20, sprints=10, group_size=200,
+                 attachments=1, attachment_size=64 * 1024, port=0):
+        self.issues = issues
+        self.histories = histories
+        self.page_size = page_size
+        self.latency = latency
+        self.boards = boards
+        self.sprints = sprints
+        self.group_size = group_size
+        self.attachments = attachments
+        self.attachment_size = attachment_size
+        self.port = port
+
+        # (method, path) of every request, in the order they were answered
+        self.requests = []
+        self._changes = {}
+        self._deleted = set()
+        self._uploaded = {}
+        self._lock = threading.Lock()
+        self._httpd = None
+        self._thread = None
+
+    # server
+
+    @property
+    def url(self):
+        return 'http://127.0.0.1:%s' % self.port
+
+    def start(self):
+        self._httpd = _ThreadingHTTPServer(('127.0.0.1', self.port), _Handler)
+        self._httpd.fake = self
+        self.port = self._httpd.server_address[1]
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name='fakejira')
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._thread.join()
+            self._httpd = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def record(self, method, path):
+        with self._lock:
+            self.requests.append((method, path))
+
+    # synthetic data
+
+    def user(self, name):
+        return {'self': '%s/rest/api/2/user?username=%s' % (self.url, name), 'name': name, 'key': name,
+                'displayName': name.title(), 'emailAddress': '%s@example.com' % name, 'active': True,
+                'timeZone': 'Europe/London'}
+
+    def number(self, id_or_key):
+        """The number of the issue with key ``FAKE-n`` or ID ``10000 + n``, None if there is none."""
+        id_or_key = str(id_or_key)
+        if id_or_key.upper().startswith(PROJECT + '-'):
+            number = id_or_key[len(PROJECT) + 1:]
+        elif id_or_key.isdigit():
+            number = str(int(id_or_key) - FIRST_ID)
+        else:
+            return None
+        if not number.isdigit() or not 1 <= int(number) <= self.issues or int(number) in self._deleted:
+            return None
+        return int(number)
+
+    def attachment(self, number, index):
+        attachment_id = (FIRST_ID + number) * 100 + index
+        filename = 'file-%s-%s.bin' % (number, index)
+        size = len(self._uploaded[attachment_id][1]) if attachment_id in self._uploaded else self.attachment_size
+        if attachment_id in self._uploaded:
+            filename = self._uploaded[attachment_id][0]
+        return {'self': '%s/rest/api/2/attachment/%s' % (self.url, attachment_id), 'id': str(attachment_id),
+                'filename': filename, 'author': self.user('reporter'), 'created': '2016-01-04T10:15:30.000+0000',
+                'size': size, 'mimeType': 'application/octet-stream',
+                'content': '%s/secure/attachment/%s/%s' % (self.url, attachment_id, filename)}
+
+    def attachment_content(self, attachment_id):
+        if attachment_id in self._uploaded:
+            return self._uploaded[attachment_id][1]
+        return (bytes(bytearray(range(256))) * (self.attachment_size // 256 + 1))[:self.attachment_size]
+
+    def issue(self, number, fields=None, expand=None):
+        """The raw JSON of issue ``number`` with the ``fields`` (a list of IDs, all by default) and ``expand``."""
+        issue_id = FIRST_ID + number
+        squad = SQUADS[number % len(SQUADS)]
+        all_fields = {
+            'summary': 'Synthetic issue %s' % number,
+            'status': {'self': '%s/rest/api/2/status/%s' % (self.url, number % 3 + 1), 'id': str(number % 3 + 1),
+                       'name': STATUSES[number % 3]},
+            'created': '2016-01-%02dT10:15:30.000+0000' % (number % 28 + 1),
+            'updated': '2016-02-%02dT10:15:30.000+0000' % (number % 28 + 1),
+            'assignee': self.user('user%s' % (number % 10)),
+            'reporter': self.user('reporter'),
+            'labels': ['alpha', 'beta'],
+            'project': {'self': '%s/rest/api/2/project/%s' % (self.url, FIRST_ID), 'id': str(FIRST_ID),
+                        'key': PROJECT},
+            'issuetype': {'self': '%s/rest/api/2/issuetype/1' % self.url, 'id': '1', 'name': 'Bug'},
+            'attachment': [self.attachment(number, index) for index in range(self.attachments)],
+            'customfield_11100': {'self': '%s/rest/api/2/customFieldOption/%s' % (self.url, number % 3),
+                                  'value': squad},
+        }
+        all_fields.update(self._changes.get(number, {}))
+        if fields is not None:
+            all_fields = dict((name, value) for name, value in all_fields.items() if name in fields)
+
+        raw = {'id': str(issue_id), 'key': '%s-%s' % (PROJECT, number),
+               'self': '%s/rest/api/2/issue/%s' % (self.url, issue_id), 'fields': all_fields}
+        if expand and 'changelog' in expand:
+            raw['changelog'] = {'startAt': 0, 'maxResults': self.histories, 'total': self.histories, 'histories': [{
+                'id': str(h),
+                'author': self.user('user%s' % (h % 10)),
+                'created': '2016-01-%02dT10:%02d:30.000+0000' % (number % 28 + 1, h % 60),
+                'items': [
+                    {'field': 'status', 'fieldtype': 'jira', 'from': '1', 'fromString': 'Open', 'to': '3',
+                     'toString': 'In Progress'},
+                    {'field': 'Squad', 'fieldtype': 'custom', 'from': None, 'fromString': SQUADS[h % 3],
+                     'to': None, 'toString': SQUADS[(h + 1) % 3]},
+                ],
+            } for h in range(self.histories)]}
+        return raw
+
+    def page(self, params, total):
+        start = int(params.get('startAt', 0))
+        size = params.get('maxResults', '')
+        # like JIRA, a missing or unreadable maxResults (the client sends False) gets the default page size
+        size = min(int(size), self.page_size) if size.isdigit() and int(size) else self.page_size
+        return start, size, range(start, min(start + size, total))
+
+    # routes, each answering (status, body)
+
+    def server_info(self, params, body):
+        return 200, {'baseUrl': self.url, 'version': '7.2.0', 'versionNumbers': [7, 2, 0], 'deploymentType': 'Server',
+                     'buildNumber': 72000, 'serverTitle': 'Fake JIRA'}
+
+    def list_fields(self, params, body):
+        return 200, [dict(field, navigable=True, searchable=True) for field in FIELDS]
+
+    def get_project(self, params, body, key):
+        if key not in (PROJECT, str(FIRST_ID)):
+            raise _Reply(404, 'No project could be found with key \'%s\'.' % key)
+        return 200, {'self': '%s/rest/api/2/project/%s' % (self.url, FIRST_ID), 'id': str(FIRST_ID), 'key': PROJECT,
+                     'name': 'Fake project', 'lead': self.user('reporter')}
+
+    def list_issue_types(self, params, body):
+        return 200, [{'self': '%s/rest/api/2/issuetype/1' % self.url, 'id': '1', 'name': 'Bug', 'subtask': False}]
+
+    def search(self, params, body):
+        jql = params.get('jql', '')
+        fields = _requested_fields(params.get('fields'), NAVIGABLE)
+        match = _KEY_IN.search(jql)
+        if match:
+            keys = [key.strip().strip('"\'') for key in match.group(1).split(',')]
+            numbers = [n for n in (self.number(key) for key in keys) if n is not None]
+        else:
+            numbers = [n for n in range(1, self.issues + 1) if n not in self._deleted]
+        start, size, window = self.page(params, len(numbers))
+        issues = [self.issue(numbers[i], fields, params.get('expand')) for i in window]
+        return 200, {'expand': 'schema,names', 'startAt': start, 'maxResults': size, 'total': len(numbers),
+                     'issues': issues}
+
+    def get_issue(self, params, body, key):
+        number = self._existing(key)
+        return 200, self.issue(number, _requested_fields(params.get('fields'), None), params.get('expand'))
+
+    def update_issue(self, params, body, key):
+        number = self._existing(key)
+        with self._lock:
+            self._changes.setdefault(number, {}).update(json.loads(body or '{}').get('fields', {}))
+        return 204, None
+
+    def delete_issue(self, params, body, key):
+        number = self._existing(key)
+        with self._lock:
+            self._deleted.add(number)
+        return 204, None
+
+    def create_issue(self, params, body):
+        return 201, self._create(json.loads(body).get('fields', {}))
+
+    def create_issues(self, params, body):
+        updates = json.loads(body)['issueUpdates']
+        return 201, {'issues': [self._create(update.get('fields', {})) for update in updates], 'errors': []}
+
+    def get_group(self, params, body):
+        match = _USERS_RANGE.search(params.get('expand', ''))
+        start, end = (int(match.group(1)), int(match.group(2))) if match else (0, 49)
+        end = min(end, start + 49, self.group_size - 1)
+        items = [self.user('member%s' % i) for i in range(start, end + 1)]
+        return 200, {'name': params.get('groupname'), 'self': '%s/rest/api/2/group?groupname=%s' % (
+            self.url, params.get('groupname')), 'users': {'size': self.group_size, 'items': items,
+                                                          'max-results': 50, 'start-index': start, 'end-index': end}}
+
+    def get_attachment(self, params, body, attachment_id):
+        number, index = divmod(int(attachment_id), 100)
+        number = self._existing(number)
+        return 200, self.attachment(number, index)
+
+    def add_attachments(self, params, body, key, content_type=''):
+        number = self._existing(key)
+        added = []
+        with self._lock:
+            for filename, content in _multipart_files(body, content_type):
+                index = self.attachments + len([a for a in self._uploaded if a // 100 == FIRST_ID + number])
+                self._uploaded[(FIRST_ID + number) * 100 + index] = (filename, content)
+                added.append(index)
+        return 200, [self.attachment(number, index) for index in added]
+
+    def list_boards(self, params, body):
+        start, size, window = self.page(params, self.boards)
+        values = [{'id': i + 1, 'self': '%s/rest/agile/1.0/board/%s' % (self.url, i + 1),
+                   'name': 'Board %s' % (i + 1), 'type': 'scrum'} for i in window]
+        return 200, {'maxResults': size, 'startAt': start, 'total': self.boards,
+                     'isLast': start + size >= self.boards, 'values': values}
+
+    def list_sprints(self, params, body, board_id):
+        start, size, window = self.page(params, self.sprints)
+        values = [{'id': int(board_id) * 1000 + i + 1, 'self': '%s/rest/agile/1.0/sprint/%s' % (
+            self.url, int(board_id) * 1000 + i + 1), 'state': 'closed', 'name': 'Sprint %s' % (i + 1),
+            'originBoardId': int(board_id), 'startDate': '2016-01-04T10:15:30.000+0000',
+            'endDate': '2016-01-18T10:15:30.000+0000'} for i in window]
+        return 200, {'maxResults': size, 'startAt': start, 'total': self.sprints,
+                     'isLast': start + size >= self.sprints, 'values': values}
+
+    def _existing(self, id_or_key):
+        number = self.number(id_or_key)
+        if number is None:
+            raise _Reply(404, 'Issue Does Not Exist')
+        return number
+
+    def _create(self, fields):
+        with self._lock:
+            self.issues += 1
+            number = self.issues
+            self._changes[number] = dict((name, value) for name, value in fields.items()
+                                         if name in ('summary', 'labels'))
+        return {'id': str(FIRST_ID + number), 'key': '%s-%s' % (PROJECT, number),
+                'self': '%s/rest/api/2/issue/%s' % (self.url, FIRST_ID + number)}
+
+
+def _requested_fields(fields, default):
+    if not fields or fields == '*navigable':
+        return default
+    if fields == '*all':
+        return None
+    return set(field.strip() for field in fields.split(','))
+
+
+def _multipart_files(body, content_type):
+    match = _BOUNDARY.search(content_type)
+    if not match:
+        return []
+    files = []
+    for part in body.split(b'--' + match.group(1).strip('"').encode('ascii')):
+        head, separator, content = part.partition(b'\r\n\r\n')
+        filename = _FILENAME.search(head)
+        if separator and filename:
+            files.append((filename.group(1).decode('utf-8'), content[:-2]))
+    return files
+
+
+ROUTES = [
+    ('GET', r'/rest/api/2/serverInfo', 'server_info'),
+    ('GET', r'/rest/api/2/field', 'list_fields'),
+    ('GET', r'/rest/api/2/project/([^/]+)', 'get_project'),
+    ('GET', r'/rest/api/2/issuetype', 'list_issue_types'),
+    ('GET', r'/rest/api/2/search', 'search'),
+    ('POST', r'/rest/api/2/issue/bulk', 'create_issues'),
+    ('POST', r'/rest/api/2/issue', 'create_issue'),
+    ('POST', r'/rest/api/2/issue/([^/]+)/attachments', 'add_attachments'),
+    ('GET', r'/rest/api/2/issue/([^/]+)', 'get_issue'),
+    ('PUT', r'/rest/api/2/issue/([^/]+)', 'update_issue'),
+    ('DELETE', r'/rest/api/2/issue/([^/]+)', 'delete_issue'),
+    ('GET', r'/rest/api/2/group', 'get_group'),
+    ('GET', r'/rest/api/2/attachment/(\d+)', 'get_attachment'),
+    ('GET', r'/rest/agile/1.0/board', 'list_boards'),
+    ('GET', r'/rest/agile/1.0/board/(\d+)/sprint', 'list_sprints'),
+]
+ROUTES = [(method, re.compile(pattern + '$'), name) for method, pattern, name in ROUTES]
+_CONTENT = re.compile(r'/secure/attachment/(\d+)/[^/]*$')
+_RANGE = re.compile(r'bytes=(\d+)-(\d*)$')
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class _Handler(BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_POST(self):
+        self._handle('POST')
+
+    def do_PUT(self):
+        self._handle('PUT')
+
+    def do_DELETE(self):
+        self._handle('DELETE')
+
+    def _handle(self, method):
+        fake = self.server.fake
+        url = urlparse(self.path)
+        params = dict((name, values[-1]) for name, values in parse_qs(url.query).items())
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        if fake.latency:
+            time.sleep(fake.latency)
+        fake.record(method, url.path)
+
+        try:
+            match = _CONTENT.match(url.path) if method == 'GET' else None
+            if match:
+                return self._send_content(fake.attachment_content(int(match.group(1))))
+            for route_method, pattern, name in ROUTES:
+                match = pattern.match(url.path)
+                if match and route_method == method:
+                    args = [unquote(group) for group in match.groups()]
+                    if name == 'add_attachments':
+                        status, reply = fake.add_attachments(params, body, *args,
+                                                             content_type=self.headers.get('Content-Type', ''))
+                    else:
+                        status, reply = getattr(fake, name)(params, body.decode('utf-8'), *args)
+                    return self._send(status, reply)
+            raise _Reply(404, 'No fake for %s %s' % (method, url.path))
+        except _Reply as e:
+            self._send(e.status, {'errorMessages': [e.message], 'errors': {}})
+        except Exception as e:
+            self._send(500, {'errorMessages': ['%s: %s' % (type(e).__name__, e)], 'errors': {}})
+
+    def _send(self, status, reply):
+        data = json.dumps(reply).encode('utf-8') if reply is not None else b''
+        self.send_response(status)
+        if data:
+            self.send_header('Content-Type', 'application/json;charset=UTF-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_content(self, content):
+        status, start = 200, 0
+        match = _RANGE.match(self.headers.get('Range') or '')
+        if match and int(match.group(1)) < len(content):
+            status, start = 206, int(match.group(1))
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/octet-stream')
+        self.send_header('Content-Length', str(len(content) - start))
+        if status == 206:
+            self.send_header('Content-Range', 'bytes %s-%s/%s' % (start, len(content) - 1, len(content)))
+        self.end_headers()
+        self.wfile.write(content[start:])
+
+
+if __name__ == '__main__':
+    server = FakeJIRA(port=int(sys.argv[1]) if len(sys.argv) > 1 else 0).start()
+    print('Fake JIRA listening on %s, Ctrl-C to stop' % server.url)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
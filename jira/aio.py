@@ -0,0 +1,370 @@
+# -*- coding: utf-8 -*-
+"""
+asyncio counterpart of :py:class:`jira.client.JIRA` for the most used calls, on top of aiohttp.
+
+Requires Python 3.5+ and the ``aiohttp`` package. The coroutines return the same Resource objects as the blocking
+client; the methods of those objects (``update()``, ``delete()``...) keep using a blocking session::
+
+    async with AsyncJIRA('https://jira.atlassian.com', basic_auth=('user', 'secret')) as jira:
+        issue = await jira.issue('JRA-1330')
+"""
+
+import asyncio
+import copy
+import json
+import logging
+import time
+
+import aiohttp
+from six import string_types
+
+from .client import JIRA, ResultList, translate_resource_args
+from .exceptions import JIRAError
+from .resilientsession import ResilientSession, RetryPolicy, raise_on_error
+from .resources import Resource, Issue, Comment, Worklog, Board, Sprint, GreenHopperResource
+from .jsonlib import response_json
+from .utils import json_loads
+
+__all__ = ('AsyncJIRA', )
+
+
+class _Response(object):
+
+    """The parts of a ``requests`` response that :py:func:`raise_on_error` and :py:func:`json_loads` look at."""
+
+    def __init__(self, status, reason, headers, content, url):
+        self.status_code = status
+        self.reason = reason
+        self.headers = headers
+        self.content = content
+        self.url = url
+
+    @property
+    def text(self):
+        # JIRA always answers in UTF-8
+        return self.content.decode('utf-8', 'replace')
+
+    def json(self):
+        return response_json(self)
+
+
+def _query(params):
+    # aiohttp only takes strings: encode the params the way requests does, repeating keys for lists
+    query = []
+    for key, value in (params or {}).items():
+        if value is None:
+            continue
+        for item in (value if isinstance(value, (list, tuple)) else [value]):
+            query.append((key, str(item)))
+    return query
+
+
+class AsyncJIRA(object):
+
+    """
+    Client running the JIRA REST calls as coroutines on an aiohttp session.
+
+    At most ``max_concurrency`` requests are in flight at the same time, however many coroutines are waiting on this
+    client. Requests failing with a temporary error are retried as the ``retry_policy`` option decides, like
+    :py:class:`jira.resilientsession.ResilientSession` does, but the coroutine waits for the retry without blocking the
+    event loop. Unlike :py:class:`jira.client.JIRA` nothing is requested on construction; call :py:meth:`load_fields` to have
+    JQL field names translated in searches.
+
+    :param server: the server address and context path, as for :py:class:`jira.client.JIRA`
+    :param options: the options of :py:class:`jira.client.JIRA`; only the ones about URLs, headers, ``verify``,
+        ``timeout`` and ``retry_policy`` apply
+    :param basic_auth: a (username, password) tuple
+    :param max_concurrency: maximum number of requests in flight
+    :param max_retries: number of times a request failing with a temporary error is retried
+    """
+
+    JIRA_BASE_URL = Resource.JIRA_BASE_URL
+    AGILE_BASE_URL = GreenHopperResource.AGILE_BASE_URL
+
+    def __init__(self, server=None, options=None, basic_auth=None, max_concurrency=20, max_retries=3):
+        self._options = copy.copy(JIRA.DEFAULT_OPTIONS)
+        self._options.update(options or {})
+        if server:
+            self._options['server'] = server
+        if self._options['server'].endswith('/'):
+            self._options['server'] = self._options['server'][:-1]
+
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self._retry_policy = self._options['retry_policy'] or RetryPolicy()
+        self._basic_auth = basic_auth
+        self._fields = {}
+        timeout = self._options['timeout']
+        if isinstance(timeout, (list, tuple)):
+            timeout = sum(timeout)
+        self._timeout = timeout
+        # created by the first request, so they belong to the event loop running it
+        self._semaphore = None
+        self._http = None
+
+        # blocking session handed to the resources, so their own methods keep working
+        self._session = ResilientSession()
+        self._session.verify = self._options['verify']
+        self._session.headers.update(self._options['headers'])
+        if basic_auth:
+            self._session.auth = tuple(basic_auth)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def close(self):
+        if self._http is not None:
+            await self._http.close()
+            self._http = None
+        self._session.close()
+
+    def _start(self):
+        headers = {"Accept": "application/json,*.*;q=0.9"}
+        headers.update(self._options['headers'])
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._http = aiohttp.ClientSession(
+            auth=aiohttp.BasicAuth(*self._basic_auth) if self._basic_auth else None,
+            headers=headers,
+            connector=aiohttp.TCPConnector(limit=self.max_concurrency, verify_ssl=bool(self._options['verify'])))
+
+    _get_url = JIRA._get_url
+    _get_items_from_page = JIRA._get_items_from_page
+    _search_params = JIRA._search_params
+    _untranslate_fields = staticmethod(JIRA._untranslate_fields)
+
+    async def _request(self, verb, url, params=None, data=None):
+        if isinstance(data, dict):
+            data = json.dumps(data)
+        if self._http is None:
+            self._start()
+        started = time.time()
+        retry_number = 0
+        while True:
+            response = None
+            exception = None
+            async with self._semaphore:
+                try:
+                    async with self._http.request(verb, url, params=_query(params), data=data,
+                                                  timeout=self._timeout) as r:
+                        response = _Response(r.status, r.reason, r.headers, await r.read(), str(r.url))
+                except aiohttp.ClientConnectionError as e:
+                    logging.warning("%s while doing %s %s" % (e, verb, url))
+                    exception = e
+            if response is not None and response.status_code == 200:
+                break
+            retry_number += 1
+            delay = self._retry_policy.next_delay(verb, retry_number, response=response, exception=exception,
+                                                  started=started, max_retries=self.max_retries)
+            if delay is None:
+                break
+            logging.warning("Got recoverable error from %s %s, will retry [%s/%s] in %ss" % (
+                verb, url, retry_number,
+                self.max_retries if self._retry_policy.max_retries is None else self._retry_policy.max_retries, delay))
+            await asyncio.sleep(delay)
+        if exception is not None:
+            raise exception
+        raise_on_error(response, verb=verb)
+        return response
+
+    async def _get_json(self, path, params=None, base=JIRA_BASE_URL):
+        r = await self._request('GET', self._get_url(path, base), params=params)
+        try:
+            r_json = json_loads(r)
+        except ValueError as e:
+            logging.error("%s\n%s" % (e, r.text))
+            raise e
+        return r_json
+
+    async def _fetch_pages(self, item_type, items_key, request_path, startAt=0, maxResults=50, params=None,
+                           base=JIRA_BASE_URL):
+        """
+        Coroutine version of :py:meth:`jira.client.JIRA._fetch_pages`.
+
+        When all items are requested and the first page reports a ``total``, the remaining pages are all requested
+        at once.
+        """
+        page_params = params.copy() if params else {}
+        if startAt:
+            page_params['startAt'] = startAt
+        if maxResults:
+            page_params['maxResults'] = maxResults
+        resource = await self._get_json(request_path, params=page_params, base=base)
+        items = self._get_items_from_page(item_type, items_key, resource)
+
+        if not isinstance(resource, dict):
+            return ResultList(items, 0, len(items), len(items), True)
+
+        total = resource.get('total')
+        is_last = resource.get('isLast', False)
+        page_size = resource.get('maxResults') or len(items)
+        if not maxResults and not is_last and items and len(items) == page_size:
+            page_start = (startAt or resource.get('startAt') or 0) + page_size
+
+            async def fetch_page(start):
+                next_params = page_params.copy()
+                next_params['startAt'] = start
+                next_params['maxResults'] = page_size
+                page = await self._get_json(request_path, params=next_params, base=base)
+                return page, self._get_items_from_page(item_type, items_key, page)
+
+            if total is not None:
+                # every remaining page offset is known, request them all at once
+                for page, page_items in await asyncio.gather(*[fetch_page(start)
+                                                               for start in range(page_start, total, page_size)]):
+                    items.extend(page_items)
+            else:
+                while not is_last:
+                    page, page_items = await fetch_page(page_start)
+                    items.extend(page_items)
+                    page_start += page_size
+                    is_last = page.get('isLast', False) or len(page_items) < page_size
+            is_last = True
+
+        return ResultList(items, resource.get('startAt', startAt), resource.get('maxResults', maxResults),
+                          total if total is not None else len(items), is_last)
+
+    async def load_fields(self):
+        """Fetch the fields of the server, so JQL field names can be used in the ``fields`` of searches."""
+        fields = await self._get_json('field')
+        self._fields = {}
+        for f in fields:
+            for name in f.get('clauseNames', ()):
+                self._fields[name] = f['id']
+        return fields
+
+    async def issue(self, id, fields=None, expand=None):
+        """
+        Get an issue Resource from the server.
+
+        :param id: ID or key of the issue to get
+        :param fields: comma-separated string of issue fields to include in the results
+        :param expand: extra information to fetch inside each resource
+        """
+        if type(id) == Issue:
+            return id
+        params = {}
+        if fields is not None:
+            params['fields'] = fields
+        if expand is not None:
+            params['expand'] = expand
+        return Issue(self._options, self._session, await self._get_json('issue/' + str(id), params=params))
+
+    async def search_issues(self, jql_str, startAt=0, maxResults=50, validate_query=True, fields=None, expand=None,
+                            json_result=None):
+        """
+        Get a ResultList of issue Resources matching a JQL search string, see
+        :py:meth:`jira.client.JIRA.search_issues`.
+        """
+        search_params, untranslate = self._search_params(jql_str, validate_query, fields, expand)
+        search_params['startAt'] = startAt
+        search_params['maxResults'] = maxResults
+        if json_result:
+            return await self._get_json('search', params=search_params)
+
+        issues = await self._fetch_pages(Issue, 'issues', 'search', startAt, maxResults, search_params)
+        if untranslate:
+            for i in issues:
+                self._untranslate_fields(i, untranslate)
+        return issues
+
+    @translate_resource_args
+    async def comments(self, issue):
+        """Get a list of comment Resources of an issue."""
+        r_json = await self._get_json('issue/' + str(issue) + '/comment')
+        return [Comment(self._options, self._session, raw_comment_json) for raw_comment_json in r_json['comments']]
+
+    @translate_resource_args
+    async def add_comment(self, issue, body, visibility=None):
+        """Add a comment on an issue and return a Resource for it, see :py:meth:`jira.client.JIRA.add_comment`."""
+        data = {
+            'body': body
+        }
+        if visibility is not None:
+            data['visibility'] = visibility
+        r = await self._request('POST', self._get_url('issue/' + str(issue) + '/comment'), data=data)
+        return Comment(self._options, self._session, raw=json_loads(r))
+
+    @translate_resource_args
+    async def worklogs(self, issue):
+        """Get a list of worklog Resources of an issue."""
+        r_json = await self._get_json('issue/' + str(issue) + '/worklog')
+        return [Worklog(self._options, self._session, raw_worklog_json) for raw_worklog_json in r_json['worklogs']]
+
+    @translate_resource_args
+    async def transitions(self, issue, id=None, expand=None):
+        """Get a list of the transitions available on an issue, see :py:meth:`jira.client.JIRA.transitions`."""
+        params = {}
+        if id is not None:
+            params['transitionId'] = id
+        if expand is not None:
+            params['expand'] = expand
+        return (await self._get_json('issue/' + str(issue) + '/transitions', params=params))['transitions']
+
+    @translate_resource_args
+    async def transition_issue(self, issue, transition, fields=None, comment=None, **fieldargs):
+        """Perform a transition on an issue, see :py:meth:`jira.client.JIRA.transition_issue`."""
+        try:
+            transitionId = int(transition)
+        except ValueError:
+            transitionId = None
+            for t in await self.transitions(issue):
+                if t["name"].lower() == transition.lower():
+                    transitionId = t["id"]
+                    break
+            if transitionId is None:
+                raise JIRAError("Invalid transition name. %s" % transition)
+
+        data = {
+            'transition': {
+                'id': transitionId
+            }
+        }
+        if comment:
+            data['update'] = {'comment': [{'add': {'body': comment}}]}
+        data['fields'] = fields if fields is not None else dict(fieldargs)
+
+        r = await self._request('POST', self._get_url('issue/' + str(issue) + '/transitions'), data=data)
+        try:
+            r_json = json_loads(r)
+        except ValueError as e:
+            logging.error("%s\n%s" % (e, r.text))
+            raise e
+        return r_json
+
+    async def boards(self, startAt=0, maxResults=50, type=None, name=None):
+        """Get a ResultList of board Resources, see :py:meth:`jira.client.JIRA.boards`."""
+        params = {}
+        if type:
+            params['type'] = type
+        if name:
+            params['name'] = name
+
+        if self._options['agile_rest_path'] == GreenHopperResource.GREENHOPPER_REST_PATH:
+            r_json = await self._get_json('rapidviews/list', base=self.AGILE_BASE_URL)
+            boards = [Board(self._options, self._session, raw_boards_json) for raw_boards_json in r_json['views']]
+            return ResultList(boards, 0, len(boards), len(boards), True)
+        return await self._fetch_pages(Board, 'values', 'board', startAt, maxResults, params, base=self.AGILE_BASE_URL)
+
+    @translate_resource_args
+    async def sprints(self, board_id, startAt=0, maxResults=50, state=None):
+        """
+        Get a ResultList of the sprints of a board, see :py:meth:`jira.client.JIRA.sprints`.
+
+        The ``extended`` information of the old GreenHopper API is not supported.
+        """
+        params = {}
+        if state:
+            if isinstance(state, string_types):
+                state = state.split(",")
+            params['state'] = state
+
+        if self._options['agile_rest_path'] == GreenHopperResource.GREENHOPPER_REST_PATH:
+            r_json = await self._get_json('sprintquery/%s?includeHistoricSprints=true&includeFutureSprints=true'
+                                          % board_id, base=self.AGILE_BASE_URL)
+            sprints = [Sprint(self._options, self._session, raw_sprints_json) for raw_sprints_json in r_json['sprints']]
+            return ResultList(sprints, 0, len(sprints), len(sprints), True)
+        return await self._fetch_pages(Sprint, 'values', 'board/%s/sprint' % board_id, startAt, maxResults, params,
+                                       self.AGILE_BASE_URL)
@@ -0,0 +1,239 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+"""
+Board flow metrics computed for many issues at once.
+
+The squad methods of :py:class:`jira.resources.Issue` answer questions about one issue at a time. The functions in
+this module give the same answers for a whole set of issues and any number of squads: the changelogs of all the
+issues are combined into one table, which is scanned a single time.
+"""
+
+from collections import namedtuple
+from datetime import datetime
+
+import pytz
+from six import string_types
+
+from .utils import parse_jira_datetimes, parse_jira_timestamp
+
+__all__ = ('BoardFlow', 'board_flow', 'search_board_flow', 'FLOW_FIELDS')
+
+# The issue fields the flow metrics are computed from; customfield_11100 is the Squad field.
+FLOW_FIELDS = ('created', 'status', 'customfield_11100')
+
+BoardFlow = namedtuple('BoardFlow', [
+    'key',
+    'squad',
+    'current_squad',
+    'native',
+    'seen',
+    'resolved',
+    'entered',
+    'exited',
+    'duration',
+])
+
+
+class _CombinedChangelog(object):
+
+    """
+    The Squad and status changes of many issues in one column oriented table.
+
+    ``issue`` holds the position of the issue every change belongs to, the other columns hold the field, the from
+    and to strings and the creation time string of the change, all in changelog order.
+    """
+
+    def __init__(self, issues):
+        self.keys = []
+        self.created = []
+        self.status = []
+        self.current_squad = []
+        self.has_histories = []
+        self.item_count = []
+
+        self.issue = []
+        self.field = []
+        self.from_string = []
+        self.to_string = []
+        self.change_created = []
+
+        for position, issue in enumerate(issues):
+            raw = getattr(issue, 'raw', issue)
+            fields = raw['fields']
+            try:
+                histories = raw['changelog']['histories']
+            except KeyError:
+                raise ValueError('No changelog found for %s. Did you pass "expand=changelog" when searching for it?'
+                                 % raw.get('key'))
+
+            self.keys.append(raw.get('key'))
+            self.created.append(fields['created'])
+            self.status.append((fields.get('status') or {}).get('name'))
+            self.current_squad.append((fields.get('customfield_11100') or {}).get('value'))
+            self.has_histories.append(bool(histories))
+
+            item_count = 0
+            for history in histories:
+                for item in history['items']:
+                    item_count += 1
+                    field = item.get('field')
+                    if field == 'Squad' or field == 'status':
+                        self.issue.append(position)
+                        self.field.append(field)
+                        self.from_string.append(item.get('fromString') or None)
+                        self.to_string.append(item.get('toString') or None)
+                        self.change_created.append(history['created'])
+            self.item_count.append(item_count)
+
+    def __len__(self):
+        return len(self.keys)
+
+
+def _flows(table, squads, now, epoch):
+    count = len(table)
+    created = parse_jira_datetimes(table.created, epoch=epoch)
+    change_created = parse_jira_datetimes(table.change_created, epoch=epoch)
+    wanted = set(squads)
+
+    # the single pass over the combined changelog
+    done = [None] * count
+    squad_moves = [0] * count
+    moved_elsewhere = [False] * count
+    entered = {}
+    exited = {}
+    seen = set()
+    current_squad = table.current_squad
+    for issue, field, from_string, to_string, change in zip(table.issue, table.field, table.from_string,
+                                                            table.to_string, change_created):
+        if field == 'status':
+            if to_string == 'Done' and done[issue] is None:
+                done[issue] = change
+            continue
+
+        squad_moves[issue] += 1
+        if to_string != current_squad[issue]:
+            moved_elsewhere[issue] = True
+        if to_string in wanted:
+            seen.add((issue, to_string))
+            entered.setdefault((issue, to_string), change)
+        if from_string in wanted:
+            seen.add((issue, from_string))
+            if to_string != from_string:
+                exited.setdefault((issue, from_string), change)
+
+    flows = []
+    for issue in range(count):
+        has_histories = table.has_histories[issue]
+        native = not has_histories or (squad_moves[issue] == table.item_count[issue] and not moved_elsewhere[issue])
+        resolved = table.status[issue] == 'Done'
+        for squad in squads:
+            entry_time = None if native else entered.get((issue, squad))
+            if entry_time is None:
+                entry_time = created[issue]
+
+            if not has_histories:
+                exit_time = None
+            elif resolved and done[issue] is not None:
+                exit_time = done[issue]
+            else:
+                exit_time = exited.get((issue, squad))
+
+            if current_squad[issue] == squad:
+                duration = now - created[issue]
+            elif exit_time is not None:
+                duration = exit_time - entry_time
+            else:
+                duration = None
+
+            flows.append(BoardFlow(
+                key=table.keys[issue],
+                squad=squad,
+                current_squad=current_squad[issue],
+                native=native,
+                seen=current_squad[issue] == squad or (issue, squad) in seen,
+                resolved=resolved,
+                entered=entry_time,
+                exited=exit_time,
+                duration=duration))
+    return flows
+
+
+def _as_array(flows):
+    # flows computed with epoch=True: times and durations are integer milliseconds
+    import numpy
+
+    def width(column):
+        return max([len(value or '') for value in column] or [1]) or 1
+
+    dtype = [
+        ('key', 'U%d' % width(f.key for f in flows)),
+        ('squad', 'U%d' % width(f.squad for f in flows)),
+        ('current_squad', 'U%d' % width(f.current_squad for f in flows)),
+        ('native', '?'),
+        ('seen', '?'),
+        ('resolved', '?'),
+        ('entered', 'datetime64[ms]'),
+        ('exited', 'datetime64[ms]'),
+        ('duration', 'timedelta64[ms]'),
+    ]
+    array = numpy.zeros(len(flows), dtype=dtype)
+    array['key'] = [f.key or '' for f in flows]
+    array['squad'] = [f.squad for f in flows]
+    array['current_squad'] = [f.current_squad or '' for f in flows]
+    array['native'] = [f.native for f in flows]
+    array['seen'] = [f.seen for f in flows]
+    array['resolved'] = [f.resolved for f in flows]
+    nat = numpy.iinfo(numpy.int64).min  # the integer NumPy reads as NaT, standing for None
+    for column, unit in (('entered', 'datetime64[ms]'), ('exited', 'datetime64[ms]'), ('duration', 'timedelta64[ms]')):
+        values = [getattr(f, column) for f in flows]
+        array[column] = numpy.array([nat if v is None else v for v in values], dtype=numpy.int64).view(unit)
+    return array
+
+
+def board_flow(issues, squads, now=None, as_array=False):
+    """
+    Compute the board flow of many issues for one or more squads.
+
+    The answers are the same as those of the squad methods of :py:class:`jira.resources.Issue`: ``native`` is
+    :py:meth:`~jira.resources.Issue.is_native`, ``seen`` is :py:meth:`~jira.resources.Issue.seen_by_squad`,
+    ``entered``, ``exited`` and ``duration`` are the board entry time, exit time and duration. ``duration`` is None
+    where the issue method would fail because the issue never left the board.
+
+    The result is a list of :py:class:`BoardFlow` named tuples, one per issue and squad, which
+    ``pandas.DataFrame.from_records`` accepts as is. With ``as_array`` it is a NumPy structured array instead,
+    with times in epoch milliseconds; NumPy must be installed for that.
+
+    :param issues: issue Resources or raw issue dicts fetched with ``expand='changelog'`` and at least
+        the fields in :py:data:`FLOW_FIELDS`
+    :param squads: a squad name or a list of squad names
+    :param now: aware datetime the duration of issues still on a squad's board is measured to, the current time by
+        default
+    :param as_array: return a NumPy structured array instead of a list
+    """
+    if isinstance(squads, string_types):
+        squads = [squads]
+    else:
+        squads = list(squads)
+    if now is None:
+        now = datetime.now(pytz.utc)
+
+    table = _CombinedChangelog(issues)
+    if not as_array:
+        return _flows(table, squads, now, epoch=False)
+
+    return _as_array(_flows(table, squads, parse_jira_timestamp(now), epoch=True))
+
+
+def search_board_flow(jira, jql_str, squads, now=None, as_array=False, pageSize=100):
+    """
+    Compute the board flow of the issues matching a JQL search string, see :py:func:`board_flow`.
+
+    Only the fields the flow needs are requested, and the issues are streamed page by page.
+
+    :param jira: a connected :py:class:`jira.client.JIRA`
+    :param jql_str: the JQL search string to use
+    :param squads: a squad name or a list of squad names
+    """
+    issues = (issue.raw for issue in jira.iter_issues(jql_str, fields=list(FLOW_FIELDS), expand='changelog',
+                                                          pageSize=pageSize))
+    return board_flow(issues, squads, now=now, as_array=as_array)
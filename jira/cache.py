@@ -0,0 +1,280 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+"""
+Local caches of JIRA data.
+
+:py:class:`MetadataCache` keeps the catalogues of a server (fields, issue types, priorities...) in memory, shared by
+all the clients of the same server and user.
+
+:py:class:`IssueCache` keeps the raw JSON of issues in a SQLite database, so a search that was synced before only has
+to fetch the issues updated since then. Enable it with the ``issue_cache`` option of :py:class:`jira.client.JIRA`
+and keep it up to date with :py:meth:`jira.client.JIRA.sync_issues`.
+"""
+
+import json
+import re
+import threading
+import time
+from datetime import timedelta
+
+from six import string_types
+
+from .jsonlib import loads
+from .utils import get_timezone, parse_jira_datetime, parse_jira_timestamp
+
+__all__ = ('MetadataCache', 'IssueCache')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS issues (
+    key TEXT NOT NULL,
+    variant TEXT NOT NULL,
+    id TEXT,
+    updated TEXT,
+    synced REAL NOT NULL,
+    raw TEXT NOT NULL,
+    PRIMARY KEY (key, variant)
+);
+CREATE INDEX IF NOT EXISTS issues_id ON issues (id, variant);
+CREATE TABLE IF NOT EXISTS queries (
+    jql TEXT NOT NULL,
+    variant TEXT NOT NULL,
+    last_updated TEXT,
+    synced REAL NOT NULL,
+    PRIMARY KEY (jql, variant)
+);
+CREATE TABLE IF NOT EXISTS members (
+    jql TEXT NOT NULL,
+    variant TEXT NOT NULL,
+    key TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    PRIMARY KEY (jql, variant, key)
+);
+"""
+
+_ORDER_BY = re.compile(r'\s+order\s+by\s+.*$', re.IGNORECASE | re.DOTALL)
+
+
+class MetadataCache(object):
+
+    """
+    In memory store of the raw JSON of the catalogues of a JIRA server that seldom change.
+
+    Every entry is named after its REST path (``field``, ``issuetype``...) and is loaded again when it is older than
+    the ``ttl`` asked for by the reader. Use :py:meth:`shared` to get the cache of a server and user, so that all
+    clients of the same server share it.
+    """
+
+    _shared = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def shared(cls, server, user=None):
+        """
+        Return the cache of ``server`` as seen by ``user``, creating it the first time.
+
+        :param user: string identifying the credentials the cache is filled with, None for anonymous clients
+        """
+        with cls._shared_lock:
+            key = (server, user)
+            if key not in cls._shared:
+                cls._shared[key] = cls()
+            return cls._shared[key]
+
+    @classmethod
+    def clear_shared(cls):
+        """Forget the caches of all servers."""
+        with cls._shared_lock:
+            cls._shared.clear()
+
+    def get(self, name, load, ttl):
+        """
+        Return the entry ``name`` if it was loaded less than ``ttl`` seconds ago, otherwise store and return the
+        result of calling ``load``.
+        """
+        with self._lock:
+            entry = self._entries.get(name)
+        if entry is not None and time.time() - entry[0] < ttl:
+            return entry[1]
+        value = load()
+        with self._lock:
+            self._entries[name] = (time.time(), value)
+        return value
+
+    def invalidate(self, name=None):
+        """Drop the entry ``name``, or all entries."""
+        with self._lock:
+            if name is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(name, None)
+
+
+def updated_since_jql(jql_str, updated, timezone=None):
+    """
+    Restrict a JQL search string to the issues updated since the JIRA timestamp ``updated``.
+
+    JQL only compares dates to the minute, in the time zone of the profile of the user, so ``updated`` is converted
+    to ``timezone``, the name of that time zone, and the issues updated during that minute are matched again. Without
+    a known time zone the minute is taken 12 hours before ``updated`` in UTC, the earliest local time anywhere, and
+    the issues updated during those hours are fetched again.
+    """
+    dt = parse_jira_datetime(updated)
+    try:
+        dt = dt.astimezone(get_timezone(timezone)) if timezone else dt - timedelta(hours=12)
+    except KeyError:
+        # unknown to pytz
+        dt -= timedelta(hours=12)
+    since = dt.strftime('%Y/%m/%d %H:%M')
+    match = _ORDER_BY.search(jql_str)
+    order_by = match.group(0) if match else ''
+    jql_str = jql_str[:match.start()] if match else jql_str
+    if jql_str.strip():
+        return '(%s) AND updated >= "%s"%s' % (jql_str, since, order_by)
+    return 'updated >= "%s"%s' % (since, order_by)
+
+
+class IssueCache(object):
+
+    """
+    SQLite store of raw issue JSON and of the results of synced searches.
+
+    Issues are stored per *variant*, the fields and expand parameters they were requested with, so an issue fetched
+    with only some fields is never served in place of the full one.
+
+    :param path: file of the SQLite database, or ``:memory:`` for a cache that only lives as long as this object
+    :param max_age: seconds for which stored issues and search results are served without asking the server again;
+        None serves them until they are invalidated.
+    """
+
+    def __init__(self, path=':memory:', max_age=600):
+        self.path = path
+        self.max_age = max_age
+        self._connect()
+
+    def _connect(self):
+        import sqlite3
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        with self._db:
+            self._db.executescript(_SCHEMA)
+
+    def __getstate__(self):
+        return {'path': self.path, 'max_age': self.max_age}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._connect()
+
+    def close(self):
+        self._db.close()
+
+    @staticmethod
+    def variant(fields=None, expand=None, default_fields='*navigable'):
+        """
+        Name the shape of an issue requested with ``fields`` and ``expand``.
+
+        ``default_fields`` is what the server returns when no fields are given: ``*navigable`` for a search and
+        ``*all`` for a single issue.
+        """
+        if fields is None or fields == []:
+            fields = [default_fields]
+        elif isinstance(fields, string_types):
+            fields = fields.split(',')
+        expand = expand.split(',') if expand else []
+        return '%s|%s' % (','.join(sorted(f.strip() for f in fields)), ','.join(sorted(e.strip() for e in expand)))
+
+    def _fresh_since(self):
+        if self.max_age is None:
+            return float('-inf')
+        return time.time() - self.max_age
+
+    def put_issues(self, raw_issues, variant):
+        """Store the raw JSON of issues of the given variant."""
+        synced = time.time()
+        rows = [(raw['key'], variant, raw.get('id'), raw.get('fields', {}).get('updated'), synced, json.dumps(raw))
+                for raw in raw_issues]
+        with self._lock, self._db:
+            self._db.executemany('INSERT OR REPLACE INTO issues (key, variant, id, updated, synced, raw) '
+                                 'VALUES (?, ?, ?, ?, ?, ?)', rows)
+
+    def get_issue(self, id, variant):
+        """Return the raw JSON of the issue with key or ID ``id`` if it is stored and fresh, None otherwise."""
+        with self._lock:
+            row = self._db.execute('SELECT raw FROM issues WHERE variant = ? AND (key = ? OR id = ?) AND synced >= ?',
+                                   (variant, id, id, self._fresh_since())).fetchone()
+        return loads(row[0]) if row else None
+
+    def last_updated(self, jql_str, variant):
+        """The latest ``updated`` timestamp seen by the syncs of a search, or None if it was never synced."""
+        with self._lock:
+            row = self._db.execute('SELECT last_updated FROM queries WHERE jql = ? AND variant = ?',
+                                   (jql_str, variant)).fetchone()
+        return row[0] if row else None
+
+    def search(self, jql_str, variant, startAt=0, maxResults=None):
+        """
+        Return ``(raw_issues, total)`` for a synced search if its last sync is fresh, None otherwise.
+
+        The issues are in the order of the first sync, followed by the issues that started matching since.
+        """
+        with self._lock:
+            row = self._db.execute('SELECT synced FROM queries WHERE jql = ? AND variant = ?',
+                                   (jql_str, variant)).fetchone()
+            if row is None or row[0] < self._fresh_since():
+                return None
+            total = self._db.execute('SELECT COUNT(*) FROM members WHERE jql = ? AND variant = ?',
+                                     (jql_str, variant)).fetchone()[0]
+            rows = self._db.execute('SELECT i.raw FROM members m JOIN issues i ON i.key = m.key AND i.variant = m.variant '
+                                    'WHERE m.jql = ? AND m.variant = ? ORDER BY m.position LIMIT ? OFFSET ?',
+                                    (jql_str, variant, maxResults if maxResults else -1, startAt)).fetchall()
+        return [loads(raw) for raw, in rows], total
+
+    def record_sync(self, jql_str, variant, raw_issues, full):
+        """
+        Store the issues returned by a sync of a search and add them to its result.
+
+        A ``full`` sync replaces the result of the search, otherwise new issues are appended to it.
+        """
+        raw_issues = list(raw_issues)
+        self.put_issues(raw_issues, variant)
+
+        last_updated = self.last_updated(jql_str, variant)
+        latest = parse_jira_timestamp(last_updated) if last_updated else None
+        for raw in raw_issues:
+            updated = raw.get('fields', {}).get('updated')
+            if updated and (latest is None or parse_jira_timestamp(updated) > latest):
+                last_updated, latest = updated, parse_jira_timestamp(updated)
+
+        with self._lock, self._db:
+            if full:
+                self._db.execute('DELETE FROM members WHERE jql = ? AND variant = ?', (jql_str, variant))
+                position = 0
+            else:
+                position = self._db.execute('SELECT COALESCE(MAX(position) + 1, 0) FROM members '
+                                            'WHERE jql = ? AND variant = ?', (jql_str, variant)).fetchone()[0]
+            rows = [(jql_str, variant, raw['key'], position + i) for i, raw in enumerate(raw_issues)]
+            # issues which already are in the result keep their position
+            self._db.executemany('INSERT OR IGNORE INTO members (jql, variant, key, position) VALUES (?, ?, ?, ?)',
+                                 rows)
+            self._db.execute('INSERT OR REPLACE INTO queries (jql, variant, last_updated, synced) VALUES (?, ?, ?, ?)',
+                             (jql_str, variant, last_updated, time.time()))
+
+    def invalidate(self, key=None):
+        """
+        Stop serving the stored copies of the issue ``key``, and the searches it is part of, until they are synced
+        again; without ``key`` nothing is served any more.
+
+        The stored issues are kept, so the next sync of a search still only fetches the changes.
+        """
+        with self._lock, self._db:
+            if key is None:
+                self._db.execute('UPDATE issues SET synced = 0')
+                self._db.execute('UPDATE queries SET synced = 0')
+            else:
+                self._db.execute('UPDATE issues SET synced = 0 WHERE key = ? OR id = ?', (key, key))
+                self._db.execute('UPDATE queries SET synced = 0 WHERE EXISTS (SELECT 1 FROM members m WHERE '
+                                 'm.jql = queries.jql AND m.variant = queries.variant AND m.key = ?)', (key, ))
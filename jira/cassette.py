@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+"""
+Recording of the HTTP traffic of a client, to replay it later without a server.
+
+A :py:class:`Cassette` given to :py:class:`jira.resilientsession.ResilientSession` (or with the ``cassette`` option of
+:py:class:`jira.client.JIRA`) either records every request sent and the response received into a SQLite file, or
+answers the requests from such a file without touching the network, as fast as possible or with the recorded
+latency. Profiling a search or a changelog analysis against production-shaped data then only needs the server once.
+
+Credentials are never written: the ``Authorization``, ``Cookie`` and ``Set-Cookie`` headers are dropped, so are the
+user names and passwords in URLs, secrets in query strings are replaced, request bodies, which may hold passwords,
+are only kept as an HMAC under a secret which is not written to the file, and the session tokens the authentication
+resources answer with are replaced.
+"""
+
+import hashlib
+import hmac
+import json
+import os
+import re
+import threading
+import time
+import zlib
+from datetime import timedelta
+
+from requests import Response
+from requests.hooks import dispatch_hook
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from six import binary_type, text_type
+from six.moves.urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from .exceptions import JIRAError
+
+__all__ = ('Cassette', )
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS interactions (
+    key TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    method TEXT NOT NULL,
+    url TEXT NOT NULL,
+    status INTEGER NOT NULL,
+    reason TEXT,
+    headers TEXT NOT NULL,
+    body BLOB NOT NULL,
+    elapsed REAL NOT NULL,
+    PRIMARY KEY (key, seq)
+);
+"""
+
+# query parameters and headers which carry credentials
+SECRET_PARAMS = re.compile(r'pass|token|secret|jwt|signature|^oauth_|^os_', re.IGNORECASE)
+SECRET_HEADERS = ('authorization', 'proxy-authorization', 'cookie', 'set-cookie')
+# resources which take passwords and answer with session tokens
+_AUTH_PATH = re.compile(r'/rest/auth/')
+# headers describing the encoding of the body on the wire, which is stored decoded
+_WIRE_HEADERS = ('content-encoding', 'content-length', 'transfer-encoding')
+
+
+def scrub_url(url):
+    """
+    Drop the ``user:password@`` part of ``url``, replace the values of its query parameters that look like
+    credentials, and sort the others.
+    """
+    parts = urlsplit(url)
+    query = sorted((name, 'SCRUBBED' if SECRET_PARAMS.search(name) else value)
+                   for name, value in parse_qsl(parts.query, keep_blank_values=True))
+    netloc = parts.netloc.rpartition('@')[2]
+    return urlunsplit((parts.scheme, netloc, parts.path, urlencode(query), ''))
+
+
+def _scrub_secrets(data):
+    if isinstance(data, dict):
+        return dict((name, 'SCRUBBED' if name == 'value' and 'name' in data or SECRET_PARAMS.search(name)
+                     else _scrub_secrets(value)) for name, value in data.items())
+    if isinstance(data, list):
+        return [_scrub_secrets(value) for value in data]
+    return data
+
+
+def scrub_auth_body(content):
+    """
+    The body of a response of the authentication resources, with the value of its session cookie and the values
+    of the fields that look like credentials replaced, or nothing when it is not JSON.
+    """
+    try:
+        data = json.loads(content.decode('utf-8'))
+    except ValueError:
+        return b''
+    return json.dumps(_scrub_secrets(data)).encode('utf-8')
+
+
+class Cassette(object):
+
+    """
+    SQLite file of recorded requests and responses.
+
+    Requests are matched on their method, their scrubbed URL and an HMAC of their body under ``secret``, except
+    the requests of the authentication resources, whose bodies hold passwords and are not used at all. When the same request was
+    recorded several times, the recordings are replayed in order and the last one is repeated afterwards, so
+    polling and paging replay the way they were recorded.
+
+    :param path: file of the cassette
+    :param mode: ``'record'`` to send the requests and store what they get, starting from an empty cassette, or
+        ``'replay'`` to answer them from the cassette only; a request that was not recorded raises a JIRAError.
+    :param latency: when replaying, wait as long as the server took to answer when it was recorded
+    :param secret: key of the HMAC of the request bodies, which is not stored in the cassette. A random one is
+        used when it is not given, and the requests with a body then only replay through the same cassette or its
+        copies: pass the secret the cassette was recorded with to replay them in another process.
+    """
+
+    def __init__(self, path, mode='replay', latency=False, secret=None):
+        if mode not in ('record', 'replay'):
+            raise ValueError("Cassette mode must be 'record' or 'replay', not %r" % (mode, ))
+        self.path = path
+        self.mode = mode
+        self.latency = latency
+        if secret is None:
+            secret = os.urandom(32)
+        self.secret = secret.encode('utf-8') if isinstance(secret, text_type) else secret
+        self._connect()
+        if mode == 'record':
+            with self._lock, self._db:
+                self._db.execute('DELETE FROM interactions')
+
+    def _connect(self):
+        import sqlite3
+        self._lock = threading.RLock()
+        self._served = {}
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        with self._db:
+            self._db.executescript(_SCHEMA)
+
+    def __getstate__(self):
+        return {'path': self.path, 'mode': self.mode, 'latency': self.latency, 'secret': self.secret}
+
+    def __setstate__(self, state):
+        # a copy of a recording cassette adds to it rather than starting it again
+        self.__dict__.update(state)
+        self._connect()
+
+    def close(self):
+        self._db.close()
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute('SELECT COUNT(*) FROM interactions').fetchone()[0]
+
+    def key(self, request):
+        """The key ``request``, a :py:class:`requests.PreparedRequest`, is recorded and looked up with."""
+        body = request.body
+        if _AUTH_PATH.search(urlsplit(request.url).path):
+            body = None
+        elif 'multipart/form-data' in (request.headers.get('Content-Type') or ''):
+            # the boundary is random, and the files can be streams
+            body = None
+        elif isinstance(body, text_type):
+            body = body.encode('utf-8')
+        elif not isinstance(body, binary_type):
+            body = None
+        digest = hmac.new(self.secret, body, hashlib.sha256).hexdigest() if body else ''
+        return '%s %s %s' % (request.method, scrub_url(request.url), digest)
+
+    def send(self, send, request, **kwargs):
+        """Answer ``request`` from the cassette, or send it with ``send`` and record the response."""
+        if self.mode == 'replay':
+            return self.replay(request, **kwargs)
+        started = time.time()
+        response = send(request, **kwargs)
+        self.record(request, response, time.time() - started)
+        return response
+
+    def record(self, request, response, elapsed):
+        key = self.key(request)
+        headers = dict((name, value) for name, value in response.headers.items()
+                       if name.lower() not in SECRET_HEADERS and name.lower() not in _WIRE_HEADERS)
+        content = response.content
+        if _AUTH_PATH.search(urlsplit(request.url).path):
+            content = scrub_auth_body(content)
+        body = zlib.compress(content)
+        with self._lock, self._db:
+            seq = self._db.execute('SELECT COUNT(*) FROM interactions WHERE key = ?', (key, )).fetchone()[0]
+            self._db.execute('INSERT INTO interactions (key, seq, method, url, status, reason, headers, body, elapsed) '
+                             'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                             (key, seq, request.method, scrub_url(response.url or request.url),
+                              response.status_code, response.reason, json.dumps(headers), body, elapsed))
+
+    def replay(self, request, **kwargs):
+        key = self.key(request)
+        with self._lock:
+            seq = self._served.get(key, 0)
+            row = self._db.execute('SELECT status, reason, headers, body, elapsed FROM interactions WHERE key = ? '
+                                   'AND seq <= ? ORDER BY seq DESC LIMIT 1', (key, seq)).fetchone()
+            if row is not None:
+                self._served[key] = seq + 1
+        if row is None:
+            raise JIRAError(None, 'No recorded response for %s %s in %s' % (request.method, request.url, self.path),
+                            request.url, request=request)
+        status, reason, headers, body, elapsed = row
+        if self.latency:
+            time.sleep(elapsed)
+
+        response = Response()
+        response.status_code = status
+        response.reason = reason
+        response.headers = CaseInsensitiveDict(json.loads(headers))
+        response.encoding = get_encoding_from_headers(response.headers)
+        response._content = zlib.decompress(body)
+        response._content_consumed = True
+        response.url = request.url
+        response.request = request
+        response.elapsed = timedelta(seconds=elapsed)
+        return dispatch_hook('response', request.hooks, response, **kwargs)
@@ -12,14 +12,13 @@ at: https://jira-python.readthedocs.org/en/latest/
 
 from functools import wraps
 
-import imghdr
-import mimetypes
-
 import collections
 import copy
 import os
 import re
 import tempfile
+import threading
+import time
 import logging
 try:  # Python 2.7+
     from logging import NullHandler
@@ -48,23 +47,7 @@ except ImportError:
     from ordereddict import OrderedDict
 
 from six import string_types, integer_types
-# six.moves does not play well with pyinstaller, see https://github.com/pycontribs/jira/issues/38
-# from six.moves import html_parser
-if sys.version_info < (3, 0, 0):
-    import HTMLParser as html_parser
-else:
-    import html.parser as html_parser
 import requests
-try:
-    # noinspection PyUnresolvedReferences
-    from requests_toolbelt import MultipartEncoder
-except:
-    pass
-
-try:
-    from requests_jwt import JWTAuth
-except ImportError:
-    pass
 
 # JIRA specific resources
 from .resources import Resource, Issue, Comment, Project, Attachment, Component, Dashboard, Filter, Votes, Watchers, \
@@ -72,9 +55,11 @@ from .resources import Resource, Issue, Comment, Project, Attachment, Component,
     CustomFieldOption, RemoteLink
 # GreenHopper specific resources
 from .resources import GreenHopperResource, Board, Sprint
-from .resilientsession import ResilientSession, raise_on_error
+from .resilientsession import ResilientSession, RetryLater, raise_on_error
 from .version import __version__
-from .utils import threaded_requests, json_loads, CaseInsensitiveDict
+from .utils import ThreadedRequests, json_loads, CaseInsensitiveDict, thread_pool
+from .jsonlib import response_json
+from .cache import MetadataCache
 from .exceptions import JIRAError
 try:
     from random import SystemRandom
@@ -136,6 +121,15 @@ class ResultList(list):
         self.total = _total
 
 
+def _bulk_error_message(error):
+    if not error:
+        return 'The issue was not created.'
+    element_errors = error.get('elementErrors', {})
+    messages = list(element_errors.get('errorMessages', []))
+    messages.extend('%s: %s' % item for item in sorted(element_errors.get('errors', {}).items()))
+    return ' '.join(messages) or 'HTTP %s' % error.get('status')
+
+
 class QshGenerator:
 
     def __init__(self, context_path):
@@ -173,8 +167,23 @@ class JIRA(object):
         "verify": True,
         "resilient": True,
         "async": False,
+        "async_workers": 10,
         "client_cert": None,
         "check_update": True,
+        "fetch_workers": 1,
+        "lazy_hydration": False,
+        "issue_cache": None,
+        "metadata_cache_ttl": 0,
+        "lazy_startup": False,
+        "startup_snapshot": None,
+        "timeout": None,
+        "pool_connections": 10,
+        "pool_maxsize": None,
+        "keepalive": None,
+        "retry_policy": None,
+        "cassette": None,
+        "metrics": None,
+        "profile": False,
         "headers": {
             'X-Atlassian-Token': 'no-check',
             'Cache-Control': 'no-cache',
@@ -189,6 +198,17 @@ class JIRA(object):
 
     checked_version = False
 
+    # seconds for which a startup_snapshot is used
+    STARTUP_SNAPSHOT_MAX_AGE = 24 * 3600
+
+    # filled on first use by the _version and _fields properties
+    _server_version = None
+    _field_map = None
+    _get_server_info = True
+
+    # longest list of keys put in one JQL search by issues(), in characters
+    ISSUES_JQL_LENGTH = 2000
+
     # TODO: remove these two variables and use the ones defined in resources
     JIRA_BASE_URL = Resource.JIRA_BASE_URL
     AGILE_BASE_URL = GreenHopperResource.AGILE_BASE_URL
@@ -220,6 +240,44 @@ class JIRA(object):
             * verify -- Verify SSL certs. Defaults to ``True``.
             * client_cert -- a tuple of (cert,key) for the requests library for client side SSL
             * check_update -- Check whether using the newest python-jira library version.
+            * async_workers -- number of threads running the requests queued by async updates and deletes. Defaults
+               to ``10``.
+            * fetch_workers -- number of threads used to fetch the remaining pages concurrently when all items of a
+               paged resource are requested (``maxResults=False``). Defaults to ``1``, fetching pages one by one.
+            * lazy_hydration -- Keep the JSON of the returned resources and only turn a property into an attribute
+               object (Resource, list or nested property holder) the first time it is accessed. Defaults to ``False``.
+            * issue_cache -- path of a SQLite file or a :py:class:`jira.cache.IssueCache` to keep issues in, see
+               :py:meth:`sync_issues`. Stored issues and synced searches are served by ``issue()`` and
+               ``search_issues()`` while they are fresh. Defaults to ``None``, no cache.
+            * metadata_cache_ttl -- seconds for which the fields, issue types, priorities, statuses and resolutions of
+               the server are kept in memory, shared by the clients of the same server and credentials, e.g. ``300``.
+               Defaults to ``0``, fetching them on every call.
+            * lazy_startup -- Do not talk to the server while constructing the client: the server version and the field
+               name map are fetched the first time they are needed, and the update check runs in the background.
+               Defaults to ``False``.
+            * startup_snapshot -- path of a JSON file keeping the server version and the field name map between runs.
+               A snapshot of the same server younger than ``STARTUP_SNAPSHOT_MAX_AGE`` seconds is used instead of
+               asking the server. Defaults to ``None``, no snapshot.
+            * timeout -- seconds to wait for the server on every request, or a (connect, read) tuple. Defaults to
+               ``None``, waiting forever.
+            * pool_connections -- number of hosts to keep a connection pool for. Defaults to ``10``.
+            * pool_maxsize -- number of connections kept open to the server. Set it to at least the number of threads
+               sharing the client. Defaults to ``None``, the larger of 10 and ``fetch_workers``.
+            * keepalive -- seconds of inactivity after which TCP keep-alive probes are sent on idle connections.
+               Defaults to ``None``, keep-alive off.
+            * retry_policy -- a :py:class:`jira.resilientsession.RetryPolicy` deciding which failed requests are
+               retried and when, e.g. with a deadline or a retry budget, or without blocking. Defaults to ``None``,
+               retrying 429, 502, 503 and 504 responses and connection errors ``max_retries`` times.
+            * cassette -- a :py:class:`jira.cassette.Cassette` recording the HTTP traffic of the client to a file, or
+               replaying it from there without a server. Defaults to ``None``.
+            * metrics -- a :py:class:`jira.metrics.Metrics` given the latency, retries, backoff, size and status of
+               every request, grouped by endpoint, e.g. ``Metrics(Histogram())``. Defaults to ``None``.
+            * profile -- True to time where the time goes, in JSON decoding, resource hydration, URL building, retry
+               sleeps and network I/O, from the construction of the client to :py:meth:`close`, with a
+               :py:class:`jira.profiling.Profiler` kept as ``profiler``; ``print(jira.profiler)`` shows the summary.
+               The network part only counts the requests of this client, but the other parts are timed for the
+               whole process, other clients and threads included. A Profiler can be given instead of True.
+               Defaults to ``False``.
         :param basic_auth: A tuple of username and password to use when establishing a session via HTTP BASIC
         authentication.
         :param oauth: A dict of properties for OAuth authentication. The following properties are required:
@@ -261,6 +319,8 @@ class JIRA(object):
 
         self._options.update(options)
 
+        self.profiler = None
+
         self._rank = None
 
         # Rip off trailing slash since all urls depend on that
@@ -271,8 +331,6 @@ class JIRA(object):
         if len(context_path) > 0:
             self._options['context_path'] = context_path
 
-        self._try_magic()
-
         if oauth:
             self._create_oauth_session(oauth)
         elif basic_auth:
@@ -281,39 +339,142 @@ class JIRA(object):
         elif jwt:
             self._create_jwt_session(jwt)
         else:
-            verify = self._options['verify']
-            self._session = ResilientSession()
-            self._session.verify = verify
+            self._session = self._create_session()
         self._session.headers.update(self._options['headers'])
 
         self._session.max_retries = max_retries
+        self._session._async_executor = ThreadedRequests(self._options['async_workers'])
+
+        if self._options['profile']:
+            from .profiling import Profiler
+            profiler = self._options['profile']
+            self.profiler = (profiler if isinstance(profiler, Profiler) else Profiler(self._session)).start()
+
+        self._metadata_cache = None
+        if self._options['metadata_cache_ttl']:
+            # keyed by the whole credentials, so that a client never reads what another one was allowed to see
+            if basic_auth:
+                credentials = repr(tuple(basic_auth))
+            elif oauth:
+                credentials = repr(sorted(oauth.items()))
+            elif jwt:
+                credentials = repr((jwt['secret'], sorted(jwt['payload'].items())))
+            else:
+                credentials = None
+            user = hashlib.sha256(credentials.encode('utf-8')).hexdigest() if credentials is not None else None
+            self._metadata_cache = MetadataCache.shared(self._options['server'], user)
+
+        self._issue_cache = None
+        if self._options['issue_cache'] is not None:
+            from .cache import IssueCache
+            issue_cache = self._options['issue_cache']
+            self._issue_cache = issue_cache if isinstance(issue_cache, IssueCache) else IssueCache(issue_cache)
 
         if validate:
             # This will raise an Exception if you are not allowed to login.
             # It's better to fail faster than later.
             self.session()
 
-        if get_server_info:
-            # We need version in order to know what API calls are available or not
-            si = self.server_info()
-            try:
-                self._version = tuple(si['versionNumbers'])
-            except Exception as e:
-                logging.error("invalid server_info: %s", si)
-                raise e
-        else:
-            self._version = (0, 0, 0)
+        self._get_server_info = get_server_info
+        if not self._options['lazy_startup']:
+            self._version = self._load_version()
 
         if self._options['check_update'] and not JIRA.checked_version:
-            self._check_update_()
             JIRA.checked_version = True
+            if self._options['lazy_startup']:
+                update_check = threading.Thread(target=self._check_update_, name='jira-update-check')
+                update_check.daemon = True
+                update_check.start()
+            else:
+                self._check_update_()
+
+        if not self._options['lazy_startup']:
+            self._fields = self._load_fields()
+
+    @property
+    def _version(self):
+        """The version of the server as a tuple of ints, fetched on first use with the ``lazy_startup`` option."""
+        if self._server_version is None:
+            self._server_version = self._load_version()
+        return self._server_version
+
+    @_version.setter
+    def _version(self, version):
+        self._server_version = version
+
+    @property
+    def _fields(self):
+        """Map of the JQL clause names of the fields to their IDs, fetched on first use with ``lazy_startup``."""
+        if self._field_map is None:
+            self._field_map = self._load_fields()
+        return self._field_map
+
+    @_fields.setter
+    def _fields(self, fields):
+        self._field_map = fields
+
+    def _load_version(self):
+        if not self._get_server_info:
+            return (0, 0, 0)
+        snapshot = self._load_startup_snapshot()
+        if 'version' in snapshot:
+            return tuple(snapshot['version'])
+
+        # We need version in order to know what API calls are available or not
+        si = self.server_info()
+        try:
+            version = tuple(si['versionNumbers'])
+        except Exception as e:
+            logging.error("invalid server_info: %s", si)
+            raise e
+        self._save_startup_snapshot(version=list(version))
+        return version
+
+    def _load_fields(self):
+        snapshot = self._load_startup_snapshot()
+        if 'fields' in snapshot:
+            return snapshot['fields']
 
         # TODO: check if this works with non-admin accounts
-        self._fields = {}
+        fields = {}
         for f in self.fields():
             if 'clauseNames' in f:
                 for name in f['clauseNames']:
-                    self._fields[name] = f['id']
+                    fields[name] = f['id']
+        self._save_startup_snapshot(fields=fields)
+        return fields
+
+    def _load_startup_snapshot(self):
+        path = self._options['startup_snapshot']
+        if not path:
+            return {}
+        try:
+            with open(path) as f:
+                snapshot = json.load(f)
+        except (IOError, OSError, ValueError):
+            return {}
+        if snapshot.get('server') != self._options['server'] or \
+                time.time() - snapshot.get('saved', 0) > self.STARTUP_SNAPSHOT_MAX_AGE:
+            return {}
+        return snapshot
+
+    def _save_startup_snapshot(self, **values):
+        path = self._options['startup_snapshot']
+        if not path:
+            return
+        snapshot = self._load_startup_snapshot()
+        snapshot.update(values)
+        snapshot.update(server=self._options['server'], saved=snapshot.get('saved', time.time()))
+        try:
+            # written next to the target and renamed, so readers never see half a file
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)))
+            with os.fdopen(fd, 'w') as f:
+                json.dump(snapshot, f)
+            if os.name == 'nt' and os.path.exists(path):
+                os.remove(path)
+            os.rename(tmp_path, path)
+        except (IOError, OSError) as e:
+            logging.warning("Could not save the startup snapshot %s: %s" % (path, e))
 
     def _check_update_(self):
         # check if the current version of the library is outdated
@@ -330,9 +491,25 @@ class JIRA(object):
         except Exception as e:
             logging.warning(e)
 
+    def close(self):
+        """
+        Stop the profiler of the ``profile`` option, let the queued async requests finish and close the connections
+        of the client.
+        """
+        if self.profiler is not None:
+            self.profiler.stop()
+        self._session._async_executor.close()
+        self._session.close()
+
     def __del__(self):
+        profiler = getattr(self, "profiler", None)
+        if profiler is not None:
+            profiler.stop()
         session = getattr(self, "_session", None)
         if session is not None:
+            executor = getattr(session, '_async_executor', None)
+            if executor is not None:
+                executor.close()
             if sys.version_info < (3, 4, 0):  # workaround for https://github.com/kennethreitz/requests/issues/2303
                 session.close()
 
@@ -356,6 +533,8 @@ class JIRA(object):
         :param startAt: index of the first record to be fetched
         :param maxResults: Maximum number of items to return.
                 If maxResults evaluates as False, it will try to get all items in batches.
+                Once the first page reports a ``total``, the remaining pages are requested
+                concurrently on up to ``fetch_workers`` threads (see the ``options`` of :py:class:`JIRA`).
         :param params: Params to be used in all requests. Should not contain startAt and maxResults,
                         as they will be added for each request created from this function.
         :param base: base URL
@@ -368,8 +547,7 @@ class JIRA(object):
         if maxResults:
             page_params['maxResults'] = maxResults
         resource = self._get_json(request_path, params=page_params, base=base)
-        next_items_page = [item_type(self._options, self._session, raw_issue_json) for raw_issue_json in
-                           (resource[items_key] if items_key else resource)]
+        next_items_page = self._get_items_from_page(item_type, items_key, resource)
         items = next_items_page
 
         if True:  # isinstance(resource, dict):
@@ -377,7 +555,7 @@ class JIRA(object):
             if isinstance(resource, dict):
                 total = resource.get('total', 1)
                 # 'isLast' is the optional key added to responses in JIRA Agile 6.7.6. So far not used in basic JIRA API.
-                is_last = resource.get('isLast', True)
+                is_last = resource.get('isLast', False)
                 start_at_from_response = resource.get('startAt', 0)
                 max_results_from_response = resource.get('maxResults', 1)
             else:
@@ -391,20 +569,123 @@ class JIRA(object):
             if not maxResults:
                 page_size = max_results_from_response or len(items)
                 page_start = (startAt or start_at_from_response or 0) + page_size
-                while not is_last and (total is None or page_start < total) and len(next_items_page) == page_size:
-                    page_params['startAt'] = page_start
-                    page_params['maxResults'] = page_size
-                    resource = self._get_json(request_path, params=page_params, base=base)
-                    next_items_page = [item_type(self._options, self._session, raw_issue_json) for raw_issue_json in
-                                       (resource[items_key] if items_key else resource)]
-                    items.extend(next_items_page)
-                    page_start += page_size
+                if not is_last and len(next_items_page) == page_size and self._options['fetch_workers'] > 1 \
+                        and 'total' in resource:
+                    # The total is known, so every remaining page offset is known as well.
+                    page_starts = list(range(page_start, total, page_size))
+                    for page in self._fetch_pages_concurrently(request_path, page_params, page_starts, page_size,
+                                                               base):
+                        items.extend(self._get_items_from_page(item_type, items_key, page))
+                else:
+                    while not is_last and (total is None or page_start < total) and \
+                            len(next_items_page) == page_size:
+                        page_params['startAt'] = page_start
+                        page_params['maxResults'] = page_size
+                        resource = self._get_page_json(request_path, page_params, base)
+                        next_items_page = self._get_items_from_page(item_type, items_key, resource)
+                        items.extend(next_items_page)
+                        page_start += page_size
+                        if isinstance(resource, dict):
+                            is_last = resource.get('isLast', False)
+                # every page up to the last one has been fetched
+                is_last = True
+            elif isinstance(resource, dict) and 'total' in resource:
+                is_last = is_last or start_at_from_response + len(items) >= total
 
             return ResultList(items, start_at_from_response, max_results_from_response, total, is_last)
         else:
             # it seams that search_users can return a list() containing a single user!
             return ResultList([item_type(self._options, self._session, resource)], 0, 1, 1, True)
 
+    def _get_items_from_page(self, item_type, items_key, resource):
+        return [item_type(self._options, self._session, raw_issue_json) for raw_issue_json in
+                (resource[items_key] if items_key else resource)]
+
+    def _get_page_json(self, request_path, params, base=JIRA_BASE_URL):
+        """
+        :py:meth:`_get_json` for the pages of a paged fetch, which waits for the retries a non-blocking
+        :py:class:`jira.resilientsession.RetryPolicy` defers rather than losing the pages fetched so far.
+        """
+        try:
+            return self._get_json(request_path, params=params, base=base)
+        except RetryLater as e:
+            later = e
+        while True:
+            time.sleep(later.delay)
+            try:
+                return json_loads(later.retry())
+            except RetryLater as e:
+                later = e
+
+    def _fetch_pages_concurrently(self, request_path, params, page_starts, page_size, base=JIRA_BASE_URL):
+        """
+        Fetch the raw JSON of several pages at once and return them in the order of ``page_starts``.
+
+        The pages are requested on a pool of at most ``fetch_workers`` threads which all share the client session.
+        """
+        def fetch_page(page_start):
+            page_params = params.copy()
+            page_params['startAt'] = page_start
+            page_params['maxResults'] = page_size
+            return self._get_page_json(request_path, page_params, base)
+
+        if not page_starts:
+            return []
+        pool = thread_pool(min(self._options['fetch_workers'], len(page_starts)))
+        try:
+            # map() keeps the results in the same order as the page offsets
+            return pool.map(fetch_page, page_starts)
+        finally:
+            pool.close()
+            pool.join()
+
+    def _iter_pages(self, item_type, items_key, request_path, startAt=0, maxResults=None, params=None, pageSize=50,
+                    base=JIRA_BASE_URL):
+        """
+        Generator counterpart of :py:meth:`_fetch_pages` which yields the items one page at a time.
+
+        While the items of a page are being consumed the next page is already requested on a background thread, so
+        at most two pages are held in memory at any time.
+
+        :param maxResults: Maximum number of items to yield. If it evaluates as False, all items are yielded.
+        :param pageSize: Number of items to request per page; the server may return less.
+        """
+        def fetch_page(page_start, page_size):
+            page_params = params.copy() if params else {}
+            page_params['startAt'] = page_start
+            page_params['maxResults'] = page_size
+            return self._get_page_json(request_path, page_params, base)
+
+        def page_size_for(page_start):
+            if maxResults:
+                return min(pageSize, startAt + maxResults - page_start)
+            return pageSize
+
+        pool = thread_pool(1)
+        try:
+            page_start = startAt
+            pending = pool.apply_async(fetch_page, (page_start, page_size_for(page_start)))
+            while pending is not None:
+                resource = pending.get()
+                raw_items = resource[items_key] if items_key else resource
+                if maxResults:
+                    raw_items = raw_items[:startAt + maxResults - page_start]
+                page_start += len(raw_items)
+
+                pending = None
+                if isinstance(resource, dict) and raw_items and not resource.get('isLast', False) and \
+                        page_start < resource.get('total', page_start + 1) and \
+                        (not maxResults or page_start < startAt + maxResults):
+                    pending = pool.apply_async(fetch_page, (page_start, page_size_for(page_start)))
+
+                # drop the references to the page so only its remaining items are kept alive while yielding
+                resource = None
+                raw_items.reverse()
+                while raw_items:
+                    yield item_type(self._options, self._session, raw_items.pop())
+        finally:
+            pool.close()
+
     # Information about this client
 
     def client_info(self):
@@ -437,17 +718,30 @@ class JIRA(object):
         resource.find(ids)
         return resource
 
-    def async_do(self, size=10):
+    def async_do(self, size=None):
         """
-        This will execute all async jobs and wait for them to finish. By default it will run on 10 threads.
+        Wait for all queued async jobs to finish and return them.
 
-        size: number of threads to run on.
-        :return:
+        Async updates and deletes start as soon as they are queued, on a pool of ``async_workers`` threads. Each
+        returned :py:class:`jira.utils.AsyncJob` has the ``response`` and ``status_code`` of its request, or the
+        ``exception`` it failed with. The jobs are removed from the queue.
+
+        :param size: not used any more; set the ``async_workers`` option to choose the number of threads.
+        :return: list of AsyncJob
         """
-        if hasattr(self._session, '_async_jobs'):
-            logging.info("Executing async %s jobs found in queue by using %s threads..." % (
-                len(self._session._async_jobs), size))
-            threaded_requests.map(self._session._async_jobs, size=size)
+        jobs = getattr(self._session, '_async_jobs', None)
+        if not jobs:
+            return []
+        logging.info("Waiting for %s async jobs found in queue..." % len(jobs))
+        # take the jobs queued until now, jobs queued while waiting are left for the next call
+        done = jobs[:]
+        del jobs[:len(done)]
+        ThreadedRequests.map(done)
+        failed = [job for job in done if job.exception is not None]
+        if failed:
+            logging.warning("%s of %s async jobs failed, first error: %s" % (len(failed), len(done),
+                                                                             failed[0].exception))
+        return done
 
             # Application properties
 
@@ -533,39 +827,206 @@ class JIRA(object):
             logging.warning(
                 "%s was not opened in 'rb' mode, attaching file may fail." % attachment.name)
 
-        # TODO: Support attaching multiple files at once?
-        url = self._get_url('issue/' + str(issue) + '/attachments')
-
         fname = filename
         if not fname:
             fname = os.path.basename(attachment.name)
 
-        if 'MultipartEncoder' not in globals():
+        method, r, attachments = self._post_attachments(issue, [(fname, attachment)])
+        attachment = attachments[0]
+        if attachment.size == 0:
+            raise JIRAError("Added empty attachment via %s method?!: r: %s\nattachment: %s" % (method, r, attachment))
+        return attachment
+
+    @translate_resource_args
+    def add_attachments(self, issue, files):
+        """
+        Attach several files to an issue with a single multipart request and return a list of Resources for them.
+
+        The files are streamed from disk, not read into memory, when requests_toolbelt is installed. Files given as
+        paths are opened and closed by this method; file-like objects are left open.
+
+        :param issue: the issue to attach the files to
+        :param files: file names, file-like objects opened in ``'rb'`` mode, or ``(filename, file)`` pairs where the
+            file is a file name or a file-like object and ``filename`` is the name to attach it as
+        :rtype: list of Attachment Resources
+        """
+        parts, opened = [], []
+        try:
+            for item in files:
+                fname, attachment = item if isinstance(item, tuple) else (None, item)
+                if isinstance(attachment, string_types):
+                    attachment = open(attachment, 'rb')
+                    opened.append(attachment)
+                if hasattr(attachment, 'read') and hasattr(attachment, 'mode') and attachment.mode != 'rb':
+                    logging.warning(
+                        "%s was not opened in 'rb' mode, attaching file may fail." % attachment.name)
+                parts.append((fname or os.path.basename(attachment.name), attachment))
+            if not parts:
+                return []
+            return self._post_attachments(issue, parts)[2]
+        finally:
+            for attachment in opened:
+                attachment.close()
+
+    def bulk_add_attachments(self, uploads, workers=None):
+        """
+        Attach files to many issues, one :py:meth:`add_attachments` request per issue, on a pool of threads sharing
+        the client session, and return a result for every upload.
+
+        A failed upload does not stop the others. Each result is a dict of:
+
+        * status -- ``'Success'`` or ``'Error'``
+        * issue -- the issue the files were for
+        * attachments -- the list of attachment Resources, empty on error
+        * error -- the error message, None on success
+
+        :param uploads: ``(issue, files)`` pairs, or a dict of files by issue, as accepted by :py:meth:`add_attachments`.
+            Files given as paths are only opened while they are uploaded.
+        :param workers: number of uploads running at the same time, ``fetch_workers`` by default (see the ``options``
+            of :py:class:`JIRA`)
+        """
+        if isinstance(uploads, dict):
+            uploads = uploads.items()
+        uploads = list(uploads)
+
+        def upload(item):
+            issue, files = item
+            result = {'status': None, 'issue': issue, 'attachments': [], 'error': None}
+            try:
+                result['attachments'] = self.add_attachments(issue, files)
+                result['status'] = 'Success'
+            except (JIRAError, IOError, OSError) as e:
+                result['status'] = 'Error'
+                result['error'] = e.text if isinstance(e, JIRAError) else "%s" % e
+            return result
+
+        workers = min(workers or self._options['fetch_workers'], len(uploads))
+        if workers > 1:
+            pool = thread_pool(workers)
+            try:
+                return pool.map(upload, uploads)
+            finally:
+                pool.close()
+        return [upload(item) for item in uploads]
+
+    def _post_attachments(self, issue, parts):
+        """
+        Send ``(filename, file)`` parts in one multipart request and return the method used, the response and the
+        attachment Resources.
+        """
+        url = self._get_url('issue/' + str(issue) + '/attachments')
+        # where each file started, to send it again from there when the request is retried
+        positions = [attachment.tell() if hasattr(attachment, 'tell') else None for fname, attachment in parts]
+
+        def rewind():
+            for (fname, attachment), position in zip(parts, positions):
+                if position is not None:
+                    attachment.seek(position)
+
+        def fields():
+            return [('file', (fname, attachment, 'application/octet-stream')) for fname, attachment in parts]
+
+        try:
+            # noinspection PyUnresolvedReferences
+            from requests_toolbelt import MultipartEncoder
+        except ImportError:
+            MultipartEncoder = None
+
+        if MultipartEncoder is None:
             method = 'old'
+
+            def rewound():
+                rewind()
+                return {}
             r = self._session.post(
                 url,
-                files={
-                    'file': (fname, attachment, 'application/octet-stream')},
-                headers=CaseInsensitiveDict({'content-type': None, 'X-Atlassian-Token': 'nocheck'}))
+                files=fields(),
+                headers=CaseInsensitiveDict({'content-type': None, 'X-Atlassian-Token': 'nocheck'}), retry_data=rewound)
         else:
             method = 'MultipartEncoder'
 
+            boundary = []
+
+            def encoder_fields():
+                # MultipartEncoder sends the whole value of in-memory streams, wherever they are positioned
+                return [(name, (fname, attachment.getvalue()[position:]
+                                if position and hasattr(attachment, 'getvalue') else attachment, ctype))
+                        for (name, (fname, attachment, ctype)), position in zip(fields(), positions)]
+
             def file_stream():
-                return MultipartEncoder(
-                    fields={
-                        'file': (fname, attachment, 'application/octet-stream')}
-                )
+                rewind()
+                # the content-type header names the boundary, so a retry must use the same one
+                m = MultipartEncoder(fields=encoder_fields(), boundary=boundary[0] if boundary else None)
+                boundary[:] = [m.boundary_value]
+                return m
             m = file_stream()
             r = self._session.post(
                 url, data=m, headers=CaseInsensitiveDict({'content-type': m.content_type, 'X-Atlassian-Token': 'nocheck'}), retry_data=file_stream)
 
         js = json_loads(r)
-        if not js or not isinstance(js, collections.Iterable):
+        if not js or not isinstance(js, list):
             raise JIRAError("Unable to parse JSON: %s" % js)
-        attachment = Attachment(self._options, self._session, js[0])
-        if attachment.size == 0:
-            raise JIRAError("Added empty attachment via %s method?!: r: %s\nattachment: %s" % (method, r, attachment))
-        return attachment
+        return method, r, [Attachment(self._options, self._session, raw) for raw in js]
+
+    def download_attachments(self, issues, dest_dir, workers=None, chunk_size=1024 * 1024):
+        """
+        Download the attachments of many issues to ``dest_dir/<issue key>/<file name>``.
+
+        Every file is streamed to disk by :py:meth:`jira.resources.Attachment.download`, so files already downloaded
+        are skipped and interrupted downloads are resumed when this is run again. Attachments of an issue that share
+        a file name are saved as ``<attachment id>-<file name>``. The downloads run on a pool of ``workers`` threads
+        sharing the client session.
+
+        Returns the paths of the downloaded files, in the order of the issues and of their attachments.
+
+        :param issues: issue keys, IDs or Issue Resources. Issues fetched without the ``attachment`` field are
+            fetched again with :py:meth:`issues`.
+        :param dest_dir: directory to download to, created if missing
+        :param workers: number of files downloaded at the same time, ``fetch_workers`` by default (see the
+            ``options`` of :py:class:`JIRA`)
+        :param chunk_size: bytes read from the connection and written at a time
+        """
+        def has_attachments(issue):
+            return isinstance(issue, Issue) and hasattr(issue.fields, 'attachment')
+
+        issues = list(issues)
+        to_fetch = [issue for issue in issues if not has_attachments(issue)]
+        if to_fetch:
+            found = {}
+            for issue in self.issues(to_fetch, fields='attachment'):
+                found[issue.key] = found[issue.id] = issue
+            issues = [issue if has_attachments(issue) else found.get(issue.key if isinstance(issue, Issue) else str(issue))
+                      for issue in issues]
+            issues = [issue for issue in issues if issue is not None]
+
+        downloads = []
+        for issue in issues:
+            issue_dir = os.path.join(dest_dir, issue.key)
+            attachments = issue.fields.attachment or []
+            names = collections.Counter(attachment.filename for attachment in attachments)
+            for attachment in attachments:
+                filename = os.path.basename(attachment.filename)
+                if names[attachment.filename] > 1:
+                    filename = '%s-%s' % (attachment.id, filename)
+                downloads.append((attachment, os.path.join(issue_dir, filename)))
+
+        for issue_dir in set(os.path.dirname(path) for attachment, path in downloads):
+            if not os.path.isdir(issue_dir):
+                os.makedirs(issue_dir)
+
+        def download(item):
+            attachment, path = item
+            attachment.download(path, chunk_size=chunk_size)
+            return path
+
+        workers = min(workers or self._options['fetch_workers'], len(downloads))
+        if workers > 1:
+            pool = thread_pool(workers)
+            try:
+                return pool.map(download, downloads)
+            finally:
+                pool.close()
+        return [download(item) for item in downloads]
 
     # Components
 
@@ -659,7 +1120,24 @@ class JIRA(object):
     # non-resource
     def fields(self):
         """Return a list of all issue fields."""
-        return self._get_json('field')
+        return self._get_metadata_json('field')
+
+    def _get_metadata_json(self, path):
+        # the catalogues served from the metadata cache, see the metadata_cache_ttl option
+        if self._metadata_cache is None:
+            return self._get_json(path)
+        return copy.deepcopy(self._metadata_cache.get(path, lambda: self._get_json(path),
+                                                      self._options['metadata_cache_ttl']))
+
+    def invalidate_metadata(self, name=None):
+        """
+        Make the next call fetch a catalogue from the server again instead of using the metadata cache.
+
+        :param name: REST path of the catalogue: ``field``, ``issuetype``, ``priority``, ``status`` or
+            ``resolution``. All of them by default.
+        """
+        if self._metadata_cache is not None:
+            self._metadata_cache.invalidate(name)
 
     # Filters
 
@@ -730,7 +1208,7 @@ class JIRA(object):
         r = self._session.put(url, headers={'content-type': 'application/json'},
                               data=json.dumps(data))
 
-        raw_filter_json = json.loads(r.text)
+        raw_filter_json = json_loads(r)
         return Filter(self._options, self._session, raw=raw_filter_json)
 
 # Groups
@@ -834,6 +1312,12 @@ class JIRA(object):
         if type(id) == Issue:
             return id
 
+        if self._issue_cache is not None:
+            variant = self._issue_cache.variant(fields, expand, default_fields='*all')
+            raw_issue_json = self._issue_cache.get_issue(id, variant)
+            if raw_issue_json is not None:
+                return Issue(self._options, self._session, raw_issue_json)
+
         issue = Issue(self._options, self._session)
 
         params = {}
@@ -842,8 +1326,108 @@ class JIRA(object):
         if expand is not None:
             params['expand'] = expand
         issue.find(id, params=params)
+
+        if self._issue_cache is not None:
+            self._issue_cache.put_issues([issue.raw], variant)
         return issue
 
+    def issues(self, keys, fields=None, expand=None, chunk=100):
+        """
+        Get the issue Resources for many issue keys or IDs with a few searches instead of one request per issue.
+
+        The keys are split into ``key in (...)`` JQL searches of at most ``chunk`` keys, and short enough to stay
+        well under URL length limits. The searches run on up to ``fetch_workers`` threads at once (see the
+        ``options`` of :py:class:`JIRA`).
+
+        The issues are returned in the order of ``keys``. Keys are matched whatever their case, and the old keys of
+        moved issues, which JIRA still finds, match the issues under their current key. Keys that do not match an
+        issue the user can see are left out; they are listed in the ``missing`` attribute of the returned ResultList
+        and reported with a warning.
+
+        :param keys: keys or IDs of the issues to get; Issue Resources are accepted as well
+        :param fields: comma-separated string of issue fields to include in the results. Defaults to all fields,
+            like :py:meth:`issue`.
+        :param expand: extra information to fetch inside each resource
+        :param chunk: maximum number of keys per search
+        """
+        keys = [key.key if isinstance(key, Issue) else str(key) for key in keys]
+        if fields is None:
+            fields = '*all'
+
+        found = {}
+        if self._issue_cache is not None:
+            variant = self._issue_cache.variant(fields, expand, default_fields='*all')
+            for key in keys:
+                raw_issue_json = self._issue_cache.get_issue(key, variant)
+                if raw_issue_json is not None:
+                    found[key.upper()] = Issue(self._options, self._session, raw_issue_json)
+
+        chunks = []
+        pending, length = [], 0
+        for key in OrderedDict.fromkeys(k for k in keys if k.upper() not in found):
+            if pending and (len(pending) >= chunk or length + len(key) + 3 > self.ISSUES_JQL_LENGTH):
+                chunks.append(pending)
+                pending, length = [], 0
+            pending.append(key)
+            length += len(key) + 3
+        if pending:
+            chunks.append(pending)
+
+        def search_chunk(chunk_keys):
+            jql = 'key in (%s)' % ','.join('"%s"' % key for key in chunk_keys)
+            return self.search_issues(jql, maxResults=False, validate_query=False, fields=fields, expand=expand)
+
+        workers = min(self._options['fetch_workers'], len(chunks))
+        if workers > 1:
+            pool = thread_pool(workers)
+            try:
+                results = pool.map(search_chunk, chunks)
+            finally:
+                pool.close()
+        else:
+            results = [search_chunk(chunk_keys) for chunk_keys in chunks]
+
+        requested = set(key.upper() for key in keys)
+        fetched = []
+        moved = []
+        for chunk_keys, result in zip(chunks, results):
+            unmatched = []
+            for issue in result:
+                fetched.append(issue.raw)
+                if issue.key in requested or issue.id in requested:
+                    found[issue.key] = found[issue.id] = issue
+                else:
+                    unmatched.append(issue)
+            if unmatched:
+                # issues found by the key they had before being moved to another project
+                moved.append(([key for key in chunk_keys if key.upper() not in found], unmatched))
+        if self._issue_cache is not None and fetched:
+            self._issue_cache.put_issues(fetched, variant)
+
+        extra = []
+        for old_keys, unmatched in moved:
+            if len(old_keys) == 1 and len(unmatched) == 1:
+                found[old_keys[0].upper()] = unmatched[0]
+                continue
+            # the search does not tell which old key found which issue, the issue resource does
+            by_id = dict((issue.id, issue) for issue in unmatched)
+            for key in old_keys:
+                try:
+                    issue = self.issue(key, fields='key')
+                except JIRAError:
+                    continue
+                found[key.upper()] = by_id.pop(issue.id, None) or self.issue(key, fields=fields, expand=expand)
+            # none of the keys answered with these: they are still returned, after the others
+            extra.extend(issue for issue in unmatched if issue.id in by_id)
+
+        ordered = [found[key.upper()] for key in keys if key.upper() in found] + extra
+        issues = ResultList(ordered, 0, len(keys), len(ordered), True)
+        issues.missing = [key for key in keys if key.upper() not in found]
+        if issues.missing:
+            warnings.warn('%s of %s issues were not found: %s' % (
+                len(issues.missing), len(keys), ', '.join(issues.missing)), Warning)
+        return issues
+
     def create_issue(self, fields=None, prefetch=True, **fieldargs):
         """
         Create a new issue and return an issue Resource for it.
@@ -894,6 +1478,114 @@ class JIRA(object):
         else:
             return Issue(self._options, self._session, raw=raw_issue_json)
 
+    def create_issues(self, field_list, prefetch=False, batch=50):
+        """
+        Create many issues with the bulk create REST call and return a result for each of them.
+
+        Each item of ``field_list`` is a dict of fields, as the ``fields`` argument of :py:meth:`create_issue`.
+        Project keys or IDs and issue type names are resolved to IDs once for the whole list, and the issues are sent
+        ``batch`` at a time.
+
+        A batch which fails as a whole, e.g. because the server cannot be reached, gives an error for each of its issues
+        and the next batches are still sent, so the results always tell which issues were created.
+
+        Every result is a dict with:
+
+        * status -- ``'Success'`` or ``'Error'``
+        * issue -- the created issue Resource, None on error
+        * error -- the error message, None on success
+        * input_fields -- the fields given for the issue
+
+        :param field_list: list of dicts of fields, one per issue to create
+        :param prefetch: reload the created issues, with a few searches, to return complete issue Resources
+        :param batch: number of issues sent in one request
+        """
+        projects = {}
+        issue_types = {}
+
+        def project_id(project):
+            if project not in projects:
+                # a failed lookup is kept too, not to look an unknown project up again for each of its issues
+                try:
+                    projects[project] = self.project(project).id
+                except JIRAError as e:
+                    projects[project] = e
+            if isinstance(projects[project], JIRAError):
+                raise projects[project]
+            return projects[project]
+
+        def issue_type_id(name):
+            if not issue_types:
+                issue_types.update((it.name, it.id) for it in self.issue_types())
+            if name not in issue_types:
+                raise KeyError("Issue type '%s' is unknown." % name)
+            return issue_types[name]
+
+        results = []
+        to_create = []
+        for input_fields in field_list:
+            result = {'status': None, 'issue': None, 'error': None, 'input_fields': input_fields}
+            results.append(result)
+            fields = dict(input_fields)
+            try:
+                p = fields['project']
+                if isinstance(p, string_types) or isinstance(p, integer_types):
+                    fields['project'] = {'id': project_id(p)}
+                p = fields['issuetype']
+                if isinstance(p, integer_types):
+                    fields['issuetype'] = {'id': str(p)}
+                elif isinstance(p, string_types):
+                    fields['issuetype'] = {'id': issue_type_id(p)}
+            except (JIRAError, KeyError) as e:
+                result['status'] = 'Error'
+                result['error'] = e.text if isinstance(e, JIRAError) else "%s" % e.args[0]
+                continue
+            to_create.append((result, fields))
+
+        url = self._get_url('issue/bulk')
+        for start in range(0, len(to_create), batch):
+            part = to_create[start:start + batch]
+            try:
+                r = self._session.post(url, data=json.dumps({'issueUpdates': [{'fields': f} for _, f in part]}))
+                r_json = json_loads(r)
+            except JIRAError as e:
+                # JIRA answers 400 when none of the issues could be created, with the same body
+                try:
+                    r_json = response_json(e.response)
+                except (AttributeError, ValueError):
+                    r_json = {}
+                if not r_json.get('errors'):
+                    for result, _ in part:
+                        result['status'] = 'Error'
+                        result['error'] = e.text or "%s" % e
+                    continue
+            except Exception as e:
+                # e.g. the connection failed for good: the batches already sent keep their results
+                for result, _ in part:
+                    result['status'] = 'Error'
+                    result['error'] = "%s" % e
+                continue
+
+            errors = dict((error['failedElementNumber'], error) for error in r_json.get('errors', []))
+            created = iter(r_json.get('issues', []))
+            for number, (result, _) in enumerate(part):
+                raw_issue_json = None if number in errors else next(created, None)
+                if raw_issue_json is None:
+                    result['status'] = 'Error'
+                    result['error'] = _bulk_error_message(errors.get(number))
+                else:
+                    result['status'] = 'Success'
+                    result['issue'] = Issue(self._options, self._session, raw=raw_issue_json)
+
+        if prefetch:
+            created = [result for result in results if result['status'] == 'Success']
+            issues = self.issues([result['issue'].key for result in created])
+            by_key = dict((issue.key, issue) for issue in issues)
+            for result in created:
+                result['issue'] = by_key.get(result['issue'].key, result['issue'])
+
+        return results
+
     def createmeta(self, projectKeys=None, projectIds=[], issuetypeIds=None, issuetypeNames=None, expand=None):
         """
         Gets the metadata required to create issues, optionally filtered by projects and issue types.
@@ -1426,7 +2118,7 @@ class JIRA(object):
 
     def issue_types(self):
         """Get a list of issue type Resources from the server."""
-        r_json = self._get_json('issuetype')
+        r_json = self._get_metadata_json('issuetype')
         issue_types = [IssueType(
             self._options, self._session, raw_type_json) for raw_type_json in r_json]
         return issue_types
@@ -1474,7 +2166,7 @@ class JIRA(object):
 
     def priorities(self):
         """Get a list of priority Resources from the server."""
-        r_json = self._get_json('priority')
+        r_json = self._get_metadata_json('priority')
         priorities = [Priority(
             self._options, self._session, raw_priority_json) for raw_priority_json in r_json]
         return priorities
@@ -1660,7 +2352,7 @@ class JIRA(object):
 
     def resolutions(self):
         """Get a list of resolution Resources from the server."""
-        r_json = self._get_json('resolution')
+        r_json = self._get_metadata_json('resolution')
         resolutions = [Resolution(
             self._options, self._session, raw_res_json) for raw_res_json in r_json]
         return resolutions
@@ -1690,12 +2382,113 @@ class JIRA(object):
         :param json_result: JSON response will be returned when this parameter is set to True.
                 Otherwise, ResultList will be returned.
         """
+        if self._issue_cache is not None and not json_result:
+            cached = self._issue_cache.search(jql_str, self._issue_cache.variant(fields, expand), startAt, maxResults)
+            if cached is not None:
+                raw_issues, total = cached
+                return ResultList([Issue(self._options, self._session, raw) for raw in raw_issues], startAt,
+                                  maxResults, total, startAt + len(raw_issues) >= total)
+
+        search_params, untranslate = self._search_params(jql_str, validate_query, fields, expand)
+        search_params['startAt'] = startAt
+        search_params['maxResults'] = maxResults
+        if json_result:
+            if not maxResults:
+                warnings.warn('All issues cannot be fetched at once, when json_result parameter is set', Warning)
+            return self._get_json('search', params=search_params)
+
+        issues = self._fetch_pages(Issue, 'issues', 'search', startAt, maxResults, search_params)
+
+        if untranslate:
+            for i in issues:
+                self._untranslate_fields(i, untranslate)
+
+        return issues
+
+    def iter_issues(self, jql_str, startAt=0, maxResults=None, validate_query=True, fields=None, expand=None,
+                    pageSize=50):
+        """
+        Iterate over the issue Resources matching a JQL search string, requesting them one page at a time.
+
+        Unlike :py:meth:`search_issues` the results are not collected in a ResultList: only the page being consumed
+        and the next one, which is fetched in the background while the caller works on the current page, are held in
+        memory, so memory use does not grow with the size of the result.
+
+        :param jql_str: the JQL search string to use
+        :param startAt: index of the first issue to return
+        :param maxResults: maximum number of issues to return. If it evaluates as False, all matching issues are\
+        returned.
+        :param fields: comma-separated string of issue fields to include in the results
+        :param expand: extra information to fetch inside each resource
+        :param pageSize: number of issues to request per page
+        """
+        search_params, untranslate = self._search_params(jql_str, validate_query, fields, expand)
+        for issue in self._iter_pages(Issue, 'issues', 'search', startAt, maxResults, search_params, pageSize):
+            if untranslate:
+                self._untranslate_fields(issue, untranslate)
+            yield issue
+
+    def sync_issues(self, jql_str, fields=None, expand=None, full=False, pageSize=100):
+        """
+        Bring the issues matching a JQL search string in the issue cache up to date.
+
+        The first sync of a search fetches all matching issues. The next ones only fetch the issues updated since the
+        latest ``updated`` timestamp stored for the search, add them to the cache and to the result of the search, and
+        make ``search_issues()`` with the same ``jql_str``, ``fields`` and ``expand`` served from the cache again.
+
+        Issues which stop matching the search, or are deleted, stay in its result until a ``full`` sync.
+
+        :param jql_str: the JQL search string to sync
+        :param fields: comma-separated string of issue fields to include in the results
+        :param expand: extra information to fetch inside each resource
+        :param full: fetch all matching issues again instead of the updated ones
+        :param pageSize: number of issues to request per page
+        :return: the number of issues fetched
+        """
+        if self._issue_cache is None:
+            raise JIRAError("No issue cache, set the issue_cache option to sync issues.")
+        from .cache import updated_since_jql
+        variant = self._issue_cache.variant(fields, expand)
+
+        last_updated = None if full else self._issue_cache.last_updated(jql_str, variant)
+        query = jql_str if last_updated is None else updated_since_jql(jql_str, last_updated, self._user_timezone())
+
+        if fields is not None:
+            # the timestamp of the next sync is taken from the updated field
+            fields = fields.split(",") if isinstance(fields, string_types) else list(fields)
+            if not set(fields) & set(['updated', '*all', '*navigable']):
+                fields.append('updated')
+        search_params, untranslate = self._search_params(query, False, fields, expand)
+
+        raw_issues = []
+        for raw_issue_json in self._iter_pages(lambda options, session, raw: raw, 'issues', 'search',
+                                               params=search_params, pageSize=pageSize):
+            for k, v in iteritems(untranslate):
+                if k in raw_issue_json['fields']:
+                    raw_issue_json['fields'][v] = raw_issue_json['fields'][k]
+            raw_issues.append(raw_issue_json)
+
+        self._issue_cache.record_sync(jql_str, variant, raw_issues, full=last_updated is None)
+        return len(raw_issues)
+
+    def _user_timezone(self):
+        """Name of the time zone of the profile of the user, which JQL dates are read in, None when unknown."""
+        if not hasattr(self, '_timezone_name'):
+            try:
+                self._timezone_name = self.myself().get('timeZone')
+            except (JIRAError, AttributeError):
+                self._timezone_name = None
+        return self._timezone_name
+
+    def _search_params(self, jql_str, validate_query=True, fields=None, expand=None):
         # TODO what to do about the expand, which isn't related to the issues?
         if fields is None:
             fields = []
 
         if isinstance(fields, string_types):
             fields = fields.split(",")
+        else:
+            fields = list(fields)
 
         # this will translate JQL field names to REST API Name
         # most people do know the JQL names so this will help them use the API easier
@@ -1708,26 +2501,17 @@ class JIRA(object):
 
         search_params = {
             "jql": jql_str,
-            "startAt": startAt,
-            "maxResults": maxResults,
             "validateQuery": validate_query,
             "fields": fields,
             "expand": expand
         }
-        if json_result:
-            if not maxResults:
-                warnings.warn('All issues cannot be fetched at once, when json_result parameter is set', Warning)
-            return self._get_json('search', params=search_params)
+        return search_params, untranslate
 
-        issues = self._fetch_pages(Issue, 'issues', 'search', startAt, maxResults, search_params)
-
-        if untranslate:
-            for i in issues:
-                for k, v in iteritems(untranslate):
-                    if k in i.raw['fields']:
-                        i.raw['fields'][v] = i.raw['fields'][k]
-
-        return issues
+    @staticmethod
+    def _untranslate_fields(issue, untranslate):
+        for k, v in iteritems(untranslate):
+            if k in issue.raw['fields']:
+                issue.raw['fields'][v] = issue.raw['fields'][k]
 
     # Security levels
     def security_level(self, id):
@@ -1759,7 +2543,7 @@ class JIRA(object):
 
     def statuses(self):
         """Get a list of status Resources from the server."""
-        r_json = self._get_json('status')
+        r_json = self._get_metadata_json('status')
         statuses = [Status(self._options, self._session, raw_stat_json)
                     for raw_stat_json in r_json]
         return statuses
@@ -2094,16 +2878,29 @@ class JIRA(object):
         r = self._session.delete(url)
 
     # Utilities
+    def _create_session(self):
+        """Create a ResilientSession with the connection pool, timeout and SSL options of this client."""
+        timeout = self._options['timeout']
+        if isinstance(timeout, list):
+            # a (connect, read) pair read from a config file
+            timeout = tuple(timeout)
+        session = ResilientSession(
+            timeout=timeout,
+            pool_connections=self._options['pool_connections'],
+            pool_maxsize=self._options['pool_maxsize'] or max(10, self._options['fetch_workers']),
+            keepalive=self._options['keepalive'],
+            retry_policy=self._options['retry_policy'],
+            cassette=self._options['cassette'],
+            metrics=self._options['metrics'])
+        session.verify = self._options['verify']
+        return session
+
     def _create_http_basic_session(self, username, password):
-        verify = self._options['verify']
-        self._session = ResilientSession()
-        self._session.verify = verify
+        self._session = self._create_session()
         self._session.auth = (username, password)
         self._session.cert = self._options['client_cert']
 
     def _create_oauth_session(self, oauth):
-        verify = self._options['verify']
-
         from requests_oauthlib import OAuth1
         from oauthlib.oauth1 import SIGNATURE_RSA
 
@@ -2114,8 +2911,7 @@ class JIRA(object):
             resource_owner_key=oauth['access_token'],
             resource_owner_secret=oauth['access_token_secret']
         )
-        self._session = ResilientSession()
-        self._session.verify = verify
+        self._session = self._create_session()
         self._session.auth = oauth
 
     @staticmethod
@@ -2127,17 +2923,17 @@ class JIRA(object):
 
     def _create_jwt_session(self, jwt):
         try:
-            jwt_auth = JWTAuth(jwt['secret'], alg='HS256')
-        except NameError as e:
+            from requests_jwt import JWTAuth
+        except ImportError as e:
             logging.error("JWT authentication requires requests_jwt")
             raise e
+        jwt_auth = JWTAuth(jwt['secret'], alg='HS256')
         jwt_auth.add_field("iat", lambda req: JIRA._timestamp())
         jwt_auth.add_field("exp", lambda req: JIRA._timestamp(datetime.timedelta(minutes=3)))
         jwt_auth.add_field("qsh", QshGenerator(self._options['context_path']))
         for f in jwt['payload'].items():
             jwt_auth.add_field(f[0], f[1])
-        self._session = ResilientSession()
-        self._session.verify = self._options['verify']
+        self._session = self._create_session()
         self._session.auth = jwt_auth
 
     def _set_avatar(self, params, url, avatar):
@@ -2189,9 +2985,13 @@ class JIRA(object):
                 self._magic = None
 
     def _get_mime_type(self, buff):
+        if not hasattr(self, '_magic'):
+            self._try_magic()
         if self._magic is not None:
             return self._magic.id_buffer(buff)
         else:
+            import imghdr
+            import mimetypes
             try:
                 return mimetypes.guess_type("f." + imghdr.what(0, buff))[0]
             except (IOError, TypeError):
@@ -2298,6 +3098,11 @@ class JIRA(object):
                            re.MULTILINE | re.DOTALL)
             m = p.search(r.content)
             if m:
+                # six.moves does not play well with pyinstaller, see https://github.com/pycontribs/jira/issues/38
+                if sys.version_info < (3, 0, 0):
+                    import HTMLParser as html_parser
+                else:
+                    import html.parser as html_parser
                 h = html_parser.HTMLParser()
                 msg = h.unescape(m.group(1))
                 logging.info(msg)
@@ -2557,7 +3362,7 @@ class JIRA(object):
         try:
             self._session.post(url, data=payload)
         except JIRAError as e:
-            err = e.response.json()['errors']
+            err = response_json(e.response)['errors']
             if 'username' in err and err['username'] == 'A user with that username already exists.' and ignore_existing:
                 return True
             raise e
@@ -9,10 +9,6 @@ Also, this simplifies the scripts by not having to write the same initialization
 import logging
 import os
 import sys
-try:
-    import configparser
-except:
-    from six.moves import configparser
 
 from .client import JIRA
 
@@ -49,6 +45,11 @@ def get_jira(profile=None, url="http://localhost:2990", username="admin", passwo
 
 
     """
+    try:
+        import configparser
+    except:
+        from six.moves import configparser
+
     def findfile(path):
         """
         Find the file named path in the sys.path.
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+"""
+JSON decoding of the responses of the server, with the fastest parser installed.
+
+``orjson``, ``ujson`` and ``simdjson`` are used, in this order, when one of them is installed, and the ``json``
+module of the standard library otherwise. Responses are parsed straight from their bytes: going through
+``response.text`` would first decode them to a string, after guessing their encoding when the server does not give
+it, which costs about as much as parsing them.
+
+The parser is picked on first use; :py:func:`use` picks another one::
+
+    from jira import jsonlib
+    jsonlib.use('json')
+"""
+
+import json
+
+__all__ = ('BACKENDS', 'backend', 'loads', 'response_json', 'use')
+
+BACKENDS = ('orjson', 'ujson', 'simdjson', 'json')
+
+_loads = None
+_backend = None
+
+
+def _import(name):
+    if name == 'json':
+        try:
+            json.loads(b'{}')
+            return json.loads
+        except TypeError:
+            # Python 3 before 3.6 only parses strings
+            return lambda s: json.loads(s.decode('utf-8') if isinstance(s, bytes) else s)
+    module = __import__(name)
+    return module.loads
+
+
+def use(name=None):
+    """
+    Parse JSON with the ``name`` backend, one of :py:data:`BACKENDS`, or with the first of them installed when
+    ``name`` is None. Raises ImportError when the backend is not installed.
+    """
+    global _loads, _backend
+    if name is not None and name not in BACKENDS:
+        raise ValueError('Unknown JSON backend %r, use one of %s' % (name, ', '.join(BACKENDS)))
+    for candidate in (name, ) if name else BACKENDS:
+        try:
+            _loads = _import(candidate)
+        except ImportError:
+            if name:
+                raise
+            continue
+        _backend = candidate
+        return _backend
+
+
+def backend():
+    """Name of the backend JSON is parsed with."""
+    if _backend is None:
+        use()
+    return _backend
+
+
+def loads(s):
+    """Parse the JSON document ``s``, bytes in UTF-8 or a string."""
+    if _loads is None:
+        use()
+    return _loads(s)
+
+
+def response_json(r):
+    """
+    Parse the JSON body of the response ``r`` from its bytes, ``{}`` when it is empty.
+
+    A body which the backend rejects, e.g. because it is not valid UTF-8, is parsed again from ``r.text`` by the
+    standard library, so that every backend accepts what ``json.loads(r.text)`` does and raises the same ValueError
+    otherwise.
+    """
+    encoding = getattr(r, 'encoding', None)
+    content = getattr(r, 'content', None)
+    if content is None or encoding and encoding.lower().replace('-', '') not in ('utf8', 'ascii'):
+        return json.loads(r.text) if r.text else {}
+    if not content:
+        return {}
+    try:
+        return loads(content)
+    except ValueError:
+        return json.loads(r.text)
@@ -0,0 +1,256 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+"""
+Timing and size of the HTTP requests of a client.
+
+A :py:class:`Metrics` given to :py:class:`jira.resilientsession.ResilientSession` (or with the ``metrics`` option of
+:py:class:`jira.client.JIRA`) gets one :py:class:`RequestMetric` for every request once it is done, retries included,
+and hands it to its exporters: a :py:class:`Histogram` keeping the latencies per endpoint in memory, and
+:py:class:`Callback` turning every request into named samples for StatsD, Prometheus or any other sink.
+
+Requests are grouped by endpoint template, like ``issue/{0}/comment`` rather than ``issue/PROJ-12/comment``, so that
+the time spent in the server, in retries and in the client can be told apart per kind of call.
+"""
+
+import logging
+import re
+import threading
+from bisect import bisect_left
+from collections import namedtuple
+
+from six import binary_type, text_type
+from six.moves.urllib.parse import urlsplit
+
+__all__ = ('RequestMetric', 'Metrics', 'Histogram', 'Callback', 'endpoint_template')
+
+RequestMetric = namedtuple('RequestMetric', [
+    'verb',
+    'url',
+    'endpoint',
+    'status_code',  # None when the request failed without a response
+    'elapsed',  # seconds from the first attempt to the end of the last one, backoff included
+    'backoff',  # seconds waited between the attempts
+    'retries',
+    'bytes_sent',  # size of the body of the last attempt, None when it was streamed from a file
+    'bytes_received',
+    'error',  # the exception the request failed with, if any
+])
+
+# path segments holding identifiers rather than naming the endpoint: ids, issue keys and project keys
+_IDENTIFIER = re.compile(r'^(\d+|[A-Z][A-Z0-9_]*(-\d+)?)$')
+_API_PREFIX = re.compile(r'^/rest/api/[^/]+/')
+
+
+def endpoint_template(url):
+    """
+    The endpoint ``url`` calls, with the identifiers in its path replaced by ``{0}``, ``{1}``... the way
+    :py:meth:`jira.client.JIRA._get_url` paths are written.
+
+    Paths of the core REST API lose their ``/rest/api/2/`` prefix, and the context path of the server before it,
+    other paths keep everything after ``/rest/``, e.g. ``agile/1.0/board/{0}``, and paths outside of the REST API,
+    like attachment contents, are kept as they are down to the first identifier.
+    """
+    path = urlsplit(url).path
+    start = path.find('/rest/')
+    rest = start >= 0
+    if rest:
+        path = path[start:]
+        path = _API_PREFIX.sub('', path) if _API_PREFIX.match(path) else path[len('/rest/'):]
+    segments = []
+    identifiers = 0
+    for segment in path.strip('/').split('/'):
+        if _IDENTIFIER.match(segment):
+            segments.append('{%s}' % identifiers)
+            identifiers += 1
+        elif identifiers and not rest:
+            # e.g. the file name of an attachment
+            break
+        else:
+            segments.append(segment)
+    return '/'.join(segments)
+
+
+def body_size(body):
+    """Number of bytes in a request body, None when it is streamed and its size unknown."""
+    if body is None:
+        return 0
+    if isinstance(body, binary_type):
+        return len(body)
+    if isinstance(body, text_type):
+        return len(body.encode('utf-8'))
+    return getattr(body, 'len', None)
+
+
+class Metrics(object):
+
+    """
+    Hands the :py:class:`RequestMetric` of every finished request of a session to each of its exporters.
+
+    An exporter is a callable taking the metric. Exporters run in the thread that made the request, so they should
+    be quick and thread safe; an exporter raising an exception does not fail the request.
+
+    :param exporters: the exporters, which can also be added later with :py:meth:`add`
+    """
+
+    def __init__(self, *exporters):
+        self.exporters = list(exporters)
+
+    def add(self, exporter):
+        self.exporters.append(exporter)
+        return exporter
+
+    def observe(self, metric):
+        for exporter in self.exporters:
+            try:
+                exporter(metric)
+            except Exception:
+                logging.exception('Metrics exporter %r failed' % (exporter, ))
+
+    __call__ = observe
+
+
+class _Series(object):
+
+    def __init__(self, buckets):
+        self.buckets = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.errors = 0
+        self.seconds = 0.0
+        self.backoff = 0.0
+        self.retries = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.status_codes = {}
+
+
+class Histogram(object):
+
+    """
+    Exporter keeping, per verb and endpoint, the distribution of the request latencies in cumulative buckets along
+    with the number of requests, retries, errors and status codes, the backoff time and the bytes sent and received.
+
+    :param buckets: upper bounds of the latency buckets in seconds, in increasing order
+    """
+
+    BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+    def __init__(self, buckets=BUCKETS):
+        self.bounds = tuple(buckets)
+        self.series = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, metric):
+        with self._lock:
+            key = (metric.verb, metric.endpoint)
+            series = self.series.get(key)
+            if series is None:
+                series = self.series[key] = _Series(self.bounds)
+            series.buckets[bisect_left(self.bounds, metric.elapsed)] += 1
+            series.count += 1
+            series.errors += metric.error is not None or (metric.status_code or 0) >= 400
+            series.seconds += metric.elapsed
+            series.backoff += metric.backoff
+            series.retries += metric.retries
+            series.bytes_sent += metric.bytes_sent or 0
+            series.bytes_received += metric.bytes_received or 0
+            series.status_codes[metric.status_code] = series.status_codes.get(metric.status_code, 0) + 1
+
+    def reset(self):
+        with self._lock:
+            self.series = {}
+
+    def _merged(self, verb=None, endpoint=None):
+        merged = _Series(self.bounds)
+        with self._lock:
+            for (v, e), series in self.series.items():
+                if (verb is None or v == verb) and (endpoint is None or e == endpoint):
+                    merged.buckets = [a + b for a, b in zip(merged.buckets, series.buckets)]
+                    for name in ('count', 'errors', 'seconds', 'backoff', 'retries', 'bytes_sent', 'bytes_received'):
+                        setattr(merged, name, getattr(merged, name) + getattr(series, name))
+        return merged
+
+    def count(self, verb=None, endpoint=None):
+        return self._merged(verb, endpoint).count
+
+    def percentile(self, fraction, verb=None, endpoint=None):
+        """
+        Upper bound of the bucket holding the ``fraction`` percentile of the latencies of the requests matching
+        ``verb`` and ``endpoint``, None when there are none. Past the last bucket it is infinite.
+        """
+        series = self._merged(verb, endpoint)
+        if not series.count:
+            return None
+        rank = fraction * series.count
+        seen = 0
+        for bound, count in zip(self.bounds + (float('inf'), ), series.buckets):
+            seen += count
+            if seen >= rank:
+                return bound
+
+    def summary(self):
+        """
+        One dict per verb and endpoint, the slowest in total first, with the number of requests, errors and retries,
+        the total, mean, median and 95th percentile seconds, the backoff seconds and the bytes sent and received.
+        """
+        with self._lock:
+            keys = list(self.series)
+        rows = []
+        for verb, endpoint in keys:
+            series = self._merged(verb, endpoint)
+            rows.append({
+                'verb': verb,
+                'endpoint': endpoint,
+                'count': series.count,
+                'errors': series.errors,
+                'retries': series.retries,
+                'seconds': series.seconds,
+                'mean': series.seconds / series.count,
+                'p50': self.percentile(0.5, verb, endpoint),
+                'p95': self.percentile(0.95, verb, endpoint),
+                'backoff': series.backoff,
+                'bytes_sent': series.bytes_sent,
+                'bytes_received': series.bytes_received,
+            })
+        return sorted(rows, key=lambda row: -row['seconds'])
+
+    def __str__(self):
+        lines = ['%-6s %-40s %7s %6s %7s %9s %8s %8s %9s %11s' % (
+            'verb', 'endpoint', 'calls', 'errors', 'retries', 'seconds', 'p50 ms', 'p95 ms', 'backoff', 'bytes in')]
+        for row in self.summary():
+            lines.append('%-6s %-40s %7d %6d %7d %9.3f %8.0f %8.0f %9.3f %11d' % (
+                row['verb'], row['endpoint'], row['count'], row['errors'], row['retries'], row['seconds'],
+                row['p50'] * 1000, row['p95'] * 1000, row['backoff'], row['bytes_received']))
+        return '\n'.join(lines)
+
+
+class Callback(object):
+
+    """
+    Exporter calling ``callback(name, value, tags)`` for every sample of every request, the way StatsD and
+    Prometheus clients are fed::
+
+        statsd = StatsClient()
+        Callback(lambda name, value, tags: statsd.timing(name, value * 1000) if name.endswith('seconds')
+                 else statsd.incr(name, value))
+
+    The samples are ``<prefix>.requests`` (always 1), ``<prefix>.request.seconds``,
+    ``<prefix>.request.backoff_seconds``, ``<prefix>.request.retries``, ``<prefix>.request.bytes_sent`` and
+    ``<prefix>.request.bytes_received``, with the ``verb``, ``endpoint`` and ``status`` tags; the status of a request
+    which got no response is ``error``.
+    """
+
+    def __init__(self, callback, prefix='jira'):
+        self.callback = callback
+        self.prefix = prefix
+
+    def __call__(self, metric):
+        tags = {'verb': metric.verb, 'endpoint': metric.endpoint,
+                'status': 'error' if metric.status_code is None else str(metric.status_code)}
+        self.callback(self.prefix + '.requests', 1, tags)
+        self.callback(self.prefix + '.request.seconds', metric.elapsed, tags)
+        self.callback(self.prefix + '.request.backoff_seconds', metric.backoff, tags)
+        self.callback(self.prefix + '.request.retries', metric.retries, tags)
+        if metric.bytes_sent is not None:
+            self.callback(self.prefix + '.request.bytes_sent', metric.bytes_sent, tags)
+        if metric.bytes_received is not None:
+            self.callback(self.prefix + '.request.bytes_received', metric.bytes_received, tags)
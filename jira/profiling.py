@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function
+from __future__ import unicode_literals
+"""
+Where the time of a block of client calls goes, without a full profiler.
+
+:py:class:`Profiler` times the few functions the client spends its own time in: JSON decoding, turning JSON into
+resources, building URLs, sleeping between retries and waiting for the network. What is left of the time of the
+block is spent elsewhere in the client or in the calling code::
+
+    with Profiler() as profiler:
+        issues = jira.search_issues('project = PROJ', maxResults=False, expand='changelog')
+    print(profiler)
+
+The ``profile`` option of :py:class:`jira.client.JIRA` profiles a client from its construction to its
+:py:meth:`~jira.client.JIRA.close` instead.
+"""
+
+import sys
+import threading
+import time
+from functools import wraps
+
+__all__ = ('Profiler', )
+
+try:
+    _cpu_time = time.thread_time
+except AttributeError:
+    # Python < 3.7 only has the time of the whole process, which counts the other threads too
+    _cpu_time = getattr(time, 'process_time', None) or time.clock
+
+
+class _Stats(object):
+
+    def __init__(self):
+        self.calls = 0
+        self.wall = 0.0
+        self.cpu = 0.0
+
+
+# the profilers running, replaced as a whole, and the patches they share: the functions are patched by the first
+# profiler to start and restored by the last one to stop, whatever the order they start and stop in
+_profilers = ()
+_patches = []
+_patches_lock = threading.Lock()
+_local = threading.local()
+
+
+def _timed(label, function, method=False):
+    # the first argument of a method is the instance the call is made on, i.e. the session sending a request
+    @wraps(function)
+    def timed(*args, **kwargs):
+        if not _profilers:
+            return function(*args, **kwargs)
+        stack = getattr(_local, 'stack', None)
+        if stack is None:
+            stack = _local.stack = []
+        # wall and cpu time spent in the parts called by this one
+        frame = [0.0, 0.0]
+        stack.append(frame)
+        wall, cpu = time.time(), _cpu_time()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            wall, cpu = time.time() - wall, _cpu_time() - cpu
+            stack.pop()
+            if stack:
+                stack[-1][0] += wall
+                stack[-1][1] += cpu
+            instance = args[0] if method and args else None
+            for profiler in _profilers:
+                profiler._add(label, wall - frame[0], cpu - frame[1], instance)
+    return timed
+
+
+class _TimedTime(object):
+
+    """Stands for the ``time`` module in a module whose ``time.sleep()`` calls are timed, and only there."""
+
+    def __init__(self, label):
+        self.sleep = _timed(label, time.sleep)
+
+    def __getattr__(self, name):
+        return getattr(time, name)
+
+
+def _targets():
+    from . import client, resources, utils
+    import requests
+    targets = [
+        (requests.Session, 'send', 'network'),
+        (utils, 'json_loads', 'json decode'),
+        (client, 'json_loads', 'json decode'),
+        (resources, 'json_loads', 'json decode'),
+        (resources, 'dict2resource', 'hydration'),
+        (resources, 'cls_for_resource', 'resource lookup'),
+        (client.JIRA, '_get_url', 'url building'),
+        (resources.Resource, '_get_url', 'url building'),
+    ]
+    aio = sys.modules.get(__package__ + '.aio')
+    if aio is not None:
+        targets.append((aio, 'json_loads', 'json decode'))
+    return targets
+
+
+def _patch():
+    from . import resilientsession
+    import requests
+    for owner, name, label in _targets():
+        original = owner.__dict__[name]
+        _patches.append((owner, name, original))
+        setattr(owner, name, _timed(label, original, method=owner is requests.Session))
+    _patches.append((resilientsession, 'time', resilientsession.time))
+    resilientsession.time = _TimedTime('retry sleep')
+
+
+def _unpatch():
+    while _patches:
+        owner, name, original = _patches.pop()
+        setattr(owner, name, original)
+
+
+class Profiler(object):
+
+    """
+    Wall clock and CPU time spent in the parts of the client, for the calls made while it runs.
+
+    The parts are:
+
+    * network -- sending requests and reading responses, from ``requests.Session.send``
+    * retry sleep -- waiting between the attempts of a retried request
+    * json decode -- :py:func:`jira.utils.json_loads`
+    * hydration -- :py:func:`jira.resources.dict2resource` turning JSON objects into resources
+    * resource lookup -- :py:func:`jira.resources.cls_for_resource` finding the class of nested resources
+    * url building -- the ``_get_url`` methods of :py:class:`jira.client.JIRA` and of the resources, which copy
+      the options of the client
+
+    The time of a part does not include the parts it calls, e.g. hydration excludes resource lookup. The functions
+    are patched for the whole process while any profiler runs, so calls from other threads, like the workers
+    fetching pages, are counted as well and the parts can add up to more than the wall time of the block. Profilers
+    running at the same time all count the calls made while they run.
+
+    :param session: the :py:class:`requests.Session` whose requests the network part counts, e.g. the ``_session``
+        of a client, rather than the requests of every session. The other parts are always counted for the whole
+        process.
+    """
+
+    def __init__(self, session=None):
+        self.session = session
+        self.stats = {}
+        self.wall = 0.0
+        self.cpu = 0.0
+        self._lock = threading.Lock()
+        self._started = None
+
+    def _add(self, label, wall, cpu, session=None):
+        if self.session is not None and session is not None and session is not self.session:
+            return
+        with self._lock:
+            stats = self.stats.get(label)
+            if stats is None:
+                stats = self.stats[label] = _Stats()
+            stats.calls += 1
+            stats.wall += wall
+            stats.cpu += cpu
+
+    def start(self):
+        global _profilers
+        with _patches_lock:
+            if self._started is not None:
+                raise RuntimeError('The profiler is already running')
+            if not _profilers:
+                _patch()
+            self._started = time.time(), _cpu_time()
+            _profilers = _profilers + (self, )
+        return self
+
+    def stop(self):
+        global _profilers
+        with _patches_lock:
+            if self._started is None:
+                return self
+            wall, cpu = self._started
+            self.wall += time.time() - wall
+            self.cpu += _cpu_time() - cpu
+            self._started = None
+            _profilers = tuple(profiler for profiler in _profilers if profiler is not self)
+            if not _profilers:
+                _unpatch()
+        return self
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def reset(self):
+        with self._lock:
+            self.stats = {}
+            self.wall = 0.0
+            self.cpu = 0.0
+
+    def summary(self):
+        """
+        One dict per part, the slowest first, with the number of calls and the wall clock and CPU seconds spent in
+        it, and a last ``other`` part with the rest of the time of the profiled block.
+        """
+        wall, cpu = self.wall, self.cpu
+        if self._started is not None:
+            wall += time.time() - self._started[0]
+            cpu += _cpu_time() - self._started[1]
+        with self._lock:
+            rows = [{'part': label, 'calls': stats.calls, 'wall': stats.wall, 'cpu': stats.cpu}
+                    for label, stats in self.stats.items()]
+        rows.sort(key=lambda row: -row['wall'])
+        rows.append({'part': 'other', 'calls': None, 'wall': max(0.0, wall - sum(row['wall'] for row in rows)),
+                     'cpu': max(0.0, cpu - sum(row['cpu'] for row in rows))})
+        for row in rows:
+            row['percent'] = 100.0 * row['wall'] / wall if wall else 0.0
+        return rows
+
+    def __str__(self):
+        lines = ['%-16s %8s %10s %10s %7s' % ('part', 'calls', 'wall s', 'cpu s', 'wall %')]
+        for row in self.summary():
+            lines.append('%-16s %8s %10.3f %10.3f %6.1f%%' % (
+                row['part'], '' if row['calls'] is None else row['calls'], row['wall'], row['cpu'], row['percent']))
+        return '\n'.join(lines)
+
+    def print_summary(self, file=None):
+        print(self, file=file or sys.stdout)
@@ -1,7 +1,9 @@
 # -*- coding: utf-8 -*-
 from __future__ import unicode_literals
 from requests import Session
+from requests.adapters import HTTPAdapter
 from requests.exceptions import ConnectionError
+from requests.packages.urllib3.connection import HTTPConnection
 import logging
 try:  # Python 2.7+
     from logging import NullHandler
@@ -10,10 +12,17 @@ except ImportError:
 
         def emit(self, record):
             pass
+from collections import deque
+from email.utils import mktime_tz, parsedate_tz
+from functools import partial
 import random
+import socket
+import threading
 import time
 import json
 from .exceptions import JIRAError
+from .jsonlib import response_json
+from .metrics import RequestMetric, body_size, endpoint_template
 
 logging.getLogger('jira').addHandler(NullHandler())
 
@@ -31,7 +40,7 @@ def raise_on_error(r, verb='???', **kwargs):
             error = r.headers["x-authentication-denied-reason"]
         elif r.text:
             try:
-                response = json.loads(r.text)
+                response = response_json(r)
                 if 'message' in response:
                     # JIRA 5.1 errors
                     error = response['message']
@@ -54,7 +63,7 @@ def raise_on_error(r, verb='???', **kwargs):
         raise JIRAError(
             r.status_code, error, r.url, request=request, response=r, **kwargs)
     # for debugging weird errors on CI
-    if r.status_code not in [200, 201, 202, 204]:
+    if r.status_code not in [200, 201, 202, 204, 206]:
         raise JIRAError(r.status_code, request=request, response=r, **kwargs)
     # testing for the WTH bug exposed on
     # https://answers.atlassian.com/questions/11457054/answers/11975162
@@ -64,49 +73,232 @@ def raise_on_error(r, verb='???', **kwargs):
         pass
 
 
+def keepalive_socket_options(idle):
+    """
+    Socket options turning on TCP keep-alive probes after ``idle`` seconds without traffic.
+
+    The probe timing options are only set on the platforms which have them.
+    """
+    options = [(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)]
+    for name, value in (('TCP_KEEPIDLE', idle), ('TCP_KEEPINTVL', max(1, idle // 4)), ('TCP_KEEPCNT', 4)):
+        if hasattr(socket, name):
+            options.append((socket.IPPROTO_TCP, getattr(socket, name), value))
+    return options
+
+
+class TunedHTTPAdapter(HTTPAdapter):
+
+    """
+    HTTPAdapter whose connections use extra socket options, like TCP keep-alive.
+    """
+
+    def __init__(self, socket_options=None, **kwargs):
+        self.socket_options = socket_options
+        super(TunedHTTPAdapter, self).__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        if self.socket_options:
+            kwargs['socket_options'] = HTTPConnection.default_socket_options + self.socket_options
+        super(TunedHTTPAdapter, self).init_poolmanager(*args, **kwargs)
+
+
+class RetryLater(JIRAError):
+
+    """
+    Raised instead of sleeping by a session whose :py:class:`RetryPolicy` does not block: the request failed with a
+    temporary error and should be sent again by calling ``retry()`` once ``delay`` seconds have passed.
+
+    ``retry()`` returns the response, raises the error of the request, or raises RetryLater again.
+    """
+
+    def __init__(self, delay, retry, url=None, response=None, exception=None):
+        self.delay = delay
+        self.retry = retry
+        self.exception = exception
+        status_code = response.status_code if response is not None else None
+        super(RetryLater, self).__init__(status_code, 'Retry in %ss: %s' % (delay, exception or status_code), url,
+                                         response=response)
+
+
+class RetryPolicy(object):
+
+    """
+    Decides whether a request that failed with a temporary error is sent again, and when.
+
+    Connection errors and responses with one of the retried status codes are retried after the delay asked for by the
+    ``Retry-After`` header of the response, or else after an exponential backoff with full jitter. The policy holds no
+    state per request, so one policy can serve many sessions and threads.
+
+    :param max_retries: number of times one request is retried. None uses the ``max_retries`` of the session.
+    :param statuses: status codes retried for every verb
+    :param verbs: dict of the status codes retried for some verbs, used instead of ``statuses`` for them, e.g.
+        ``{'POST': (429, 503)}``. A verb mapped to None is not retried at all, not even after a connection error.
+    :param backoff: seconds of the first backoff, doubled on every retry
+    :param max_backoff: longest backoff in seconds
+    :param retry_after: honour the ``Retry-After`` header of 429 and 503 responses
+    :param max_retry_after: longest ``Retry-After`` in seconds that is waited for; a request asked to wait longer
+        fails at once. None waits as long as the server asks.
+    :param deadline: seconds after the first attempt of a request past which it is not retried any more. None
+        retries it whatever the time.
+    :param budget: number of retries allowed in any ``budget_period`` seconds, over all the requests using the
+        policy, so that an outage does not multiply the load on the server. None does not limit them.
+    :param budget_period: seconds over which the retries are counted against ``budget``
+    :param blocking: sleep in the calling thread until a retry is due. With False the session raises
+        :py:exc:`RetryLater` instead, so that a pool or an event loop can run other work in the meantime.
+    """
+
+    STATUSES = (429, 502, 503, 504)
+
+    def __init__(self, max_retries=None, statuses=STATUSES, verbs=None, backoff=10, max_backoff=60,
+                 retry_after=True, max_retry_after=None, deadline=None, budget=None, budget_period=60, blocking=True):
+        self.max_retries = max_retries
+        self.statuses = frozenset(statuses)
+        self.verbs = dict((verb.upper(), None if codes is None else frozenset(codes))
+                          for verb, codes in (verbs or {}).items())
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.retry_after = retry_after
+        self.max_retry_after = max_retry_after
+        self.deadline = deadline
+        self.budget = budget
+        self.budget_period = budget_period
+        self.blocking = blocking
+        self._spent = deque()
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def retryable(self, verb, response=None, exception=None):
+        """Whether the failure of a ``verb`` request with ``response`` or ``exception`` is temporary."""
+        statuses = self.verbs.get(verb.upper(), self.statuses)
+        if statuses is None:
+            return False
+        if response is None:
+            return exception is not None
+        if response.status_code in statuses:
+            return True
+        # Atlassian's bug https://jira.atlassian.com/browse/JRA-41559
+        return (response.status_code == 200 and len(response.content) == 0 and
+                'AUTHENTICATED_FAILED' in response.headers.get('X-Seraph-LoginReason', ''))
+
+    def retry_after_delay(self, response):
+        """Seconds the ``Retry-After`` header of ``response`` asks to wait, None if it has none."""
+        value = response.headers.get('Retry-After') if response is not None else None
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            date = parsedate_tz(value)
+            return max(0.0, mktime_tz(date) - time.time()) if date else None
+
+    def backoff_delay(self, retry_number):
+        """Exponential backoff with full jitter before retry number ``retry_number``, counting from 1."""
+        return min(self.max_backoff, self.backoff * 2 ** retry_number) * random.random()
+
+    def next_delay(self, verb, retry_number, response=None, exception=None, started=None, max_retries=3):
+        """
+        Seconds to wait before retry number ``retry_number`` of a request, counting from 1, or None when it should
+        not be retried.
+
+        :param started: time the first attempt of the request was sent, checked against the deadline
+        :param max_retries: retries allowed when the policy does not set ``max_retries``
+        """
+        if self.max_retries is not None:
+            max_retries = self.max_retries
+        if retry_number > max_retries or not self.retryable(verb, response, exception):
+            return None
+
+        delay = self.retry_after_delay(response) if self.retry_after else None
+        if delay is None:
+            delay = self.backoff_delay(retry_number)
+        elif self.max_retry_after is not None and delay > self.max_retry_after:
+            return None
+        if self.deadline is not None and started is not None and time.time() + delay - started > self.deadline:
+            return None
+        if not self._spend():
+            logging.warning("Retry budget of %s retries per %ss spent, not retrying %s" % (
+                self.budget, self.budget_period, verb))
+            return None
+        return delay
+
+    def _spend(self):
+        if self.budget is None:
+            return True
+        now = time.time()
+        with self._lock:
+            while self._spent and self._spent[0] <= now - self.budget_period:
+                self._spent.popleft()
+            if len(self._spent) >= self.budget:
+                return False
+            self._spent.append(now)
+            return True
+
+
 class ResilientSession(Session):
 
     """
     This class is supposed to retry requests that do return temporary errors.
 
-    At this moment it supports: 502, 503, 504
+    Which errors are retried, and after how long, is decided by its :py:class:`RetryPolicy`. By default 429, 502,
+    503 and 504 responses and connection errors are retried ``max_retries`` times.
+
+    :param timeout: seconds to wait for the server, or a (connect, read) tuple, used by every request which does not
+        pass its own. None waits forever.
+    :param pool_connections: number of hosts to keep a connection pool for. Defaults to 10.
+    :param pool_maxsize: number of connections kept open per host. It should be at least the number of threads sharing
+        the session, otherwise connections are discarded and opened again. Defaults to 10.
+    :param keepalive: seconds of inactivity after which TCP keep-alive probes are sent on idle connections, so that
+        firewalls do not drop them. None leaves keep-alive off.
+    :param retry_policy: the :py:class:`RetryPolicy` of the session. None uses the default one.
+    :param cassette: a :py:class:`jira.cassette.Cassette` recording the requests of the session, or answering them
+        instead of the server
+    :param metrics: a :py:class:`jira.metrics.Metrics`, or any callable, given the
+        :py:class:`jira.metrics.RequestMetric` of every request once it is done, whatever it failed with; a request
+        deferred with :py:class:`RetryLater` is done with that error, and its retry is another request
     """
 
-    def __init__(self):
+    retry_policy = RetryPolicy()
+    cassette = None
+    metrics = None
+
+    def __init__(self, timeout=None, pool_connections=None, pool_maxsize=None, keepalive=None, retry_policy=None,
+                 cassette=None, metrics=None):
         self.max_retries = 3
+        self.timeout = timeout
+        if retry_policy is not None:
+            self.retry_policy = retry_policy
+        if cassette is not None:
+            self.cassette = cassette
+        if metrics is not None:
+            self.metrics = metrics
         super(ResilientSession, self).__init__()
 
         # Indicate our preference for JSON to avoid https://bitbucket.org/bspeakmon/jira-python/issue/46 and https://jira.atlassian.com/browse/JRA-38551
         self.headers.update({"Accept": "application/json,*.*;q=0.9"})
 
-    def __recoverable(self, response, url, request, counter=1):
-        msg = response
-        if type(response) == ConnectionError:
-            logging.warning("Got ConnectionError [%s] errno:%s on %s %s\n%s\%s" % (
-                response, response.errno, request, url, vars(response), response.__dict__))
-        if hasattr(response, 'status_code'):
-            if response.status_code in [502, 503, 504]:
-                msg = "%s %s" % (response.status_code, response.reason)
-            elif not (response.status_code == 200 and
-                      len(response.content) == 0 and
-                      'X-Seraph-LoginReason' in response.headers and
-                      'AUTHENTICATED_FAILED' in response.headers['X-Seraph-LoginReason']):
-                return False
-            else:
-                msg = "Atlassian's bug https://jira.atlassian.com/browse/JRA-41559"
-
-        # Exponential backoff with full jitter.
-        delay = min(60, 10 * 2 ** counter) * random.random()
-        logging.warning("Got recoverable error from %s %s, will retry [%s/%s] in %ss. Err: %s" % (
-            request, url, counter, self.max_retries, delay, msg))
-        time.sleep(delay)
-        return True
+        if pool_connections is not None or pool_maxsize is not None or keepalive is not None:
+            adapter = TunedHTTPAdapter(
+                socket_options=keepalive_socket_options(keepalive) if keepalive is not None else None,
+                pool_connections=pool_connections or 10,
+                pool_maxsize=pool_maxsize or 10)
+            self.mount('https://', adapter)
+            self.mount('http://', adapter)
 
     def __verb(self, verb, url, retry_data=None, **kwargs):
 
         d = self.headers.copy()
         d.update(kwargs.get('headers', {}))
         kwargs['headers'] = d
+        if self.timeout is not None:
+            kwargs.setdefault('timeout', self.timeout)
 
         # if we pass a dictionary as the 'data' we assume we want to send json
         # data
@@ -114,37 +306,93 @@ class ResilientSession(Session):
         if isinstance(data, dict):
             data = json.dumps(data)
 
-        retry_number = 0
-        while retry_number <= self.max_retries:
+        return self.__send(verb, url, retry_data, kwargs, 0, time.time(), 0.0)
+
+    def __send(self, verb, url, retry_data, kwargs, retry_number, started, backoff):
+        policy = self.retry_policy
+        while True:
             response = None
             exception = None
             try:
                 method = getattr(super(ResilientSession, self), verb.lower())
                 response = method(url, **kwargs)
                 if response.status_code == 200:
+                    self.__observe(verb, url, kwargs, response, None, retry_number, started, backoff)
                     return response
             except ConnectionError as e:
                 logging.warning(
                     "%s while doing %s %s [%s]" % (e, verb.upper(), url, kwargs))
                 exception = e
+            except Exception as e:
+                # e.g. a read timeout, which is not retried but is one of the slowest ways for a request to end
+                self.__observe(verb, url, kwargs, None, e, retry_number, started, backoff)
+                raise
             retry_number += 1
 
-            if retry_number <= self.max_retries:
-                response_or_exception = response if response is not None else exception
-                if self.__recoverable(response_or_exception, url, verb.upper(), retry_number):
-                    if retry_data:
-                        # if data is a stream, we cannot just read again from it,
-                        # retry_data() will give us a new stream with the data
-                        kwargs['data'] = retry_data()
-                    continue
-                else:
-                    break
+            delay = policy.next_delay(verb, retry_number, response=response, exception=exception, started=started,
+                                      max_retries=self.max_retries)
+            if delay is None:
+                break
+            if exception is not None:
+                msg = exception
+            elif response.status_code == 200:
+                msg = "Atlassian's bug https://jira.atlassian.com/browse/JRA-41559"
+            else:
+                msg = "%s %s" % (response.status_code, response.reason)
+            logging.warning("Got recoverable error from %s %s, will retry [%s/%s] in %ss. Err: %s" % (
+                verb.upper(), url, retry_number, self.max_retries if policy.max_retries is None else policy.max_retries,
+                delay, msg))
+            if retry_data:
+                # if data is a stream, we cannot just read again from it,
+                # retry_data() will give us a new stream with the data
+                kwargs['data'] = retry_data()
+            backoff += delay
+            if not policy.blocking:
+                later = RetryLater(delay, partial(self.__send, verb, url, retry_data, kwargs, retry_number, started,
+                                                  backoff),
+                                   url=url, response=response, exception=exception)
+                self.__observe(verb, url, kwargs, None, later, retry_number - 1, started, backoff)
+                raise later
+            time.sleep(delay)
 
+        retries = retry_number - 1
         if exception is not None:
+            self.__observe(verb, url, kwargs, None, exception, retries, started, backoff)
             raise exception
-        raise_on_error(response, verb=verb, **kwargs)
+        try:
+            raise_on_error(response, verb=verb, **kwargs)
+        except JIRAError as e:
+            self.__observe(verb, url, kwargs, response, e, retries, started, backoff)
+            raise
+        self.__observe(verb, url, kwargs, response, None, retries, started, backoff)
         return response
 
+    def __observe(self, verb, url, kwargs, response, error, retries, started, backoff):
+        if self.metrics is None:
+            return
+        if response is None:
+            sent = body_size(kwargs.get('data'))
+            received = None
+        else:
+            request = getattr(response, 'request', None)
+            sent = body_size(request.body) if request is not None else None
+            if kwargs.get('stream') and not getattr(response, '_content_consumed', True):
+                # reading the body to measure it would defeat streaming
+                length = response.headers.get('Content-Length')
+                received = int(length) if length and length.isdigit() else None
+            else:
+                received = len(response.content or b'')
+        self.metrics(RequestMetric(
+            verb=verb.upper(), url=url, endpoint=endpoint_template(url),
+            status_code=response.status_code if response is not None else None,
+            elapsed=time.time() - started, backoff=backoff, retries=retries,
+            bytes_sent=sent, bytes_received=received, error=error))
+
+    def send(self, request, **kwargs):
+        if self.cassette is None:
+            return super(ResilientSession, self).send(request, **kwargs)
+        return self.cassette.send(super(ResilientSession, self).send, request, **kwargs)
+
     def get(self, url, **kwargs):
         return self.__verb('GET', url, **kwargs)
 
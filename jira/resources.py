@@ -6,7 +6,9 @@ This module implements the Resource classes that translate JSON from JIRA REST r
 into usable objects.
 """
 
+import os
 import re
+import threading
 import logging
 try:  # Python 2.7+
     from logging import NullHandler
@@ -17,11 +19,18 @@ except ImportError:
             pass
 import json
 from datetime import datetime
+try:
+    from collections import OrderedDict
+except ImportError:
+    # noinspection PyUnresolvedReferences
+    from ordereddict import OrderedDict
 from operator import attrgetter
 from six import iteritems, string_types, text_type
 
-from .utils import (threaded_requests, json_loads, CaseInsensitiveDict,
-                    IssueHistory, get_utc)
+from .exceptions import JIRAError
+from .utils import (async_jobs, json_loads, CaseInsensitiveDict,
+                    IssueHistory, ChangelogTable, parse_jira_datetime,
+                    parse_jira_datetimes)
 logging.getLogger('jira').addHandler(NullHandler())
 
 
@@ -139,6 +148,11 @@ class Resource(object):
                 raise KeyError(item)
 
             if hasattr(self, 'raw') and item in self.raw:
+                if _is_lazy(self._options):
+                    # lazy hydration: build the attribute on first access and keep it
+                    value = _hydrate(item, self.raw[item], self._options, self._session)
+                    setattr(self, item, value)
+                    return value
                 return self.raw[item]
             else:
                 raise AttributeError(
@@ -182,7 +196,8 @@ class Resource(object):
         resource doesn't support ``PUT``, a :py:exc:`.JIRAError` will be raised; subclasses that specialize this method
         will only raise errors in case of user error.
 
-        :param async: if true the request will be added to the queue so it can be executed later using async_run()
+        :param async: if true the request is queued on the async pool and this method returns without waiting for it
+            nor reloading the resource; see :py:meth:`jira.client.JIRA.async_do`.
         """
         if async is None:
             async = self._options['async']
@@ -194,6 +209,11 @@ class Resource(object):
 
         data = json.dumps(data)
 
+        if async:
+            executor, jobs = async_jobs(self._session)
+            jobs.append(executor.put(self._session, self.self, data=data))
+            return
+
         r = self._session.put(
             self.self, data=data)
         if 'autofix' in self._options and \
@@ -247,16 +267,8 @@ class Resource(object):
                 # if 'assignee' not in data['fields']:
                 #    logging.warning("autofix: setting assignee to '%s' and retrying the update." % self._options['autofix'])
                 #    data['fields']['assignee'] = {'name': self._options['autofix']}
-            # EXPERIMENTAL --->
-            # import grequests
-            if async:
-                if not hasattr(self._session, '_async_jobs'):
-                    self._session._async_jobs = set()
-                self._session._async_jobs.add(threaded_requests.put(
-                    self.self, data=json.dumps(data)))
-            else:
-                r = self._session.put(
-                    self.self, data=json.dumps(data))
+            r = self._session.put(
+                self.self, data=json.dumps(data))
 
         self._load(self.self)
 
@@ -268,10 +280,8 @@ class Resource(object):
         """
 
         if self._options['async']:
-            if not hasattr(self._session, '_async_jobs'):
-                self._session._async_jobs = set()
-            self._session._async_jobs.add(
-                threaded_requests.delete(url=self.self, params=params))
+            executor, jobs = async_jobs(self._session)
+            jobs.append(executor.delete(self._session, self.self, params=params))
         else:
             r = self._session.delete(url=self.self, params=params)
 
@@ -287,8 +297,17 @@ class Resource(object):
         self._parse_raw(j)
 
     def _parse_raw(self, raw):
-        self.raw = raw
-        dict2resource(raw, self, self._options, self._session)
+        if _is_lazy(self._options):
+            # Forget the placeholders declared in __init__ and whatever was hydrated from a previous
+            # raw, __getattr__ will then build the attributes from the new raw when they are used.
+            previous = self.raw or {}
+            for name in list(vars(self)):
+                if name in raw or name in previous:
+                    delattr(self, name)
+            self.raw = raw
+        else:
+            self.raw = raw
+            dict2resource(raw, self, self._options, self._session)
 
     def _default_headers(self, user_headers):
         # result = dict(user_headers)
@@ -312,13 +331,68 @@ class Attachment(Resource):
         r = self._session.get(self.content)
         return r.content
 
-    def iter_content(self, chunk_size=1024):
+    def iter_content(self, chunk_size=64 * 1024):
         """
         Returns the file content as an iterable stream.
         """
         r = self._session.get(self.content, stream=True)
         return r.iter_content(chunk_size)
 
+    def download(self, path_or_file, chunk_size=1024 * 1024):
+        """
+        Stream the file content to disk without holding it in memory and return the number of bytes received.
+
+        Given a path, the content goes to ``<path>.part``, which is renamed to ``path`` once complete. A file at
+        ``path`` that already has the size of the attachment is not downloaded again, and a ``.part`` file left by an
+        interrupted download is resumed with an HTTP Range request if the server supports them. Given a file object
+        opened in binary mode, the content is written to it as is.
+
+        :param path_or_file: path of the file to write, or a writable file object
+        :param chunk_size: bytes read from the connection and written at a time
+        """
+        if not isinstance(path_or_file, string_types):
+            r = self._session.get(self.content, stream=True)
+            return self._write_content(r, path_or_file, chunk_size)
+
+        path = path_or_file
+        size = getattr(self, 'size', None)
+        if size is not None and os.path.isfile(path) and os.path.getsize(path) == size:
+            return 0
+
+        part = path + '.part'
+        offset = os.path.getsize(part) if os.path.isfile(part) else 0
+        if size is None or offset > size:
+            offset = 0
+
+        received = 0
+        if size is None or offset < size:
+            headers = {'Range': 'bytes=%s-' % offset} if offset else {}
+            r = self._session.get(self.content, stream=True, headers=headers)
+            if offset and r.status_code != 206:
+                # the server ignored the range and sends the whole file
+                offset = 0
+            with open(part, 'ab' if offset else 'wb') as f:
+                received = self._write_content(r, f, chunk_size)
+            if size is not None and offset + received != size:
+                raise JIRAError(None, 'Incomplete download of %s: %s of %s bytes, run it again to resume' % (
+                    self.filename, offset + received, size), self.content)
+
+        if os.path.exists(path):
+            os.remove(path)
+        os.rename(part, path)
+        return received
+
+    @staticmethod
+    def _write_content(r, f, chunk_size):
+        received = 0
+        try:
+            for chunk in r.iter_content(chunk_size):
+                f.write(chunk)
+                received += len(chunk)
+        finally:
+            r.close()
+        return received
+
 
 class Component(Resource):
 
@@ -519,70 +593,94 @@ class Issue(Resource):
         Check if the issue was created on the current board or if
         if was moved from another board to the current board.
         """
+        table = self.changelog_table()
+        if table is None:
+            return True
 
-        findings = []
-        histories = self.get_issue_changelog()
+        current_squad = self.current_squad()
+        squad_changes = table.positions('Squad')
+        if len(squad_changes) != len(table):
+            # some changes were not moves to a squad
+            return False
+        return all(table.to_string[i] == current_squad for i in squad_changes)
 
-        if histories is not None:
-            for history in histories:
+    def is_resolved(self):
+        return self.fields.status.name == 'Done'
 
-                moved_to_squad = [
-                    history.field == 'Squad',
-                    history.to_squad == self.current_squad()
-                ]
+    def changelog_table(self):
+        """
+        Get the changelog of the issue as a :py:class:`jira.utils.ChangelogTable`, or None if it has no histories.
 
-                findings.append(False if all(moved_to_squad) else True)
+        The changelog is parsed the first time it is needed and kept until the issue is reloaded from the server.
+        """
+        cached = self.__dict__.get('_changelog_table')
+        if cached is not None:
+            return cached[0]
 
-        return not any(findings)
+        histories = self._get_histories()
+        if histories is None:
+            table = None
+        else:
+            original_issue_created = parse_jira_datetime(self.fields.created)
+            creator_timezone = self.fields.creator.timeZone if self.fields.creator.timeZone else None
+            history_created = parse_jira_datetimes([history.created for history in histories])
+            rows = []
+            for history, created in zip(histories, history_created):
+                author = history.author
+                timezone = author.timeZone
 
-    def is_resolved(self):
-        return self.fields.status.name == 'Done'
+                for history_item in history.items:
+                    field = history_item.field
+                    from_string = history_item.fromString
+                    to_string = history_item.toString
+                    rows.append(IssueHistory(
+                        id=history.id if history.id else None,
+                        fda=self.key,
+                        dt_issue_created=original_issue_created if original_issue_created else None,
+                        creator_timezone=creator_timezone,
+                        author=author.displayName if author.displayName else None,
+                        author_email=author.emailAddress if author.emailAddress else None,
+                        author_display_name=author.displayName if author.displayName else None,
+                        user_active=author.active if author.active else None,
+                        # time the change was made.
+                        change_created=created if created else None,
+                        field=field if field else None,
+                        from_project=from_string if field == 'project' and from_string else None,
+                        to_project=to_string if field == 'project' and to_string else None,
+                        from_squad=from_string if field == 'Squad' and from_string else None,
+                        to_squad=to_string if field == 'Squad' and to_string else None,
+                        from_assignee=from_string if field == 'assignee' and from_string else None,
+                        to_assignee=to_string if field == 'assignee' and to_string else None,
+                        from_status=from_string if field == 'status' and from_string else None,
+                        to_status=to_string if field == 'status' and to_string else None,
+                        timezone=timezone))
+            table = ChangelogTable(rows, original_issue_created)
+
+        # the table is wrapped so that an issue without histories is cached as well
+        self._changelog_table = (table, )
+        return table
 
     def get_issue_changelog(self):
-        histories = []
-        if self._get_histories() is not None:
-            for history in self._get_histories():
-                timezone = history.author.timeZone
-                created = get_utc(history.created)
-                original_issue_created = get_utc(self.fields.created)
-
-                for history_item in history.items:
-                    h = {}
-                    h['id'] = history.id if history.id else None
-                    h['fda'] = self.key
-                    h['dt_issue_created'] = original_issue_created if original_issue_created else None
-                    h['creator_timezone'] = self.fields.creator.timeZone if self.fields.creator.timeZone else None
-                    h['author'] = history.author.displayName if history.author.displayName else None
-                    h['author_email'] = history.author.emailAddress if history.author.emailAddress else None
-                    h['author_display_name'] = history.author.displayName if history.author.displayName else None
-                    h['user_active'] = history.author.active if history.author.active else None
-                    # time the change was made.
-                    h['change_created'] = created if created else None
-                    h['field'] = history_item.field if history_item.field else None
-                    h['from_project'] = history_item.fromString if history_item.field == 'project' and history_item.fromString else None
-                    h['to_project'] = history_item.toString if history_item.field == 'project' and history_item.toString else None
-                    h['from_squad'] = history_item.fromString if history_item.field == 'Squad' and history_item.fromString else None
-                    h['to_squad'] = history_item.toString if history_item.field == 'Squad' and history_item.toString else None
-                    h['from_assignee'] = history_item.fromString if history_item.field == 'assignee' and history_item.fromString else None
-                    h['to_assignee'] = history_item.toString if history_item.field == 'assignee' and history_item.toString else None
-                    h['from_status'] = history_item.fromString if history_item.field == 'status' and history_item.fromString else None
-                    h['to_status'] = history_item.toString if history_item.field == 'status' and history_item.toString else None
-                    h['timezone'] = timezone
-                    histories.append(IssueHistory(**h))
-            return histories
-        else:
+        table = self.changelog_table()
+        if table is None:
             return None
+        return list(table.rows)
 
-    def get_board_entry_time(self, squad):
+    def _created(self):
+        table = self.changelog_table()
+        if table is not None:
+            return table.issue_created
+        return parse_jira_datetime(self.fields.created)
 
-        histories = self.get_issue_changelog()
+    def get_board_entry_time(self, squad):
 
         arrival_time = None
 
         if self.is_native():
-            return get_utc(self.fields.created)
+            return self._created()
 
-        if histories is not None:
+        table = self.changelog_table()
+        if table is not None:
             # time issue was moved to 'squad'.
             # No way of determining the time an issue arrived in triage.
             # We can see issues moving from triage and the time it happened,
@@ -592,49 +690,46 @@ class Issue(Resource):
             # where 'from_squad' == squad is 1, we can assume the date of original creation
             # is when the issue arrived in triage.
 
-            arrival_times = [history.change_created for num, history in enumerate(histories, 1) if all([
-                history.field == 'Squad',
-                history.to_squad == squad])]
-
-            if arrival_times:
-                arrival_time = arrival_times[0]
+            for i in table.positions('Squad'):
+                if table.to_string[i] == squad:
+                    arrival_time = table.change_created[i]
+                    break
 
         if not arrival_time:
-            arrival_time = get_utc(self.fields.created)
+            arrival_time = self._created()
 
         return arrival_time
 
     def get_board_exit_time(self, squad):
+        table = self.changelog_table()
+        if table is None:
+            return None
 
         if self.is_resolved():
-            for history in self.get_issue_changelog():
-                if history.to_status == 'Done':
-                    return history.change_created
+            for i in table.positions('status'):
+                if table.to_string[i] == 'Done':
+                    return table.change_created[i]
 
-        for history in self.get_issue_changelog():
-            if all([history.field == 'Squad',
-                    history.from_squad == squad,
-                    history.to_squad != squad]):
-                return history.change_created
+        for i in table.positions('Squad'):
+            if table.from_string[i] == squad and table.to_string[i] != squad:
+                return table.change_created[i]
 
     def get_board_duration(self, squad):
         """ How long has the issue been on the squad's board."""
         current_squad = self.fields.customfield_11100.value
         if current_squad != squad:
-            entered = self.get_board_entry_time(self)
-            exited = self.get_board_exit_time(self)
+            entered = self.get_board_entry_time(squad)
+            exited = self.get_board_exit_time(squad)
             delta = exited - entered
 
         else:
-            dt_created = self.fields.created
-            now = datetime.now()
-            now = now.strftime("%Y-%m-%dT%H:%M")
-            delta = get_utc(now) - get_utc(dt_created)
+            import pytz
+            delta = datetime.now(pytz.utc) - self._created()
 
         return delta
 
     def last_updated_by(self):
-        s = sorted(self.get_issue_changelog(), key=attrgetter('updated'))
+        s = sorted(self.get_issue_changelog(), key=attrgetter('change_created'))
         last = s.pop()
         return last.author_display_name
 
@@ -651,25 +746,30 @@ class Issue(Resource):
         if self.current_squad() == squad:
             return True
 
-        findings = []
         # check the changelog for squad moves.
-        changelog = self.get_issue_changelog()
-
-        for change in changelog:
-            seen = all([
-                change.field == 'Squad',
-                change.from_squad == squad or change.to_squad == squad])
-
-            findings.append(True if seen else False)
-
-        return any(findings)
+        table = self.changelog_table()
+        if table is None:
+            return False
+        for i in table.positions('Squad'):
+            if table.from_string[i] == squad or table.to_string[i] == squad:
+                return True
+        return False
 
     def get_status(self):
-        changelog = self.get_issue_changelog()
-        filtered = (i for i in changelog if all([i.from_status is not None,
-                                                 i.to_status is not None]))
-        last = max(filtered, key=lambda x: x.change_created)
-        return last.to_status.lower()
+        table = self.changelog_table()
+        last = None
+        for i in (table.positions('status') if table is not None else []):
+            if table.from_string[i] is not None and table.to_string[i] is not None:
+                if last is None or table.change_created[i] > table.change_created[last]:
+                    last = i
+        if last is None:
+            raise ValueError('No status changes found in the changelog of %s' % self.key)
+        return table.to_string[last].lower()
+
+    def _parse_raw(self, raw):
+        # a reload may bring a different changelog
+        self.__dict__.pop('_changelog_table', None)
+        super(Issue, self)._parse_raw(raw)
 
 
 class Comment(Resource):
@@ -688,7 +788,7 @@ class Comment(Resource):
             data['body'] = body
         if visibility:
             data['visibility'] = visibility
-        super(Comment, self).update(data)
+        super(Comment, self).update(data, async=async)
 
 
 class RemoteLink(Resource):
@@ -1022,6 +1122,75 @@ class Board(GreenHopperResource):
 # Utilities
 
 
+class PropertyHolder(object):
+
+    """
+    Attribute container for the JSON objects that have no ``self`` link, like ``issue.fields``.
+
+    All holders share this one class and keep their values in the instance ``__dict__``.
+    """
+
+
+class LazyPropertyHolder(PropertyHolder):
+
+    """
+    A ``PropertyHolder`` that keeps the raw JSON object and only builds an attribute the first time it is read.
+
+    Used instead of ``PropertyHolder`` when the ``lazy_hydration`` option is enabled.
+    """
+
+    def __init__(self, raw, options=None, session=None):
+        self._raw = raw
+        self._options = options
+        self._session = session
+
+    def __getattr__(self, item):
+        # Only called when the attribute was not hydrated yet
+        if item.startswith('__') or item in ('_raw', '_options', '_session') or item not in self._raw:
+            raise AttributeError(
+                "%r object has no attribute %r" % (self.__class__, item))
+        value = _hydrate(item, self._raw[item], self._options, self._session)
+        setattr(self, item, value)
+        return value
+
+
+def _is_lazy(options):
+    return bool(options and options.get('lazy_hydration'))
+
+
+_SEQUENCE_TYPES = tuple, list, set, frozenset
+_CONTAINER_TYPES = (dict, ) + _SEQUENCE_TYPES
+
+
+def _hydrate(key, value, options, session):
+    """
+    Return the attribute value ``dict2resource`` sets for the raw property ``key``.
+    """
+    if isinstance(value, dict):
+        if 'self' in value:
+            return cls_for_resource(value['self'])(options, session, value)
+        elif key == 'timetracking':
+            return TimeTracking(options, session, value)
+        elif _is_lazy(options):
+            return LazyPropertyHolder(value, options, session)
+        else:
+            return dict2resource(value, options=options, session=session)
+    elif isinstance(value, _SEQUENCE_TYPES):
+        seq_list = []
+        for seq_elem in value:
+            if isinstance(seq_elem, dict):
+                if 'self' in seq_elem:
+                    seq_list.append(cls_for_resource(seq_elem['self'])(options, session, seq_elem))
+                elif _is_lazy(options):
+                    seq_list.append(LazyPropertyHolder(seq_elem, options, session))
+                else:
+                    seq_list.append(dict2resource(seq_elem, options=options, session=session))
+            else:
+                seq_list.append(seq_elem)
+        return seq_list
+    return value
+
+
 def dict2resource(raw, top=None, options=None, session=None):
     """
     Recursively walks a dict structure, transforming the properties into attributes
@@ -1029,38 +1198,39 @@ def dict2resource(raw, top=None, options=None, session=None):
     or a ``PropertyHolder`` object (if no ``self`` link is present).
     """
     if top is None:
-        top = type(str('PropertyHolder'), (object,), raw)
+        top = PropertyHolder()
 
-    seqs = tuple, list, set, frozenset
     for i, j in iteritems(raw):
-        if isinstance(j, dict):
-            if 'self' in j:
-                resource = cls_for_resource(j['self'])(options, session, j)
-                setattr(top, i, resource)
-            elif i == 'timetracking':
-                setattr(top, 'timetracking', TimeTracking(options, session, j))
-            else:
-                setattr(
-                    top, i, dict2resource(j, options=options, session=session))
-        elif isinstance(j, seqs):
-            seq_list = []
-            for seq_elem in j:
-                if isinstance(seq_elem, dict):
-                    if 'self' in seq_elem:
-                        resource = cls_for_resource(seq_elem['self'])(
-                            options, session, seq_elem)
-                        seq_list.append(resource)
-                    else:
-                        seq_list.append(
-                            dict2resource(seq_elem, options=options, session=session))
-                else:
-                    seq_list.append(seq_elem)
-            setattr(top, i, seq_list)
-        else:
-            setattr(top, i, j)
+        if isinstance(j, _CONTAINER_TYPES):
+            j = _hydrate(i, j, options, session)
+        setattr(top, i, j)
     return top
 
-resource_class_map = {
+
+class _ResourceClassMap(dict):
+
+    """The dict of resource_class_map, counting its changes so that the compiled matcher knows when to rebuild."""
+
+    version = 0
+
+    def _changed(method):
+        def change(self, *args, **kwargs):
+            self.version += 1
+            return method(self, *args, **kwargs)
+        change.__name__ = method.__name__
+        return change
+
+    __setitem__ = _changed(dict.__setitem__)
+    __delitem__ = _changed(dict.__delitem__)
+    clear = _changed(dict.clear)
+    pop = _changed(dict.pop)
+    popitem = _changed(dict.popitem)
+    setdefault = _changed(dict.setdefault)
+    update = _changed(dict.update)
+    del _changed
+
+
+resource_class_map = _ResourceClassMap({
     # JIRA specific resources
     r'attachment/[^/]+$': Attachment,
     r'component/[^/]+$': Component,
@@ -1086,13 +1256,71 @@ resource_class_map = {
     # GreenHopper specific resources
     r'sprints/[^/]+$': Sprint,
     r'views/[^/]+$': Board,
-}
+})
+
+
+# Compiled form of resource_class_map, see _resource_class_matcher(): one tuple of the map and the version it was
+# compiled from, the regular expression, the class of each of its groups, whether any pattern contains a digit and
+# the LRU cache of the class resolved for each URL shape, replaced as a whole so that threads never see parts of different builds
+_resource_matcher = None
+_resource_matcher_lock = threading.Lock()
+
+_RESOURCE_CLASS_CACHE_SIZE = 1024
+_DIGIT = re.compile(r'\d')
+
+
+def _resource_map_version(class_map):
+    # a plain dict put in place of resource_class_map only tells when its size changes
+    return getattr(class_map, 'version', None), len(class_map)
+
+
+def _resource_class_matcher():
+    """
+    Compile all the patterns of resource_class_map into a single regular expression.
+
+    The alternatives are tried in a fixed order, the longest (most specific) pattern first, and each of them may match
+    anywhere in the URL just like the ``re.search`` it replaces. The matcher is compiled again whenever
+    resource_class_map changes.
+    """
+    global _resource_matcher
+    class_map = resource_class_map
+    matcher = _resource_matcher
+    if matcher is not None and matcher[0] is class_map and matcher[1] == _resource_map_version(class_map):
+        return matcher
+    with _resource_matcher_lock:
+        matcher = _resource_matcher
+        version = _resource_map_version(class_map)
+        if matcher is None or matcher[0] is not class_map or matcher[1] != version:
+            patterns = sorted(class_map, key=lambda pattern: (-len(pattern), pattern))
+            regex = re.compile('|'.join('.*?(?P<r%d>%s)' % (n, pattern) for n, pattern in enumerate(patterns)))
+            classes = dict(('r%d' % n, class_map[pattern]) for n, pattern in enumerate(patterns))
+            has_digits = any(_DIGIT.search(pattern) for pattern in patterns)
+            matcher = _resource_matcher = (class_map, version, regex, classes, has_digits, OrderedDict())
+    return matcher
 
 
 def cls_for_resource(resource_literal):
-    for resource in resource_class_map:
-        if re.search(resource, resource_literal):
-            return resource_class_map[resource]
-    else:
-        # Generic Resource without specialized update/delete behavior
-        return Resource
+    class_map, version, regex, classes, has_digits, cache = _resource_class_matcher()
+    if has_digits:
+        # a pattern added to the map tells some digits apart, the URLs cannot be grouped by shape
+        m = regex.match(resource_literal)
+        return classes[m.lastgroup] if m else Resource
+    # When none of the patterns contain digits, every digit is matched by the same pattern elements, so URLs that
+    # only differ in their IDs, like .../priority/1 and .../priority/3, resolve to the same class.
+    shape = _DIGIT.sub('0', resource_literal)
+    try:
+        cls = cache.pop(shape)
+    except KeyError:
+        m = regex.match(resource_literal)
+        if m:
+            cls = classes[m.lastgroup]
+        else:
+            # Generic Resource without specialized update/delete behavior
+            cls = Resource
+        if len(cache) >= _RESOURCE_CLASS_CACHE_SIZE:
+            try:
+                cache.popitem(last=False)
+            except KeyError:
+                pass
+    cache[shape] = cls
+    return cls
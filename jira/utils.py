@@ -1,13 +1,13 @@
 # -*- coding: utf-8 -*-
 from __future__ import unicode_literals
 import threading
-import json
-import pytz
 import re
-from datetime import datetime
+from datetime import datetime, timedelta
 from collections import namedtuple
+from functools import partial
 
-from .resilientsession import raise_on_error
+from .jsonlib import response_json
+from .resilientsession import raise_on_error, RetryLater
 
 IssueHistory = namedtuple('IssueHistory', [
     'id',
@@ -33,6 +33,41 @@ IssueHistory = namedtuple('IssueHistory', [
 
 
 
+class ChangelogTable(object):
+
+    """
+    Column oriented view of the changelog of an issue, built once from its ``IssueHistory`` rows.
+
+    Besides ``rows`` it holds one tuple per column (``field``, ``from_string``, ``to_string`` and ``change_created``)
+    and an index of the row numbers of every field, so questions about a single field only look at its own changes.
+    """
+
+    def __init__(self, rows, issue_created=None):
+        self.rows = tuple(rows)
+        self.issue_created = issue_created
+        self.field = tuple(row.field for row in self.rows)
+        self.from_string = tuple(row.from_project or row.from_squad or row.from_assignee or row.from_status
+                                 for row in self.rows)
+        self.to_string = tuple(row.to_project or row.to_squad or row.to_assignee or row.to_status
+                               for row in self.rows)
+        self.change_created = tuple(row.change_created for row in self.rows)
+
+        self._positions = {}
+        for position, field in enumerate(self.field):
+            self._positions.setdefault(field, []).append(position)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def positions(self, field):
+        """Row numbers of the changes of ``field``, in changelog order."""
+        return self._positions.get(field, [])
+
+    def changes(self, field):
+        """(from_string, to_string, change_created) of every change of ``field``, in changelog order."""
+        return [(self.from_string[i], self.to_string[i], self.change_created[i]) for i in self.positions(field)]
+
+
 class CaseInsensitiveDict(dict):
 
     """
@@ -67,7 +102,7 @@ class CaseInsensitiveDict(dict):
         super(CaseInsensitiveDict, self).__init__(*args, **kw)
 
         self.itemlist = {}
-        for key, value in super(CaseInsensitiveDict, self).items():
+        for key, value in list(super(CaseInsensitiveDict, self).items()):
             if key != key.lower():
                 self[key.lower()] = value
                 self.pop(key, None)
@@ -90,48 +125,319 @@ class CaseInsensitiveDict(dict):
     #    return (self[key] for key in self)
 
 
-def threaded_requests(requests):
-    for fn, url, request_args in requests:
-        th = threading.Thread(
-            target=fn, args=(url,), kwargs=request_args, name=url,
-        )
-        th.start()
+def thread_pool(workers):
+    """A ``multiprocessing.pool.ThreadPool`` of ``workers`` threads, the module being imported on first use only."""
+    from multiprocessing.pool import ThreadPool
+    return ThreadPool(workers)
+
+
+class AsyncJob(object):
+
+    """
+    A request queued by an async update or delete, and the future of its response.
+
+    ``status_code`` and ``exception`` are None until the request is done, see :py:meth:`done`. When the session
+    raises :py:exc:`jira.resilientsession.RetryLater`, the retry is handed back to ``executor`` to run once it is due,
+    instead of keeping a thread asleep.
+    """
+
+    def __init__(self, fn, url, kwargs, executor=None):
+        self.fn = fn
+        self.url = url
+        self.kwargs = kwargs
+        self.response = None
+        self.exception = None
+        self._executor = executor
+        self._retry = None
+        self._done = threading.Event()
+
+    def __repr__(self):
+        return '<AsyncJob %s %s status_code=%s>' % (getattr(self.fn, '__name__', self.fn), self.url, self.status_code)
+
+    @property
+    def status_code(self):
+        return self.response.status_code if self.response is not None else None
+
+    def run(self):
+        try:
+            if self._retry is not None:
+                self.response = self._retry()
+            else:
+                self.response = self.fn(self.url, **self.kwargs)
+        except RetryLater as e:
+            if self._executor is None:
+                self.exception = e
+            else:
+                self._retry = e.retry
+                self._executor.later(e.delay, self.run, cancelled=partial(self._fail, e))
+                return
+        except Exception as e:
+            self.exception = e
+        self._done.set()
+
+    def _fail(self, exception):
+        self.exception = exception
+        self._done.set()
+
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        """Wait until the request is done; return False if ``timeout`` seconds passed first."""
+        return self._done.wait(timeout)
+
+    def result(self, timeout=None):
+        """Return the response of the request, raising its error if it failed."""
+        self.wait(timeout)
+        if self.exception is not None:
+            raise self.exception
+        return self.response
+
+
+class ThreadedRequests(object):
+
+    """
+    Bounded pool of threads running :py:class:`AsyncJob` requests.
+
+    The threads are only started when the first job is submitted.
 
-    for th in threading.enumerate():
-        if th.name.startswith('http'):
-            th.join()
+    :param workers: number of requests run at the same time
+    """
+
+    def __init__(self, workers=10):
+        self.workers = workers
+        self._pool = None
+        self._timers = {}
+        self._lock = threading.Lock()
+
+    def submit(self, fn, url, **kwargs):
+        """Queue ``fn(url, **kwargs)`` and return its :py:class:`AsyncJob`."""
+        job = AsyncJob(fn, url, kwargs, executor=self)
+        self._apply(job.run)
+        return job
+
+    def _apply(self, fn):
+        with self._lock:
+            if self._pool is None:
+                self._pool = thread_pool(self.workers)
+            self._pool.apply_async(fn)
+
+    def later(self, delay, fn, cancelled=None):
+        """
+        Run ``fn`` on the pool once ``delay`` seconds have passed, without holding a thread of the pool until then.
+
+        If the executor is closed first, ``fn`` is never run and ``cancelled()`` is called instead.
+        """
+        timer = threading.Timer(delay, self._fire)
+        timer.args = (timer, fn)
+        timer.daemon = True
+        with self._lock:
+            self._timers[timer] = cancelled
+        timer.start()
+
+    def _fire(self, timer, fn):
+        with self._lock:
+            if timer not in self._timers:
+                # cancelled by close()
+                return
+            del self._timers[timer]
+        self._apply(fn)
+
+    def put(self, session, url, **kwargs):
+        return self.submit(session.put, url, **kwargs)
+
+    def post(self, session, url, **kwargs):
+        return self.submit(session.post, url, **kwargs)
+
+    def delete(self, session, url, **kwargs):
+        return self.submit(session.delete, url, **kwargs)
+
+    @staticmethod
+    def map(jobs, timeout=None):
+        """Wait for ``jobs`` and return their responses, None for the ones which failed."""
+        responses = []
+        for job in jobs:
+            job.wait(timeout)
+            responses.append(job.response)
+        return responses
+
+    def close(self):
+        """Let the queued jobs finish and stop the threads afterwards; the retries which are not due yet are dropped."""
+        with self._lock:
+            timers, self._timers = self._timers, {}
+            if self._pool is not None:
+                self._pool.close()
+                self._pool = None
+        for timer, cancelled in timers.items():
+            timer.cancel()
+            if cancelled is not None:
+                cancelled()
+
+    def __call__(self, requests):
+        # the function this class replaced: run (fn, url, kwargs) requests and wait for all of them
+        return self.map([self.submit(fn, url, **request_args) for fn, url, request_args in requests])
+
+
+# jobs of sessions which do not come with their own pool, see async_jobs()
+threaded_requests = ThreadedRequests()
+
+
+def async_jobs(session):
+    """Return the pool running the async requests of ``session`` and the list of the jobs queued on it."""
+    executor = getattr(session, '_async_executor', None) or threaded_requests
+    jobs = getattr(session, '_async_jobs', None)
+    if jobs is None:
+        jobs = session._async_jobs = []
+    return executor, jobs
 
 
 def json_loads(r):
     raise_on_error(r)
-    if len(r.text):  # r.status_code != 204:
-        return json.loads(r.text)
+    # parsed from the bytes of the body, {} when it is empty as with 204 answers
+    return response_json(r)
+
+
+# JIRA renders timestamps as 2016-01-04T10:00:00.000+0000; seconds, fraction and offset are optional here.
+_JIRA_DATETIME = re.compile(r'(\d{4})-(\d\d)-(\d\d)T(\d\d):(\d\d)(?::(\d\d)(?:\.(\d{1,6}))?)?'
+                            r'(?:(Z)|([+-])(\d\d):?(\d\d))?$')
+_EPOCH_ORDINAL = datetime(1970, 1, 1).toordinal()
+_timezones = {}
+
+
+def get_timezone(name):
+    """Return the pytz timezone called ``name``, looking each name up only once.
+
+    pytz itself is only imported by the first call.
+    """
+    try:
+        return _timezones[name]
+    except KeyError:
+        import pytz
+        tz = _timezones[name] = pytz.timezone(name)
+        return tz
+
+
+def _split_jira_datetime(date_string):
+    """Split a JIRA timestamp into (year, month, day, hour, minute, second, microsecond, utc offset in seconds).
+
+    The offset is None when the string does not carry one.
+    """
+    s = date_string
+    # fast path for the exact format JIRA sends: 2016-01-04T10:00:00.000+0000
+    if len(s) == 28 and s[10] == 'T' and s[19] == '.' and s[23] in '+-':
+        try:
+            offset = int(s[24:26]) * 3600 + int(s[26:28]) * 60
+            return (int(s[0:4]), int(s[5:7]), int(s[8:10]), int(s[11:13]), int(s[14:16]), int(s[17:19]),
+                    int(s[20:23]) * 1000, -offset if s[23] == '-' else offset)
+        except ValueError:
+            pass
+
+    m = _JIRA_DATETIME.match(s)
+    if m is None:
+        raise ValueError('Not a JIRA timestamp: %r' % (date_string, ))
+    year, month, day, hour, minute, second, fraction, zulu, sign, off_hours, off_minutes = m.groups()
+    if zulu:
+        offset = 0
+    elif sign:
+        offset = int(off_hours) * 3600 + int(off_minutes) * 60
+        if sign == '-':
+            offset = -offset
     else:
-        # json.loads() fails with empy bodies
-        return {}
+        offset = None
+    return (int(year), int(month), int(day), int(hour), int(minute), int(second or 0),
+            int((fraction or '0').ljust(6, '0')), offset)
+
+
+def parse_jira_datetime(date_string, timezone='Europe/London'):
+    """Parse a JIRA timestamp into an aware UTC datetime.
+
+    The UTC offset in the string is honoured; strings without one are read as local time in ``timezone``.
+    Datetimes are accepted too and converted to UTC the same way.
+
+    :type date_string str
+    :rtype datetime
+    """
+    utc = _timezones.get('UTC') or get_timezone('UTC')
+    if isinstance(date_string, datetime):
+        dt = date_string
+        if dt.tzinfo is None:
+            dt = get_timezone(timezone).localize(dt, is_dst=None)
+        return dt.astimezone(utc)
+
+    year, month, day, hour, minute, second, microsecond, offset = _split_jira_datetime(date_string)
+    dt = datetime(year, month, day, hour, minute, second, microsecond)
+    if offset is None:
+        return get_timezone(timezone).localize(dt, is_dst=None).astimezone(utc)
+    if offset:
+        dt -= timedelta(seconds=offset)
+    return dt.replace(tzinfo=utc)
+
+
+def parse_jira_timestamp(date_string, timezone='Europe/London'):
+    """Parse a JIRA timestamp into integer milliseconds since the Unix epoch.
+
+    :type date_string str
+    :rtype int
+    """
+    if not isinstance(date_string, datetime):
+        year, month, day, hour, minute, second, microsecond, offset = _split_jira_datetime(date_string)
+        if offset is not None:
+            days = datetime(year, month, day).toordinal() - _EPOCH_ORDINAL
+            seconds = days * 86400 + hour * 3600 + minute * 60 + second - offset
+            return seconds * 1000 + microsecond // 1000
+
+    dt = parse_jira_datetime(date_string, timezone)
+    seconds = (dt.toordinal() - _EPOCH_ORDINAL) * 86400 + dt.hour * 3600 + dt.minute * 60 + dt.second
+    return seconds * 1000 + dt.microsecond // 1000
+
+
+def parse_jira_datetimes(date_strings, epoch=False, timezone='Europe/London'):
+    """Parse a column of JIRA timestamps at once.
+
+    Returns a list of aware UTC datetimes, or of epoch milliseconds if ``epoch`` is True.
+    Repeated strings, which are common in changelogs, are only parsed once. None stays None.
+
+    :type date_strings iterable
+    :rtype list
+    """
+    parse = parse_jira_timestamp if epoch else parse_jira_datetime
+    seen = {None: None}
+    result = []
+    for date_string in date_strings:
+        try:
+            value = seen[date_string]
+        except KeyError:
+            value = seen[date_string] = parse(date_string, timezone)
+        result.append(value)
+    return result
 
 
 def make_naive_datetime(date_string):
-    try:
-        # convert datetime to string.
-        dt = datetime.strftime(date_string, "%Y-%m-%dT%H:%M")
+    if isinstance(date_string, datetime):
+        return date_string.replace(second=0, microsecond=0, tzinfo=None)
 
-        # stip everything after seconds. ie all +HH:MM for timezone.
-        dt = re.sub(r':\d{2}\..*$', '', dt)
+    try:
+        year, month, day, hour, minute = _split_jira_datetime(date_string)[:5]
+        return datetime(year, month, day, hour, minute)
+    except ValueError:
+        pass
 
-    except TypeError:
-        dt = re.sub(r':\d{2}\..*$', '', date_string)
+    # stip everything after seconds. ie all +HH:MM for timezone.
+    dt = re.sub(r':\d{2}\..*$', '', date_string)
 
     return datetime.strptime(dt, "%Y-%m-%dT%H:%M")
 
 
 def get_utc(date_string, timezone='Europe/London'):
     '''
+    Truncate a timestamp to the minute and read it as local time in ``timezone``, ignoring any offset.
+    Use :py:func:`parse_jira_datetime` to honour the offset JIRA sends.
+
     :type date_string str
     :rtype datetime
     '''
     naive = make_naive_datetime(date_string)
-    local = pytz.timezone(timezone)
+    local = get_timezone(timezone)
     local_dt = local.localize(naive, is_dst=None)
-    utc_dt = local_dt.astimezone(pytz.utc)
+    utc_dt = local_dt.astimezone(get_timezone('UTC'))
     return utc_dt
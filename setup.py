@@ -158,6 +158,8 @@ setup(
     extras_require={
         'magic': ['filemagic>=1.6'],
         'shell': ['ipython>=0.13'],
+        'analytics': ['numpy'],
+        'aio': ['aiohttp'],
     },
     entry_points={
         'console_scripts':
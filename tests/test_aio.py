@@ -0,0 +1,125 @@
+import json
+import sys
+
+import pytest
+
+if sys.version_info < (3, 5):
+    pytest.skip('AsyncJIRA needs Python 3.5+', allow_module_level=True)
+pytest.importorskip('aiohttp')
+
+import asyncio  # noqa: E402
+
+from jira.aio import AsyncJIRA, _Response  # noqa: E402
+from jira.exceptions import JIRAError  # noqa: E402
+from jira.resilientsession import RetryPolicy  # noqa: E402
+from jira.resources import Comment, Issue  # noqa: E402
+
+SERVER = 'http://localhost:2990/jira'
+
+
+def _client(answers):
+    """An AsyncJIRA whose requests are answered from ``answers``, keyed by (verb, path, startAt)."""
+    client = AsyncJIRA(SERVER)
+    client.sent = []
+
+    def request(verb, url, params=None, data=None):
+        path = url[len(SERVER + '/rest/api/2/'):]
+        start_at = (params or {}).get('startAt', 0)
+        client.sent.append((verb, path, start_at, data))
+        status, body = answers[verb, path, start_at]
+        future = asyncio.Future()
+        future.set_result(_Response(status, 'OK', {}, json.dumps(body).encode('utf-8'), url))
+        return future
+    client._request = request
+    return client
+
+
+def _run(coroutine):
+    return asyncio.get_event_loop().run_until_complete(coroutine)
+
+
+def _issue(i):
+    return {'id': str(i), 'key': 'TST-%s' % i, 'self': SERVER + '/rest/api/2/issue/%s' % i,
+            'fields': {'summary': 'Issue %s' % i}}
+
+
+def test_search_issues_requests_remaining_pages_at_once():
+    answers = {}
+    for start in range(0, 7, 3):
+        issues = [_issue(i) for i in range(start, min(start + 3, 7))]
+        answers['GET', 'search', start] = 200, {'startAt': start, 'maxResults': 3, 'total': 7, 'issues': issues}
+    client = _client(answers)
+    issues = _run(client.search_issues('project = TST', maxResults=False))
+    assert [i.key for i in issues] == ['TST-%s' % i for i in range(7)]
+    assert all(isinstance(i, Issue) for i in issues)
+    assert issues[0].fields.summary == 'Issue 0'
+    assert issues.total == 7
+    assert sorted(start for _, _, start, _ in client.sent) == [0, 3, 6]
+
+
+def test_issue_comments_and_transitions():
+    client = _client({
+        ('GET', 'issue/TST-1', 0): (200, _issue(1)),
+        ('GET', 'issue/TST-1/comment', 0): (200, {'comments': [
+            {'id': '5', 'body': 'Hi', 'self': SERVER + '/rest/api/2/issue/1/comment/5'}]}),
+        ('GET', 'issue/TST-1/transitions', 0): (200, {'transitions': [{'id': '21', 'name': 'Done'}]}),
+        ('POST', 'issue/TST-1/transitions', 0): (204, {}),
+    })
+    issue = _run(client.issue('TST-1'))
+    assert issue.fields.summary == 'Issue 1'
+    comments = _run(client.comments(issue))
+    assert isinstance(comments[0], Comment) and comments[0].body == 'Hi'
+    _run(client.transition_issue(issue, 'done', resolution={'name': 'Fixed'}))
+    assert client.sent[-1][3] == {'transition': {'id': '21'}, 'fields': {'resolution': {'name': 'Fixed'}}}
+    with pytest.raises(JIRAError):
+        _run(client.transition_issue(issue, 'Reopen'))
+
+
+def test_requests_over_http_are_limited_and_retried(caplog):
+    from aiohttp import web
+
+    state = {'in_flight': 0, 'most': 0, 'failures': {}}
+
+    async def issue(request):
+        key = request.match_info['key']
+        assert request.headers['Authorization'].startswith('Basic ')
+        state['in_flight'] += 1
+        state['most'] = max(state['most'], state['in_flight'])
+        try:
+            await asyncio.sleep(0.01)
+        finally:
+            state['in_flight'] -= 1
+        # every issue is answered 503 once before it is found, TST-9 never is
+        failures = state['failures'][key] = state['failures'].get(key, 0) + 1
+        if key == 'TST-9':
+            return web.json_response({'errorMessages': ['Issue Does Not Exist']}, status=404)
+        if failures == 1:
+            return web.json_response({'errorMessages': ['Busy']}, status=503)
+        number = int(key.split('-')[1])
+        return web.json_response(_issue(number))
+
+    async def scenario():
+        app = web.Application()
+        app.router.add_get('/jira/rest/api/2/issue/{key}', issue)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        try:
+            async with AsyncJIRA('http://127.0.0.1:%s/jira' % port, basic_auth=('admin', 'admin'), max_concurrency=2,
+                                 options={'retry_policy': RetryPolicy(max_retries=1, backoff=0)}) as client:
+                issues = await asyncio.gather(*[client.issue('TST-%s' % i) for i in range(1, 7)])
+                with pytest.raises(JIRAError) as error:
+                    await client.issue('TST-9')
+            return issues, error.value
+        finally:
+            await runner.cleanup()
+
+    issues, error = _run(scenario())
+    assert [i.key for i in issues] == ['TST-%s' % i for i in range(1, 7)]
+    assert state['most'] == 2
+    assert all(state['failures']['TST-%s' % i] == 2 for i in range(1, 7))
+    assert error.status_code == 404 and state['failures']['TST-9'] == 1
+    # the limit of the policy is the one logged
+    assert 'will retry [1/1]' in caplog.text
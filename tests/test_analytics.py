@@ -0,0 +1,92 @@
+from datetime import datetime
+
+import pytest
+import pytz
+
+from jira.analytics import board_flow
+from jira.resources import Issue
+
+SERVER = 'http://localhost:2990/jira'
+OPTIONS = {'server': SERVER, 'rest_path': 'api', 'rest_api_version': '2', 'async': False}
+NOW = datetime(2016, 2, 1, tzinfo=pytz.utc)
+SQUADS = ['Red', 'Green', 'Blue']
+
+
+def _raw_issue(key, squad, status, *histories):
+    author = {'self': SERVER + '/rest/api/2/user?username=ann', 'name': 'ann', 'displayName': 'Ann',
+              'emailAddress': 'ann@example.com', 'active': True, 'timeZone': 'Europe/London'}
+    return {
+        'id': key.split('-')[1],
+        'key': key,
+        'self': SERVER + '/rest/api/2/issue/' + key.split('-')[1],
+        'fields': {
+            'created': '2016-01-04T10:00:00.000+0000',
+            'creator': author,
+            'status': {'self': SERVER + '/rest/api/2/status/1', 'name': status},
+            'customfield_11100': {'self': SERVER + '/rest/api/2/customFieldOption/1', 'value': squad},
+        },
+        'changelog': {'histories': [
+            {'id': str(i), 'created': created, 'author': author,
+             'items': [dict(zip(('field', 'fromString', 'toString'), item)) for item in items]}
+            for i, (created, items) in enumerate(histories)]},
+    }
+
+
+ISSUES = [
+    _raw_issue('TST-1', 'Blue', 'Done',
+               ('2016-01-05T09:00:00.000+0000', [('Squad', 'Red', 'Green')]),
+               ('2016-01-06T09:00:00.000+0100', [('status', 'Open', 'In Progress'), ('Squad', 'Green', 'Blue')]),
+               ('2016-01-07T09:00:00.000+0000', [('status', 'In Progress', 'Done')])),
+    _raw_issue('TST-2', 'Red', 'Open'),
+    _raw_issue('TST-3', 'Green', 'Open',
+               ('2016-01-05T09:00:00.000+0000', [('Squad', None, 'Green')])),
+    _raw_issue('TST-4', 'Green', 'In Progress',
+               ('2016-01-05T09:00:00.000+0000', [('Squad', 'Red', 'Blue')]),
+               ('2016-01-08T09:00:00.000+0000', [('Squad', 'Blue', 'Green'), ('assignee', None, 'Ann')])),
+]
+
+
+def test_board_flow_matches_issue_methods():
+    flows = board_flow(ISSUES, SQUADS, now=NOW)
+    assert [(f.key, f.squad) for f in flows] == [(raw['key'], squad) for raw in ISSUES for squad in SQUADS]
+
+    for flow in flows:
+        issue = Issue(OPTIONS, None, [raw for raw in ISSUES if raw['key'] == flow.key][0])
+        assert flow.current_squad == issue.current_squad()
+        assert flow.native == issue.is_native()
+        assert flow.seen == issue.seen_by_squad(flow.squad)
+        assert flow.resolved == issue.is_resolved()
+        assert flow.entered == issue.get_board_entry_time(flow.squad)
+        assert flow.exited == issue.get_board_exit_time(flow.squad)
+        if flow.squad == issue.current_squad():
+            assert flow.duration == NOW - issue._created()
+        elif flow.exited is not None:
+            assert flow.duration == issue.get_board_duration(flow.squad)
+        else:
+            assert flow.duration is None
+
+
+def test_board_flow_accepts_issues_and_one_squad():
+    flows = board_flow([Issue(OPTIONS, None, raw) for raw in ISSUES], 'Green', now=NOW)
+    assert [f.key for f in flows] == ['TST-1', 'TST-2', 'TST-3', 'TST-4']
+    assert [f.seen for f in flows] == [True, False, True, True]
+
+
+def test_board_flow_needs_changelog():
+    raw = _raw_issue('TST-5', 'Red', 'Open')
+    del raw['changelog']
+    with pytest.raises(ValueError):
+        board_flow([raw], 'Red')
+
+
+def test_board_flow_as_array():
+    numpy = pytest.importorskip('numpy')
+    flows = board_flow(ISSUES, SQUADS, now=NOW)
+    array = board_flow(ISSUES, SQUADS, now=NOW, as_array=True)
+    assert list(array['key']) == [f.key for f in flows]
+    assert list(array['native']) == [f.native for f in flows]
+    for flow, exited in zip(flows, array['exited']):
+        if flow.exited is None:
+            assert numpy.isnat(exited)
+        else:
+            assert exited == numpy.datetime64(flow.exited.replace(tzinfo=None), 'ms')
@@ -0,0 +1,102 @@
+import pickle
+
+import jira.client
+from jira.cache import IssueCache, updated_since_jql
+
+
+def _raw(key, updated, summary='A summary'):
+    return {'id': key.split('-')[1], 'key': key, 'self': 'http://localhost:2990/jira/rest/api/2/issue/' + key,
+            'fields': {'summary': summary, 'updated': updated}}
+
+
+def _cached_client(results):
+    """A JIRA client with an in-memory issue cache whose searches answer from ``results``, keyed by JQL."""
+    client = jira.client.JIRA.__new__(jira.client.JIRA)
+    client._options = dict(jira.client.JIRA.DEFAULT_OPTIONS)
+    client._session = None
+    client._fields = {}
+    client._issue_cache = IssueCache()
+    client.searched = []
+
+    def get_json(path, params=None, base=None):
+        if path == 'myself':
+            return {'name': 'admin', 'timeZone': 'UTC'}
+        client.searched.append(params['jql'])
+        issues = results[params['jql']]
+        page = issues[params['startAt']:params['startAt'] + params['maxResults']]
+        return {'startAt': params['startAt'], 'maxResults': params['maxResults'], 'total': len(issues),
+                'issues': page}
+    client._get_json = get_json
+    return client
+
+
+def test_updated_since_jql():
+    updated = '2016-01-04T10:05:33.000+0100'
+    assert updated_since_jql('project = TST', updated, 'Europe/Paris') == \
+        '(project = TST) AND updated >= "2016/01/04 10:05"'
+    assert updated_since_jql('project = TST ORDER BY key', updated, 'Europe/Paris') == \
+        '(project = TST) AND updated >= "2016/01/04 10:05" ORDER BY key'
+    assert updated_since_jql('', updated, 'Europe/Paris') == 'updated >= "2016/01/04 10:05"'
+
+
+def test_updated_since_jql_in_the_time_zone_of_the_user():
+    updated = '2016-01-04T10:05:33.000+0100'
+    # the server renders dates in its own time zone, JQL reads them in the one of the user
+    assert updated_since_jql('', updated, 'America/New_York') == 'updated >= "2016/01/04 04:05"'
+    assert updated_since_jql('', updated, 'Asia/Tokyo') == 'updated >= "2016/01/04 18:05"'
+    # unknown: early enough for any time zone
+    assert updated_since_jql('', updated) == 'updated >= "2016/01/03 21:05"'
+    assert updated_since_jql('', updated, 'Nowhere/Special') == 'updated >= "2016/01/03 21:05"'
+
+
+def test_sync_fetches_only_updated_issues():
+    jql = 'project = TST ORDER BY key'
+    delta = '(project = TST) AND updated >= "2016/01/04 10:05" ORDER BY key'
+    client = _cached_client({
+        jql: [_raw('TST-1', '2016-01-04T09:00:00.000+0000'), _raw('TST-2', '2016-01-04T10:05:00.000+0000')],
+        delta: [_raw('TST-2', '2016-01-05T08:00:00.000+0000', 'Changed'), _raw('TST-3', '2016-01-05T09:00:00.000+0000')],
+    })
+
+    assert client.sync_issues(jql) == 2
+    assert [i.key for i in client.search_issues(jql, maxResults=False)] == ['TST-1', 'TST-2']
+
+    assert client.sync_issues(jql) == 2
+    assert client.searched == [jql, delta]
+    issues = client.search_issues(jql, maxResults=False)
+    assert [(i.key, i.fields.summary) for i in issues] == [('TST-1', 'A summary'), ('TST-2', 'Changed'),
+                                                           ('TST-3', 'A summary')]
+    assert issues.total == 3
+    page = client.search_issues(jql, startAt=1, maxResults=1)
+    assert [i.key for i in page] == ['TST-2'] and page.total == 3 and not page.isLast
+    # everything above was served from the cache
+    assert client.searched == [jql, delta]
+    assert client._issue_cache.last_updated(jql, IssueCache.variant()) == '2016-01-05T09:00:00.000+0000'
+
+
+def test_stale_searches_go_to_the_server():
+    jql = 'project = TST'
+    client = _cached_client({jql: [_raw('TST-1', '2016-01-04T09:00:00.000+0000')]})
+    client.sync_issues(jql)
+    client._issue_cache.invalidate('TST-1')
+    assert [i.key for i in client.search_issues(jql)] == ['TST-1']
+    assert client.searched == [jql, jql]
+
+
+def test_issue_cache_variants_and_freshness():
+    cache = IssueCache(max_age=60)
+    raw = _raw('TST-1', '2016-01-04T09:00:00.000+0000')
+    cache.put_issues([raw], cache.variant('summary,updated', None, '*all'))
+    assert cache.get_issue('TST-1', cache.variant(['updated', 'summary'], None, '*all')) == raw
+    assert cache.get_issue('1', cache.variant(['updated', 'summary'], None, '*all')) == raw
+    assert cache.get_issue('TST-1', cache.variant(None, None, '*all')) is None
+    assert cache.get_issue('TST-1', cache.variant('summary,updated', 'changelog', '*all')) is None
+    cache.max_age = -1
+    assert cache.get_issue('TST-1', cache.variant('summary,updated', None, '*all')) is None
+
+
+def test_issue_cache_pickles(tmpdir):
+    path = str(tmpdir.join('issues.db'))
+    cache = IssueCache(path)
+    cache.put_issues([_raw('TST-1', '2016-01-04T09:00:00.000+0000')], 'v')
+    copy = pickle.loads(pickle.dumps(cache))
+    assert copy.get_issue('TST-1', 'v')['key'] == 'TST-1'
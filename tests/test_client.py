@@ -1,6 +1,12 @@
 import json
+import os
+import subprocess
+import sys
+
+import pytest
 
 import jira.client
+import jira.utils
 
 
 def test_template_list():
@@ -10,3 +16,479 @@ def test_template_list():
     assert [t['name'] for t in template_list] == ["Scrum software development", "Kanban software development", "Basic software development",
                                                   "Basic Service Desk", "IT Service Desk", "Task management", "Project management",
                                                   "Process management"]
+
+
+def _offline_client(pages, **options):
+    """A JIRA client that never touches the network and serves ``pages`` keyed by ``startAt``."""
+    client = jira.client.JIRA.__new__(jira.client.JIRA)
+    client._options = dict(jira.client.JIRA.DEFAULT_OPTIONS, **options)
+    client._session = None
+    client._fields = {}
+    client._issue_cache = None
+    client._metadata_cache = None
+    client.requested = []
+
+    def get_json(path, params=None, base=None):
+        client.requested.append(params.get('startAt', 0))
+        return pages[params.get('startAt', 0)]
+    client._get_json = get_json
+    return client
+
+
+def _search_pages(total, page_size):
+    pages = {}
+    for start in range(0, total, page_size):
+        issues = [{'id': str(i), 'key': 'TST-%s' % i} for i in range(start, min(start + page_size, total))]
+        pages[start] = {'startAt': start, 'maxResults': page_size, 'total': total, 'issues': issues}
+    return pages
+
+
+def test_fetch_pages_all_items_serial():
+    client = _offline_client(_search_pages(7, 3))
+    issues = client._fetch_pages(jira.client.Issue, 'issues', 'search', 0, False)
+    assert [i.key for i in issues] == ['TST-%s' % i for i in range(7)]
+    assert client.requested == [0, 3, 6]
+    assert issues.isLast is True
+
+
+def test_fetch_pages_is_last_only_on_the_last_page():
+    client = _offline_client(_search_pages(7, 3))
+    assert client._fetch_pages(jira.client.Issue, 'issues', 'search', 0, 3).isLast is False
+    assert client._fetch_pages(jira.client.Issue, 'issues', 'search', 6, 3).isLast is True
+
+
+def test_fetch_pages_all_items_concurrent():
+    client = _offline_client(_search_pages(25, 2), fetch_workers=4)
+    issues = client._fetch_pages(jira.client.Issue, 'issues', 'search', 0, False)
+    assert [i.key for i in issues] == ['TST-%s' % i for i in range(25)]
+    assert sorted(client.requested) == list(range(0, 25, 2))
+    assert issues.total == 25
+    assert issues.isLast is True
+
+
+def test_iter_pages_yields_every_item_in_order():
+    client = _offline_client(_search_pages(7, 3))
+    items = client._iter_pages(jira.client.Issue, 'issues', 'search', pageSize=3)
+    assert [i.key for i in items] == ['TST-%s' % i for i in range(7)]
+    assert client.requested == [0, 3, 6]
+
+
+def test_iter_pages_stops_at_max_results():
+    client = _offline_client(_search_pages(7, 3))
+    items = client._iter_pages(jira.client.Issue, 'issues', 'search', maxResults=4, pageSize=3)
+    assert [i.key for i in items] == ['TST-0', 'TST-1', 'TST-2', 'TST-3']
+
+
+def test_pages_wait_for_deferred_retries():
+    import requests
+    from jira.resilientsession import RetryLater
+
+    deferred = []
+
+    def page(start):
+        response = requests.models.Response()
+        response.status_code = 200
+        response._content = json.dumps(_search_pages(7, 3)[start]).encode('utf-8')
+        return lambda: response
+
+    def client(workers):
+        client = _offline_client(_search_pages(7, 3), fetch_workers=workers)
+        get_json = client._get_json
+
+        def deferring_get_json(path, params=None, base=None):
+            start = params.get('startAt', 0)
+            if start == 3:
+                deferred.append(start)
+                # deferred twice before it is sent
+                raise RetryLater(0, lambda: (_ for _ in ()).throw(RetryLater(0, page(start))))
+            return get_json(path, params, base)
+        client._get_json = deferring_get_json
+        return client
+
+    for workers in (1, 4):
+        issues = client(workers)._fetch_pages(jira.client.Issue, 'issues', 'search', 0, False)
+        assert [i.key for i in issues] == ['TST-%s' % i for i in range(7)]
+        items = client(workers)._iter_pages(jira.client.Issue, 'issues', 'search', pageSize=3)
+        assert [i.key for i in items] == ['TST-%s' % i for i in range(7)]
+    assert deferred == [3] * 4
+
+
+def test_session_pool_follows_fetch_workers():
+    client = _offline_client({}, fetch_workers=32, timeout=[3.05, 27])
+    session = client._create_session()
+    assert session.get_adapter(client._options['server'])._pool_maxsize == 32
+    assert session.timeout == (3.05, 27)
+    assert session.verify is True
+
+
+class _RecordingSession(object):
+    def __init__(self):
+        self.sent = []
+        self._async_executor = jira.utils.ThreadedRequests(2)
+
+    def put(self, url, **kwargs):
+        self.sent.append(('PUT', url))
+        if url.endswith('/2'):
+            raise jira.client.JIRAError(400, 'Field summary is required', url)
+        return type(str('Response'), (object,), {'status_code': 204})()
+
+    def delete(self, url, **kwargs):
+        self.sent.append(('DELETE', url))
+        return type(str('Response'), (object,), {'status_code': 204})()
+
+
+def test_async_updates_and_deletes_are_queued_jobs():
+    client = _offline_client({}, **{'async': True})
+    client._session = _RecordingSession()
+    server = client._options['server']
+    issues = [jira.client.Issue(client._options, client._session,
+                                {'id': str(i), 'key': 'TST-%s' % i, 'self': server + '/rest/api/2/issue/%s' % i})
+              for i in range(1, 4)]
+    for issue in issues:
+        issue.update(fields={'summary': 'Changed'})
+    issues[0].delete()
+
+    jobs = client.async_do()
+    assert [job.status_code for job in jobs] == [204, None, 204, 204]
+    assert isinstance(jobs[1].exception, jira.client.JIRAError)
+    assert sorted(client._session.sent) == sorted([('PUT', issue.self) for issue in issues] +
+                                                  [('DELETE', issues[0].self)])
+    assert client.async_do() == []
+
+
+def test_issues_fetches_chunks_in_requested_order():
+    import re
+    import warnings
+
+    client = _offline_client({}, fetch_workers=3)
+    searched = []
+
+    def get_json(path, params=None, base=None):
+        keys = re.findall(r'"([^"]+)"', params['jql'])
+        searched.append(keys)
+        # keys or IDs, the ID of TST-n is 100 + n
+        numbers = [int(k) - 100 if k.isdigit() else int(k.split('-')[1]) for k in keys]
+        issues = [{'id': str(100 + n), 'key': 'TST-%s' % n} for n in numbers if n != 4]
+        return {'startAt': 0, 'maxResults': 50, 'total': len(issues), 'issues': issues}
+    client._get_json = get_json
+
+    keys = ['TST-%s' % i for i in (7, 1, 4, 3, 9, 2, 8)] + ['101']
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter('always')
+        issues = client.issues(keys, chunk=3)
+    assert [i.key for i in issues] == ['TST-7', 'TST-1', 'TST-3', 'TST-9', 'TST-2', 'TST-8', 'TST-1']
+    assert issues.missing == ['TST-4']
+    assert 'TST-4' in str(caught[0].message)
+    assert sorted(len(chunk) for chunk in searched) == [2, 3, 3]
+
+
+def test_issues_matches_lower_case_and_old_keys():
+    import re
+    import warnings
+
+    client = _offline_client({})
+    # OLD-n was moved to TST-(n + 10), whose ID is 100 + n + 10
+    moved = dict(('OLD-%s' % n, {'id': str(110 + n), 'key': 'TST-%s' % (10 + n)}) for n in (5, 6))
+
+    def get_json(path, params=None, base=None):
+        issues = []
+        for key in re.findall(r'"([^"]+)"', params['jql']):
+            if key in moved:
+                issues.append(moved[key])
+            elif key.upper().startswith('TST-'):
+                issues.append({'id': str(100 + int(key.split('-')[1])), 'key': key.upper()})
+        return {'startAt': 0, 'maxResults': 50, 'total': len(issues), 'issues': issues}
+    client._get_json = get_json
+    looked_up = []
+
+    def issue(key, fields=None, expand=None):
+        looked_up.append(key)
+        if key not in moved:
+            raise jira.client.JIRAError(404, 'Issue Does Not Exist')
+        return jira.client.Issue(client._options, client._session, moved[key])
+    client.issue = issue
+
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter('always')
+        issues = client.issues(['tst-1', 'OLD-5', 'TST-2'])
+        assert [i.key for i in issues] == ['TST-1', 'TST-15', 'TST-2']
+        assert issues.missing == [] and caught == [] and looked_up == []
+
+        issues = client.issues(['OLD-6', 'OLD-7', 'tst-3', 'OLD-5'])
+    assert [i.key for i in issues] == ['TST-16', 'TST-3', 'TST-15']
+    assert issues.missing == ['OLD-7']
+    assert sorted(looked_up) == ['OLD-5', 'OLD-6', 'OLD-7']
+
+
+def test_create_issues_in_batches():
+    client = _offline_client({})
+    looked_up = []
+    client.project = lambda key: looked_up.append(key) or type(str('Project'), (object,), {'id': '10000'})()
+    client.issue_types = lambda: looked_up.append('issuetypes') or [
+        type(str('IssueType'), (object,), {'name': 'Bug', 'id': '1'})()]
+    posted = []
+
+    class Session(object):
+        def post(self, url, data=None):
+            updates = json.loads(data)['issueUpdates']
+            posted.append(updates)
+            body = {'issues': [], 'errors': []}
+            for number, update in enumerate(updates):
+                if update['fields']['summary'] == 'bad':
+                    body['errors'].append({'status': 400, 'failedElementNumber': number, 'elementErrors': {
+                        'errorMessages': [], 'errors': {'summary': 'Summary is invalid.'}}})
+                else:
+                    n = len(posted) * 10 + number
+                    body['issues'].append({'id': str(n), 'key': 'TST-%s' % n, 'self': url})
+            return type(str('Response'), (object,), {'status_code': 201, 'text': json.dumps(body)})()
+    client._session = Session()
+
+    field_list = [{'project': 'TST', 'issuetype': 'Bug', 'summary': s} for s in ('a', 'bad', 'c', 'd', 'e')]
+    field_list.append({'project': 'TST', 'issuetype': 'Epic', 'summary': 'f'})
+    results = client.create_issues(field_list, batch=2)
+
+    assert [r['status'] for r in results] == ['Success', 'Error', 'Success', 'Success', 'Success', 'Error']
+    assert [r['issue'].key for r in results if r['issue']] == ['TST-10', 'TST-20', 'TST-21', 'TST-30']
+    assert results[1]['error'] == 'summary: Summary is invalid.'
+    assert "Epic" in results[5]['error']
+    assert results[0]['input_fields'] is field_list[0] and field_list[0]['project'] == 'TST'
+    assert [len(updates) for updates in posted] == [2, 2, 1]
+    assert posted[0][0]['fields']['project'] == {'id': '10000'}
+    assert looked_up == ['TST', 'issuetypes']
+
+
+def test_create_issues_keeps_the_results_of_the_batches_sent():
+    import requests
+
+    client = _offline_client({})
+    looked_up = []
+
+    def project(key):
+        looked_up.append(key)
+        if key == 'NOPE':
+            raise jira.client.JIRAError(404, 'No project could be found with key NOPE.')
+        return type(str('Project'), (object,), {'id': '10000'})()
+    client.project = project
+    posted = []
+
+    class Session(object):
+        def post(self, url, data=None):
+            updates = json.loads(data)['issueUpdates']
+            posted.append(updates)
+            if len(posted) == 2:
+                raise requests.exceptions.ConnectionError('Connection reset by peer')
+            issues = [{'id': str(n), 'key': 'TST-%s' % n, 'self': url} for n in range(len(posted) * 10, len(posted) * 10 + len(updates))]
+            return type(str('Response'), (object,), {'status_code': 201, 'text': json.dumps({'issues': issues, 'errors': []})})()
+    client._session = Session()
+
+    field_list = [{'project': p, 'issuetype': 1, 'summary': 'a'} for p in ('TST', 'NOPE', 'TST', 'NOPE', 'TST', 'TST', 'TST')]
+    results = client.create_issues(field_list, batch=2)
+
+    assert [r['status'] for r in results] == ['Success', 'Error', 'Success', 'Error', 'Error', 'Error', 'Success']
+    assert [r['issue'].key for r in results if r['issue']] == ['TST-10', 'TST-11', 'TST-30']
+    assert 'NOPE' in results[3]['error']
+    assert results[4]['error'] == 'Connection reset by peer'
+    assert looked_up == ['TST', 'NOPE']
+
+
+def test_metadata_is_shared_by_clients_of_a_server():
+    from jira.cache import MetadataCache
+
+    requested = []
+
+    def client():
+        c = _offline_client({}, metadata_cache_ttl=300)
+        c._metadata_cache = MetadataCache.shared(c._options['server'], 'bob')
+
+        def get_json(path, params=None, base=None):
+            requested.append(path)
+            return [{'id': 'summary', 'name': 'Summary'}] if path == 'field' else [
+                {'id': '1', 'name': 'Bug', 'self': c._options['server'] + '/rest/api/2/issuetype/1'}]
+        c._get_json = get_json
+        return c
+
+    MetadataCache.clear_shared()
+    first, second = client(), client()
+    fields = first.fields()
+    fields.append({'id': 'changed'})
+    assert second.fields() == [{'id': 'summary', 'name': 'Summary'}]
+    assert second.issue_type_by_name('Bug').id == '1'
+    assert first.issue_types()[0].name == 'Bug'
+    assert requested == ['field', 'issuetype']
+
+    first.invalidate_metadata('field')
+    second.fields()
+    second._options['metadata_cache_ttl'] = 0
+    second.issue_types()
+    assert requested == ['field', 'issuetype', 'field', 'issuetype']
+    MetadataCache.clear_shared()
+
+
+def test_metadata_cache_is_opt_in_and_per_credentials():
+    from jira.cache import MetadataCache
+
+    def client(auth, **options):
+        options = dict(check_update=False, lazy_startup=True, **options)
+        return jira.client.JIRA('http://localhost:2990/jira', basic_auth=auth, get_server_info=False, options=options)
+
+    MetadataCache.clear_shared()
+    assert client(('bob', 'secret'))._metadata_cache is None
+    cache = client(('bob', 'secret'), metadata_cache_ttl=300)._metadata_cache
+    assert cache is client(('bob', 'secret'), metadata_cache_ttl=300)._metadata_cache
+    assert cache is not client(('bob', 'wrong'), metadata_cache_ttl=300)._metadata_cache
+    MetadataCache.clear_shared()
+
+
+def test_lazy_startup_and_snapshot(tmpdir):
+    snapshot = str(tmpdir.join('startup.json'))
+    requested = []
+
+    def client():
+        c = _offline_client({}, lazy_startup=True, startup_snapshot=snapshot)
+        c._fields = None  # not loaded yet
+
+        def get_json(path, params=None, base=None):
+            requested.append(path)
+            if path == 'serverInfo':
+                return {'versionNumbers': [7, 2, 0]}
+            return [{'id': 'customfield_10001', 'clauseNames': ['cf[10001]', 'Squad']}]
+        c._get_json = get_json
+        return c
+
+    first = client()
+    assert requested == []
+    assert first._version == (7, 2, 0)
+    assert first._fields == {'cf[10001]': 'customfield_10001', 'Squad': 'customfield_10001'}
+    assert requested == ['serverInfo', 'field']
+
+    second = client()
+    assert second._version == (7, 2, 0) and second._fields['Squad'] == 'customfield_10001'
+    assert requested == ['serverInfo', 'field']
+
+    third = client()
+    third._options['server'] = 'https://other.example.com'
+    assert third._version == (7, 2, 0)
+    assert requested == ['serverInfo', 'field', 'serverInfo']
+
+
+def test_lazy_startup_constructs_without_network():
+    client = jira.client.JIRA('http://localhost:1/jira', options={'lazy_startup': True, 'check_update': False})
+    assert client._server_version is None and client._field_map is None
+
+
+def test_download_attachments(tmpdir):
+    client = _offline_client({}, fetch_workers=2)
+    server = client._options['server']
+
+    class Session(object):
+        def get(self, url, stream=False, headers=None):
+            body = url.encode('utf-8')
+            return type(str('Response'), (object,), {'status_code': 200, 'close': lambda self: None,
+                                                     'iter_content': lambda self, size: iter([body])})()
+    client._session = Session()
+
+    def raw_issue(n, filenames):
+        attachments = [{'self': server + '/rest/api/2/attachment/%s%s' % (n, i), 'id': '%s%s' % (n, i),
+                        'filename': name, 'content': server + '/secure/attachment/%s%s/%s' % (n, i, name)}
+                       for i, name in enumerate(filenames)]
+        return {'id': str(n), 'key': 'TST-%s' % n, 'self': server + '/rest/api/2/issue/%s' % n,
+                'fields': {'attachment': attachments}}
+    fetched = []
+
+    def issues(keys, fields=None):
+        fetched.extend(keys)
+        return [jira.client.Issue(client._options, client._session, raw_issue(2, ['a.txt', 'a.txt', 'b.txt']))]
+    client.issues = issues
+
+    first = jira.client.Issue(client._options, client._session, raw_issue(1, ['report.pdf']))
+    paths = client.download_attachments([first, 'TST-2', 'TST-3'], str(tmpdir))
+
+    assert fetched == ['TST-2', 'TST-3']
+    assert [os.path.relpath(p, str(tmpdir)) for p in paths] == [
+        os.path.join('TST-1', 'report.pdf'), os.path.join('TST-2', '20-a.txt'), os.path.join('TST-2', '21-a.txt'),
+        os.path.join('TST-2', 'b.txt')]
+    assert tmpdir.join('TST-2', 'b.txt').read() == server + '/secure/attachment/22/b.txt'
+
+
+def test_add_attachments_in_one_request_and_in_bulk(tmpdir, monkeypatch):
+    import io
+
+    # the files are posted as they are without requests_toolbelt
+    monkeypatch.setitem(sys.modules, 'requests_toolbelt', None)
+    client = _offline_client({}, fetch_workers=3)
+    server = client._options['server']
+    tmpdir.join('a.txt').write_binary(b'aaa')
+    posted = []
+
+    class Session(object):
+        def post(self, url, files=None, data=None, headers=None, retry_data=None):
+            if url.endswith('/BAD/attachments'):
+                raise jira.client.JIRAError(404, 'Issue Does Not Exist', url)
+            # a retried request sends the files again from where they started
+            first = [f.read() for name, (fname, f, ctype) in files]
+            retry_data()
+            again = [f.read() for name, (fname, f, ctype) in files]
+            assert first == again
+            posted.append((url, [(fname, content) for (name, (fname, f, ctype)), content in zip(files, first)]))
+            body = [{'self': server + '/rest/api/2/attachment/%s' % i, 'id': str(i), 'filename': fname,
+                     'size': len(content)} for i, (name, (fname, f, ctype)), content in zip(range(len(files)), files, first)]
+            text = json.dumps(body)
+            return type(str('Response'), (object,), {'status_code': 200, 'text': text, 'content': text,
+                                                     'headers': {}})()
+    client._session = Session()
+
+    stream = io.BytesIO(b'xxbbbb')
+    stream.seek(2)
+    attachments = client.add_attachments('TST-1', [str(tmpdir.join('a.txt')), ('b.txt', stream)])
+    assert [(a.filename, a.size) for a in attachments] == [('a.txt', 3), ('b.txt', 4)]
+    assert posted == [(server + '/rest/api/2/issue/TST-1/attachments', [('a.txt', b'aaa'), ('b.txt', b'bbbb')])]
+    assert not stream.closed
+
+    results = client.bulk_add_attachments([('TST-%s' % i, [('%s.txt' % i, io.BytesIO(b'n' * i))]) for i in range(1, 5)] +
+                                          [('BAD', [str(tmpdir.join('a.txt'))])])
+    assert [r['status'] for r in results] == ['Success'] * 4 + ['Error']
+    assert [[a.size for a in r['attachments']] for r in results] == [[1], [2], [3], [4], []]
+    assert results[4]['error'] == 'Issue Does Not Exist'
+
+
+def test_add_attachments_streams_with_multipart_encoder(tmpdir):
+    import io
+    pytest.importorskip('requests_toolbelt')
+
+    client = _offline_client({})
+    server = client._options['server']
+    tmpdir.join('a.txt').write_binary(b'aaa')
+    bodies = []
+
+    class Session(object):
+        def post(self, url, data=None, headers=None, retry_data=None, files=None):
+            assert files is None
+            # the files are streamed, not read in memory
+            assert data.len > 0 and headers['content-type'] == data.content_type
+            bodies.append(data.read())
+            # the retried request sends the same body, with the boundary of the content-type header
+            again = retry_data()
+            assert again.content_type == headers['content-type']
+            bodies.append(again.read())
+            text = json.dumps([{'self': server + '/rest/api/2/attachment/%s' % i, 'id': str(i), 'filename': name,
+                                'size': 1} for i, name in enumerate(['a.txt', 'b.txt'])])
+            return type(str('Response'), (object,), {'status_code': 200, 'text': text, 'content': text,
+                                                     'headers': {}})()
+    client._session = Session()
+
+    stream = io.BytesIO(b'xxbbbb')
+    stream.seek(2)
+    attachments = client.add_attachments('TST-1', [str(tmpdir.join('a.txt')), ('b.txt', stream)])
+    assert [a.filename for a in attachments] == ['a.txt', 'b.txt']
+    first, retried = bodies
+    assert first == retried
+    assert b'filename="a.txt"' in first and b'\r\n\r\naaa\r\n' in first
+    assert b'filename="b.txt"' in first and b'\r\n\r\nbbbb\r\n' in first and b'xx' not in first
+
+
+def test_import_leaves_optional_modules_unloaded():
+    code = 'import sys, jira; print(" ".join(m for m in ("pytz", "imghdr", "html.parser", "HTMLParser", ' \
+           '"configparser", "multiprocessing.pool", "requests_toolbelt", "requests_jwt") if m in sys.modules))'
+    root = os.path.dirname(os.path.dirname(os.path.abspath(jira.client.__file__)))
+    out = subprocess.check_output([sys.executable, '-c', code], cwd=root)
+    assert out.decode('utf-8').split() == []
@@ -0,0 +1,25 @@
+import os
+import sys
+
+from jira import JIRA
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+from fakejira import FakeJIRA  # noqa
+
+
+def test_client_against_fake_server(tmpdir):
+    with FakeJIRA(issues=120, page_size=50, boards=3) as server:
+        jira = JIRA(server.url, options={'check_update': False, 'agile_rest_path': 'agile', 'fetch_workers': 3})
+        assert jira._version == (7, 2, 0)
+
+        issues = jira.search_issues('project = FAKE', maxResults=False, expand='changelog')
+        assert [issue.key for issue in issues] == ['FAKE-%s' % n for n in range(1, 121)]
+        assert len(issues[0].changelog.histories) == server.histories
+
+        issues[4].update(fields={'summary': 'Changed'})
+        assert jira.issue('FAKE-5').fields.summary == 'Changed'
+        assert len(jira.boards(maxResults=False)) == 3
+
+        paths = jira.download_attachments(['FAKE-1'], str(tmpdir))
+        assert os.path.getsize(paths[0]) == server.attachment_size
+        assert server.requests[:2] == [('GET', '/rest/api/2/serverInfo'), ('GET', '/rest/api/2/field')]
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from jira import jsonlib
+
+
+class _Response(object):
+
+    def __init__(self, content, encoding='utf-8'):
+        self.content = content
+        self.encoding = encoding
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding or 'utf-8', 'replace')
+
+
+@pytest.fixture(params=jsonlib.BACKENDS)
+def backend(request):
+    if request.param != 'json':
+        pytest.importorskip(request.param)
+    previous = jsonlib.backend()
+    yield jsonlib.use(request.param)
+    jsonlib.use(previous)
+
+
+def test_response_json(backend):
+    body = u'{"key": "TST-1", "fields": {"summary": "Café", "votes": 3}}'
+    assert jsonlib.response_json(_Response(body.encode('utf-8'))) == {
+        'key': 'TST-1', 'fields': {'summary': u'Café', 'votes': 3}}
+    assert jsonlib.response_json(_Response(b'')) == {}
+    assert jsonlib.response_json(_Response(body.encode('latin-1'), encoding='ISO-8859-1'))['fields']['summary'] == \
+        u'Café'
+    # invalid UTF-8 is replaced, as with response.text
+    assert jsonlib.response_json(_Response(b'["\xff"]')) == [u'�']
+    with pytest.raises(ValueError):
+        jsonlib.response_json(_Response(b'<html>'))
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        jsonlib.use('yaml')
+    assert jsonlib.backend() in jsonlib.BACKENDS
@@ -0,0 +1,106 @@
+from requests.adapters import BaseAdapter
+from requests.exceptions import ReadTimeout
+from requests.models import Response
+
+import pytest
+
+from jira.exceptions import JIRAError
+from jira.metrics import Callback, Histogram, Metrics, endpoint_template
+from jira.resilientsession import ResilientSession, RetryLater, RetryPolicy
+
+SERVER = 'https://jira.example.com'
+
+
+class _ScriptedAdapter(BaseAdapter):
+
+    """Answers the requests with the status codes it is given, in order, then with 200."""
+
+    def __init__(self, statuses):
+        super(_ScriptedAdapter, self).__init__()
+        self.statuses = list(statuses)
+
+    def send(self, request, **kwargs):
+        response = Response()
+        response.status_code = self.statuses.pop(0) if self.statuses else 200
+        response._content = b'{"key": "TST-1"}' if response.status_code == 200 else b'{"errorMessages": ["Nope"]}'
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+def test_endpoint_template():
+    assert endpoint_template(SERVER + '/rest/api/2/issue/TST-12/comment/10001?expand=x') == 'issue/{0}/comment/{1}'
+    assert endpoint_template(SERVER + '/rest/api/2/project/TST/versions') == 'project/{0}/versions'
+    assert endpoint_template(SERVER + '/rest/agile/1.0/board/3/sprint') == 'agile/1.0/board/{0}/sprint'
+    assert endpoint_template(SERVER + '/rest/api/2/search') == 'search'
+    assert endpoint_template(SERVER + '/secure/attachment/10200/report.pdf') == 'secure/attachment/{0}'
+
+
+def test_endpoint_template_with_a_context_path():
+    server = 'http://localhost:2990/jira'
+    assert endpoint_template(server + '/rest/api/2/issue/TST-12/comment/10001') == 'issue/{0}/comment/{1}'
+    assert endpoint_template(server + '/rest/api/2/issue/TST-12/worklog') == 'issue/{0}/worklog'
+    assert endpoint_template(server + '/rest/api/2/issue/TST-12') == 'issue/{0}'
+    assert endpoint_template(server + '/rest/agile/1.0/board/3/sprint') == 'agile/1.0/board/{0}/sprint'
+
+
+def test_requests_are_measured():
+    histogram = Histogram(buckets=(60, 120))
+    samples = []
+    session = ResilientSession(retry_policy=RetryPolicy(backoff=0),
+                               metrics=Metrics(histogram, Callback(lambda *sample: samples.append(sample))))
+    session.mount(SERVER, _ScriptedAdapter([503, 503, 200, 404]))
+
+    session.get(SERVER + '/rest/api/2/issue/TST-1')
+    with pytest.raises(JIRAError):
+        session.post(SERVER + '/rest/api/2/issue/TST-2/comment', data='{"body": "x"}')
+
+    get, post = sorted(histogram.summary(), key=lambda row: row['verb'])
+    assert (get['verb'], get['endpoint'], get['count'], get['retries'], get['errors']) == ('GET', 'issue/{0}', 1, 2, 0)
+    assert get['bytes_received'] == len(b'{"key": "TST-1"}')
+    assert (post['endpoint'], post['errors'], post['bytes_sent']) == ('issue/{0}/comment', 1, len(b'{"body": "x"}'))
+    assert histogram.count() == 2 and histogram.count(verb='POST') == 1
+    assert histogram.percentile(0.5) == 60
+    assert 'issue/{0}/comment' in str(histogram)
+
+    tags = {'verb': 'POST', 'endpoint': 'issue/{0}/comment', 'status': '404'}
+    assert ('jira.requests', 1, tags) in samples
+    assert ('jira.request.retries', 0, tags) in samples
+    assert len([s for s in samples if s[0] == 'jira.requests']) == 2
+
+
+def test_failing_exporter_does_not_fail_the_request():
+    def broken(metric):
+        raise RuntimeError()
+    session = ResilientSession(metrics=Metrics(broken))
+    session.mount(SERVER, _ScriptedAdapter([]))
+    assert session.get(SERVER + '/rest/api/2/serverInfo').status_code == 200
+
+
+def test_requests_failing_without_a_response_are_measured():
+    class TimingOut(BaseAdapter):
+        def send(self, request, **kwargs):
+            raise ReadTimeout('Read timed out.', request=request)
+
+        def close(self):
+            pass
+
+    histogram = Histogram()
+    samples = []
+    session = ResilientSession(metrics=Metrics(histogram, Callback(lambda *sample: samples.append(sample))))
+    session.mount(SERVER, TimingOut())
+    with pytest.raises(ReadTimeout):
+        session.get(SERVER + '/rest/api/2/search')
+
+    [row] = histogram.summary()
+    assert (row['verb'], row['endpoint'], row['count'], row['errors']) == ('GET', 'search', 1, 1)
+    assert ('jira.requests', 1, {'verb': 'GET', 'endpoint': 'search', 'status': 'error'}) in samples
+
+    session = ResilientSession(retry_policy=RetryPolicy(blocking=False), metrics=Metrics(histogram))
+    session.mount(SERVER, _ScriptedAdapter([503]))
+    with pytest.raises(RetryLater):
+        session.get(SERVER + '/rest/api/2/search')
+    assert histogram.count(endpoint='search') == 2
@@ -0,0 +1,94 @@
+import json
+
+import requests
+from requests.adapters import BaseAdapter
+from requests.models import Response
+
+from jira import JIRA
+from jira import resources, utils
+from jira.profiling import Profiler
+from jira.resilientsession import RetryPolicy
+
+SERVER = 'https://jira.example.com'
+ISSUE = {'id': '10001', 'key': 'TST-1', 'self': SERVER + '/rest/api/2/issue/10001',
+         'fields': {'summary': 'Profiled', 'reporter': {'name': 'me', 'self': SERVER + '/rest/api/2/user?username=me'},
+                    'comment': {'comments': [{'id': '1', 'body': 'x', 'self': SERVER + '/rest/api/2/issue/10001/comment/1'}]}}}
+
+
+class _IssueAdapter(BaseAdapter):
+
+    def __init__(self):
+        super(_IssueAdapter, self).__init__()
+        self.failures = 1
+
+    def send(self, request, **kwargs):
+        response = Response()
+        response.status_code = 503 if self.failures else 200
+        self.failures = 0
+        response._content = json.dumps(ISSUE).encode('utf-8')
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+def _client(**options):
+    jira = JIRA(SERVER, get_server_info=False,
+                options=dict(check_update=False, lazy_startup=True, retry_policy=RetryPolicy(backoff=0), **options))
+    jira._session.mount(SERVER, _IssueAdapter())
+    return jira
+
+
+def test_profiler_times_the_parts_of_the_client():
+    originals = (requests.Session.send, utils.json_loads, resources.dict2resource, JIRA._get_url)
+    jira = _client()
+    with Profiler() as profiler:
+        assert jira.issue('TST-1').fields.comment.comments[0].body == 'x'
+    assert (requests.Session.send, utils.json_loads, resources.dict2resource, JIRA._get_url) == originals
+
+    rows = dict((row['part'], row) for row in profiler.summary())
+    assert rows['network']['calls'] == 2
+    assert rows['retry sleep']['calls'] == 1
+    assert rows['json decode']['calls'] == 1
+    assert rows['url building']['calls'] == 1
+    assert rows['hydration']['calls'] >= 1 and rows['resource lookup']['calls'] >= 1
+    assert profiler.summary()[-1]['part'] == 'other'
+    assert sum(row['wall'] for row in rows.values()) <= profiler.wall + 1e-6
+    assert 'json decode' in str(profiler)
+
+
+def test_profile_option():
+    send = requests.Session.send
+    jira = _client(profile=True)
+    other = _client()
+    assert requests.Session.send is not send
+    jira.issue('TST-1')
+    other.issue('TST-1')
+    jira.close()
+    assert requests.Session.send is send
+    calls = dict((row['part'], row['calls']) for row in jira.profiler.summary())
+    # the requests of the other client are not counted, its JSON decoding is
+    assert calls['network'] == 2 and calls['json decode'] == 2
+
+
+def test_overlapping_profilers():
+    originals = (requests.Session.send, utils.json_loads, resources.dict2resource, JIRA._get_url)
+    jira = _client()
+    first, second = Profiler().start(), Profiler().start()
+    jira.issue('TST-1')
+    first.stop()
+    # the second one still counts once the first one stopped
+    jira.issue('TST-1')
+    second.stop()
+    assert (requests.Session.send, utils.json_loads, resources.dict2resource, JIRA._get_url) == originals
+
+    calls = [dict((row['part'], row['calls']) for row in profiler.summary()) for profiler in (first, second)]
+    assert calls[0]['json decode'] == 1 and calls[1]['json decode'] == 2
+
+    # stopped in the reverse order this time
+    first, second = Profiler().start(), Profiler().start()
+    second.stop()
+    first.stop()
+    assert (requests.Session.send, utils.json_loads, resources.dict2resource, JIRA._get_url) == originals
@@ -0,0 +1,139 @@
+import socket
+import time
+
+import pytest
+from requests.adapters import HTTPAdapter
+
+from jira.exceptions import JIRAError
+from jira.resilientsession import ResilientSession, RetryLater, RetryPolicy, TunedHTTPAdapter
+from jira.utils import ThreadedRequests
+
+
+class _Response(object):
+    status_code = 200
+
+
+def _recording_session(**kwargs):
+    session = ResilientSession(**kwargs)
+    session.sent = []
+
+    def request(method, url, **kwargs):
+        session.sent.append(kwargs)
+        return _Response()
+    session.request = request
+    return session
+
+
+def test_default_session_is_untouched():
+    session = _recording_session()
+    assert type(session.get_adapter('https://jira.example.com')) is HTTPAdapter
+    session.get('https://jira.example.com/rest/api/2/serverInfo')
+    assert 'timeout' not in session.sent[0]
+
+
+def test_timeout_applies_unless_given():
+    session = _recording_session(timeout=(3.05, 27))
+    session.get('https://jira.example.com/rest/api/2/serverInfo')
+    session.post('https://jira.example.com/rest/api/2/issue', data={}, timeout=5)
+    assert [sent['timeout'] for sent in session.sent] == [(3.05, 27), 5]
+
+
+def test_tuned_adapter():
+    session = ResilientSession(pool_connections=2, pool_maxsize=32, keepalive=60)
+    adapter = session.get_adapter('http://jira.example.com')
+    assert isinstance(adapter, TunedHTTPAdapter)
+    assert adapter is session.get_adapter('https://jira.example.com')
+    assert adapter._pool_maxsize == 32
+    assert adapter.poolmanager.connection_pool_kw['maxsize'] == 32
+    assert (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1) in adapter.poolmanager.connection_pool_kw['socket_options']
+
+
+class _Failure(object):
+    reason = 'Failure'
+    content = b''
+    text = ''
+    url = 'https://jira.example.com'
+
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+def _scripted_session(responses, **kwargs):
+    """A session answering its requests with ``responses`` in turn."""
+    session = ResilientSession(**kwargs)
+    session.sent = []
+    responses = list(responses)
+
+    def request(method, url, **kwargs):
+        session.sent.append(method)
+        return responses.pop(0)
+    session.request = request
+    return session
+
+
+def test_retry_policy_honours_retry_after_without_blocking():
+    policy = RetryPolicy(blocking=False)
+    session = _scripted_session([_Failure(429, {'Retry-After': '7'}), _Response()], retry_policy=policy)
+    with pytest.raises(RetryLater) as caught:
+        session.get('https://jira.example.com/rest/api/2/serverInfo')
+    assert caught.value.delay == 7
+    assert caught.value.status_code == 429
+    assert caught.value.retry().status_code == 200
+    assert session.sent == ['GET', 'GET']
+
+
+def test_retry_policy_rules():
+    policy = RetryPolicy(backoff=0, verbs={'POST': (429, )}, budget=3)
+    session = _scripted_session([_Failure(503), _Failure(503), _Failure(503), _Response()], retry_policy=policy)
+    assert session.get('https://jira.example.com/rest/api/2/issue/1').status_code == 200
+    assert session.sent == ['GET'] * 4
+
+    session = _scripted_session([_Failure(503)], retry_policy=policy)
+    with pytest.raises(JIRAError):
+        session.post('https://jira.example.com/rest/api/2/issue', data={})
+    assert session.sent == ['POST']
+
+    # the budget was spent by the first request
+    session = _scripted_session([_Failure(502), _Response()], retry_policy=policy)
+    with pytest.raises(JIRAError):
+        session.get('https://jira.example.com/rest/api/2/issue/1')
+
+    policy = RetryPolicy(deadline=5)
+    assert policy.next_delay('GET', 1, response=_Failure(429, {'Retry-After': '10'}), started=0) is None
+    session = _scripted_session([_Failure(504)] * 3)
+    session.max_retries = 2
+    session.retry_policy = RetryPolicy(backoff=0)
+    with pytest.raises(JIRAError):
+        session.get('https://jira.example.com/rest/api/2/issue/1')
+    assert session.sent == ['GET'] * 3
+
+
+def test_threaded_requests_reschedule_retries():
+    policy = RetryPolicy(blocking=False)
+    session = _scripted_session([_Failure(429, {'Retry-After': '0'}), _Response()], retry_policy=policy)
+    executor = ThreadedRequests(1)
+    job = executor.put(session, 'https://jira.example.com/rest/api/2/issue/1', data={})
+    assert job.wait(5)
+    assert job.status_code == 200
+    assert session.sent == ['PUT', 'PUT']
+    executor.close()
+
+
+def test_closing_threaded_requests_drops_pending_retries():
+    policy = RetryPolicy(blocking=False)
+    session = _scripted_session([_Failure(429, {'Retry-After': '30'}), _Response()], retry_policy=policy)
+    executor = ThreadedRequests(1)
+    job = executor.put(session, 'https://jira.example.com/rest/api/2/issue/1', data={})
+    for _ in range(500):
+        if executor._timers:
+            break
+        time.sleep(0.01)
+    timer, = executor._timers
+    executor.close()
+    assert job.wait(5)
+    assert isinstance(job.exception, RetryLater)
+    assert timer.finished.is_set()
+    # a timer which fires anyway does not bring the pool back
+    executor._fire(timer, job.run)
+    assert executor._pool is None and session.sent == ['PUT']
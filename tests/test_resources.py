@@ -0,0 +1,212 @@
+import pickle
+
+from jira.resources import Attachment, Issue, PropertyHolder, User, dict2resource
+
+SERVER = 'http://localhost:2990/jira'
+OPTIONS = {'server': SERVER, 'rest_path': 'api', 'rest_api_version': '2', 'async': False}
+
+
+def _raw_issue():
+    return {
+        'id': '10001',
+        'key': 'TST-1',
+        'self': SERVER + '/rest/api/2/issue/10001',
+        'fields': {
+            'summary': 'A summary',
+            'labels': ['a', 'b'],
+            'reporter': {'self': SERVER + '/rest/api/2/user?username=bob', 'name': 'bob'},
+            'votes': {'votes': 2, 'hasVoted': False},
+        },
+        'changelog': {'histories': [{'id': '1', 'items': [{'field': 'status', 'toString': 'Done'}]}]},
+    }
+
+
+def test_dict2resource_property_holders():
+    issue = Issue(OPTIONS, None, _raw_issue())
+    assert issue.key == 'TST-1'
+    assert isinstance(issue.fields, PropertyHolder)
+    assert issue.fields.summary == 'A summary'
+    assert issue.fields.labels == ['a', 'b']
+    assert issue.fields.votes.votes == 2
+    assert isinstance(issue.fields.reporter, User)
+    assert issue.changelog.histories[0].items[0].toString == 'Done'
+    # every holder is an instance of the same class
+    assert type(issue.fields) is type(issue.changelog)
+
+
+def test_dict2resource_holders_do_not_share_state():
+    first = dict2resource({'a': 1})
+    second = dict2resource({'b': 2})
+    assert not hasattr(first, 'b')
+    assert not hasattr(second, 'a')
+
+
+def test_property_holder_pickles():
+    holder = pickle.loads(pickle.dumps(dict2resource({'a': {'b': [1, 2]}})))
+    assert holder.a.b == [1, 2]
+
+
+def test_lazy_hydration_builds_attributes_on_access():
+    options = dict(OPTIONS, lazy_hydration=True)
+    issue = Issue(options, None, _raw_issue())
+    assert 'fields' not in vars(issue)
+    assert issue.key == 'TST-1'
+    assert issue.fields.summary == 'A summary'
+    assert issue.fields is issue.fields  # memoized
+    assert 'votes' not in vars(issue.fields)
+    assert issue.fields.votes.votes == 2
+    assert isinstance(issue.fields.reporter, User)
+    assert issue.changelog.histories[0].items[0].toString == 'Done'
+    assert not hasattr(issue.fields, 'missing')
+
+
+def test_lazy_hydration_reparse_drops_stale_attributes():
+    options = dict(OPTIONS, lazy_hydration=True)
+    issue = Issue(options, None, _raw_issue())
+    assert issue.fields.summary == 'A summary'
+    raw = _raw_issue()
+    raw['fields']['summary'] = 'Changed'
+    issue._parse_raw(raw)
+    assert issue.fields.summary == 'Changed'
+
+
+def test_lazy_property_holder_pickles():
+    options = dict(OPTIONS, lazy_hydration=True)
+    holder = pickle.loads(pickle.dumps(Issue(options, None, _raw_issue()).fields))
+    assert holder.votes.votes == 2
+
+
+def test_cls_for_resource_matches_the_uncompiled_patterns():
+    import re
+    from jira.resources import Resource, cls_for_resource, resource_class_map
+    urls = [SERVER + '/rest/api/2/' + path for path in (
+        'attachment/10', 'component/5', 'issue/10001', 'issue/TST-12/comment/10020', 'issue/10001/votes',
+        'issue/10001/watchers', 'issue/10001/worklog/3', 'issuetype/1', 'priority/3', 'project/TST',
+        'project/10000/role/10002', 'status/1', 'user?username=bob', 'version/7', 'filter/1', 'filter/12',
+        'serverInfo', 'issue/10001/remotelink/4')] + [SERVER + '/rest/greenhopper/1.0/sprints/4']
+    for url in urls * 2:  # the second round is served from the cache
+        expected = [cls for pattern, cls in resource_class_map.items() if re.search(pattern, url)]
+        assert cls_for_resource(url) == (expected[0] if expected else Resource), url
+
+
+def test_cls_for_resource_follows_changes_of_the_map():
+    from jira.resources import Priority, Resource, cls_for_resource, resource_class_map
+
+    class CustomPriority(Resource):
+        pass
+    url = SERVER + '/rest/api/2/priority/3'
+    assert cls_for_resource(url) is Priority
+    resource_class_map[r'priority/[^/]+$'] = CustomPriority
+    try:
+        # same number of patterns, but a different class
+        assert cls_for_resource(url) is CustomPriority
+    finally:
+        resource_class_map[r'priority/[^/]+$'] = Priority
+    assert cls_for_resource(url) is Priority
+
+
+def test_cls_for_resource_with_a_pattern_containing_digits():
+    from jira.resources import Resource, User, cls_for_resource, resource_class_map
+
+    class Foo(Resource):
+        pass
+    assert cls_for_resource(SERVER + '/rest/api/2/foo/1') is Resource
+    resource_class_map[r'rest/api/2/foo'] = Foo
+    try:
+        assert cls_for_resource(SERVER + '/rest/api/2/foo/1') is Foo
+        assert cls_for_resource(SERVER + '/rest/api/3/foo/1') is Resource
+        assert cls_for_resource(SERVER + '/rest/api/2/foo/1') is Foo
+        assert cls_for_resource(SERVER + '/rest/api/2/user?username=bob') is User
+    finally:
+        del resource_class_map[r'rest/api/2/foo']
+    assert cls_for_resource(SERVER + '/rest/api/2/foo/1') is Resource
+
+
+def _raw_issue_with_squad_moves():
+    raw = _raw_issue()
+    raw['fields'].update({
+        'created': '2016-01-04T10:00:00.000+0000',
+        'creator': {'self': SERVER + '/rest/api/2/user?username=bob', 'name': 'bob', 'timeZone': 'Europe/London'},
+        'status': {'self': SERVER + '/rest/api/2/status/3', 'name': 'Done'},
+        'customfield_11100': {'self': SERVER + '/rest/api/2/customFieldOption/2', 'value': 'Blue'},
+    })
+
+    def history(id, created, *items):
+        return {'id': id, 'created': created, 'items': [dict(zip(('field', 'fromString', 'toString'), item))
+                                                        for item in items],
+                'author': {'self': SERVER + '/rest/api/2/user?username=ann', 'name': 'ann', 'displayName': 'Ann',
+                           'emailAddress': 'ann@example.com', 'active': True, 'timeZone': 'Europe/London'}}
+    raw['changelog'] = {'histories': [
+        history('1', '2016-01-05T09:00:00.000+0000', ('Squad', 'Red', 'Green')),
+        history('2', '2016-01-06T09:00:00.000+0000', ('status', 'Open', 'In Progress'), ('Squad', 'Green', 'Blue')),
+        history('3', '2016-01-07T09:00:00.000+0000', ('status', 'In Progress', 'Done')),
+    ]}
+    return raw
+
+
+def test_changelog_queries():
+    issue = Issue(OPTIONS, None, _raw_issue_with_squad_moves())
+    changelog = issue.get_issue_changelog()
+    assert [h.field for h in changelog] == ['Squad', 'status', 'Squad', 'status']
+    assert changelog[2].from_squad == 'Green' and changelog[2].to_squad == 'Blue'
+    assert not issue.is_native()
+    assert issue.seen_by_squad('Green')
+    assert not issue.seen_by_squad('Yellow')
+    assert issue.get_status() == 'done'
+    assert issue.get_board_entry_time('Green') == changelog[0].change_created
+    assert issue.get_board_exit_time('Blue') == changelog[3].change_created
+    assert issue.get_board_exit_time('Green') == changelog[3].change_created  # resolved wins
+    assert issue.changelog_table() is issue.changelog_table()
+
+
+class _ContentSession(object):
+    """Serves ``content``, honouring Range requests unless ``ranges`` is False."""
+
+    def __init__(self, content, ranges=True):
+        self.content = content
+        self.ranges = ranges
+        self.requested = []
+
+    def get(self, url, stream=False, headers=None):
+        start = int((headers or {}).get('Range', 'bytes=0-')[6:-1])
+        self.requested.append(start)
+        if not self.ranges:
+            start = 0
+        body = self.content[start:]
+
+        class Response(object):
+            status_code = 206 if start else 200
+
+            def iter_content(self, chunk_size):
+                return (body[i:i + chunk_size] for i in range(0, len(body), chunk_size))
+
+            def close(self):
+                pass
+        return Response()
+
+
+def _attachment(session, size):
+    return Attachment(OPTIONS, session, {'self': SERVER + '/rest/api/2/attachment/1', 'id': '1',
+                                         'filename': 'data.bin', 'size': size,
+                                         'content': SERVER + '/secure/attachment/1/data.bin'})
+
+
+def test_attachment_download_resumes_and_skips(tmpdir):
+    content = bytes(bytearray(range(256))) * 40
+    path = str(tmpdir.join('data.bin'))
+    session = _ContentSession(content)
+    attachment = _attachment(session, len(content))
+
+    tmpdir.join('data.bin.part').write_binary(content[:1000])
+    assert attachment.download(path, chunk_size=100) == len(content) - 1000
+    assert tmpdir.join('data.bin').read_binary() == content
+    assert not tmpdir.join('data.bin.part').exists()
+
+    assert attachment.download(path) == 0
+    assert session.requested == [1000]
+
+    ignoring = _ContentSession(content, ranges=False)
+    tmpdir.join('data.bin').remove()
+    tmpdir.join('data.bin.part').write_binary(content[:1000])
+    assert _attachment(ignoring, len(content)).download(path) == len(content)
+    assert tmpdir.join('data.bin').read_binary() == content
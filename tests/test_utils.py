@@ -0,0 +1,37 @@
+from datetime import datetime, timedelta
+
+import pytz
+
+from jira.utils import get_utc, parse_jira_datetime, parse_jira_datetimes, parse_jira_timestamp
+
+
+def test_parse_jira_datetime_honours_offset():
+    dt = parse_jira_datetime('2016-07-04T10:30:15.123+0100')
+    assert dt == datetime(2016, 7, 4, 9, 30, 15, 123000, tzinfo=pytz.utc)
+    assert parse_jira_datetime('2016-07-04T10:30:15.123-0230') == dt + timedelta(hours=3, minutes=30)
+    assert parse_jira_datetime('2016-07-04T09:30:15.123Z') == dt
+    assert parse_jira_datetime('2016-07-04T09:30:15.123+00:00') == dt
+
+
+def test_parse_jira_datetime_without_offset_uses_timezone():
+    assert parse_jira_datetime('2016-07-04T10:30') == datetime(2016, 7, 4, 9, 30, tzinfo=pytz.utc)
+    assert parse_jira_datetime('2016-01-04T10:30', timezone='UTC') == datetime(2016, 1, 4, 10, 30, tzinfo=pytz.utc)
+    assert parse_jira_datetime(datetime(2016, 7, 4, 10, 30)) == datetime(2016, 7, 4, 9, 30, tzinfo=pytz.utc)
+
+
+def test_parse_jira_timestamp():
+    assert parse_jira_timestamp('1970-01-01T01:00:00.250+0100') == 250
+    assert parse_jira_timestamp('2016-07-04T10:30:15.123+0100') == 1467624615123
+    assert parse_jira_timestamp('2016-07-04T10:30') == 1467624600000
+
+
+def test_parse_jira_datetimes():
+    column = ['2016-07-04T10:30:15.123+0100', None, '2016-07-04T10:30:15.123+0100', '2016-07-04T11:00:00.000+0000']
+    assert parse_jira_datetimes(column) == [parse_jira_datetime(column[0]), None,
+                                            parse_jira_datetime(column[0]), parse_jira_datetime(column[3])]
+    assert parse_jira_datetimes(column, epoch=True) == [1467624615123, None, 1467624615123, 1467630000000]
+
+
+def test_get_utc_is_unchanged():
+    assert get_utc('2016-07-04T10:30:15.123+0000') == datetime(2016, 7, 4, 9, 30, tzinfo=pytz.utc)
+    assert get_utc(datetime(2016, 1, 4, 10, 30, 15)) == datetime(2016, 1, 4, 10, 30, tzinfo=pytz.utc)